@@ -0,0 +1,195 @@
+import asyncio
+import time
+from loguru import logger
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Callable
+from local_ai.config import config
+
+
+class AdmissionError(Exception):
+    """Exception raised when a request cannot be admitted (queue full, timeout or failed switch)."""
+    pass
+
+
+class AdmissionController:
+    """
+    Gate gateway requests around model switches.
+
+    Requests enter through ``admit(model)``. While a switch is in progress nothing is
+    admitted: requests for the outgoing model are refused, requests for the target
+    model (or any other model) wait in the queue until the switch completes. The
+    switch itself waits up to MODEL_SWITCH_STREAM_TIMEOUT for in-flight requests to
+    finish before the old server is stopped, so clients only see added queue latency.
+
+    The initial model load at start-up is gated the same way: the gateway comes up
+    while llama-server is still loading, and ``apply_service_info()`` holds requests
+    until the manager publishes ``ai_state`` "running".
+    """
+
+    def __init__(self, active_model: Optional[str] = None):
+        self.active_model = active_model
+        self.switching_from: Optional[str] = None
+        self.switching_to: Optional[str] = None
+        self.in_flight = 0
+        self.load_started_at: Optional[float] = None
+        self.estimated_load_seconds: Optional[float] = None
+        self._waiting = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def switching(self) -> bool:
+        return self.switching_to is not None
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a switch to complete."""
+        return self._waiting
+
+    @asynccontextmanager
+    async def admit(self, model: Optional[str] = None, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold an admission for the duration of one upstream request or stream.
+
+        Args:
+            model: Model the request targets (default: the active model)
+            timeout: Maximum seconds to wait for a switch to finish (default QUEUE_BACKPRESSURE_TIMEOUT)
+
+        Raises:
+            AdmissionError: If the queue is full, the wait times out or the request targets
+                a model that is being switched away from
+        """
+        timeout = timeout or config.performance.QUEUE_BACKPRESSURE_TIMEOUT
+        async with self._condition:
+            if self.switching:
+                if model is not None and model == self.switching_from:
+                    raise AdmissionError(f"Model {model} is being unloaded")
+                if self._waiting >= config.performance.MAX_QUEUE_SIZE:
+                    raise AdmissionError(f"Switch queue is full ({self._waiting} waiting)")
+                self._waiting += 1
+                try:
+                    await asyncio.wait_for(self._condition.wait_for(lambda: not self.switching), timeout=timeout)
+                except asyncio.TimeoutError:
+                    raise AdmissionError(f"Model switch did not finish within {timeout}s")
+                finally:
+                    self._waiting -= 1
+                if model is not None and self.active_model is not None and model != self.active_model:
+                    raise AdmissionError(f"Model {model} is not loaded (active: {self.active_model})")
+            if self.active_model is None:
+                raise AdmissionError("No model is loaded")
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    async def drain(self, timeout: Optional[float] = None) -> int:
+        """
+        Wait for in-flight requests to finish.
+
+        Args:
+            timeout: Maximum seconds to wait (default MODEL_SWITCH_STREAM_TIMEOUT)
+
+        Returns:
+            int: Requests still in flight when the wait ended
+        """
+        timeout = timeout or config.performance.MODEL_SWITCH_STREAM_TIMEOUT
+        async with self._condition:
+            try:
+                await asyncio.wait_for(self._condition.wait_for(lambda: self.in_flight == 0), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            return self.in_flight
+
+    async def switch(self, target: str, do_switch: Callable[[], Awaitable[bool]]) -> bool:
+        """
+        Switch models behind the admission gate.
+
+        Args:
+            target: Model to switch to
+            do_switch: Coroutine factory performing the switch (e.g. ``manager.switch_model``)
+
+        Returns:
+            bool: Result of ``do_switch``; queued requests are released either way.
+                The outgoing server is already stopped by then, so a failed switch
+                leaves no active model and requests are refused until one is loaded.
+        """
+        async with self._condition:
+            if self.switching:
+                raise AdmissionError(f"Switch to {self.switching_to} already in progress")
+            self.switching_from, self.switching_to = self.active_model, target
+
+        started = time.time()
+        try:
+            remaining = await self.drain()
+            if remaining:
+                logger.warning(f"{remaining} requests still in flight after {config.performance.MODEL_SWITCH_STREAM_TIMEOUT:.0f}s, switching anyway")
+            else:
+                logger.info(f"Drained in-flight requests in {time.time() - started:.1f}s")
+
+            # The outgoing server is stopped first, so nothing is loaded until this succeeds
+            self.active_model = None
+            switched = await do_switch()
+            if switched:
+                self.active_model = target
+            return switched
+        finally:
+            async with self._condition:
+                self.switching_from = self.switching_to = None
+                self._condition.notify_all()
+            logger.info(f"Switch to {target} finished in {time.time() - started:.1f}s, releasing {self._waiting} queued requests")
+
+    async def apply_service_info(self, service_info: Dict[str, Any]) -> None:
+        """
+        Follow the service lifecycle published by the manager (the payload of ``/update``).
+
+        ``ai_state`` "loading" closes the gate like a switch with no outgoing model;
+        "running" opens it for the loaded model. Any other state after a load (the
+        model failed to come up) releases queued requests with an error.
+        """
+        state = service_info.get("ai_state")
+        model = service_info.get("hash")
+        async with self._condition:
+            if state == "loading":
+                self.switching_from, self.switching_to = None, model
+                self.load_started_at = service_info.get("load_started_at") or time.time()
+                self.estimated_load_seconds = service_info.get("estimated_load_seconds")
+                return
+            if self.load_started_at is not None:
+                self.switching_from = self.switching_to = None
+                self.load_started_at = None
+                self.active_model = model if state == "running" else None
+                self._condition.notify_all()
+                logger.info(f"Model {model} {'loaded' if state == 'running' else 'failed to load'}, releasing {self._waiting} queued requests")
+            elif not self.switching and state == "running":
+                self.active_model = model
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Payload for the gateway's ``/health``.
+
+        Reports "loading" with elapsed time and an estimated progress fraction until
+        the initial model is up; ``wait_for_health()`` only accepts "ok".
+        """
+        if self.load_started_at is None:
+            return {"status": "ok", "model": self.active_model}
+        elapsed = time.time() - self.load_started_at
+        estimate = self.estimated_load_seconds or config.performance.DEFAULT_MODEL_LOAD_SECONDS
+        return {
+            "status": "loading",
+            "model": self.switching_to,
+            "elapsed_seconds": round(elapsed, 1),
+            "estimated_seconds": round(estimate, 1),
+            "progress": round(min(elapsed / estimate, 0.99), 2),
+            "queued": self._waiting,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "active_model": self.active_model,
+            "switching_from": self.switching_from,
+            "switching_to": self.switching_to,
+            "in_flight": self.in_flight,
+            "queued": self._waiting,
+        }
@@ -0,0 +1,397 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import signal
+import asyncio
+import inspect
+import httpx
+from pathlib import Path
+from loguru import logger
+from typing import Optional, Dict, Any, List, Callable, Iterator, Union, Awaitable
+from local_ai.config import config
+from local_ai.http_client import AsyncHTTPClient, get_async_http_client, upstream_base_url, CircuitOpenError
+
+JOB_STATUSES = ("queued", "running", "completed", "failed", "cancelled")
+
+# llama-server endpoints a batch line may target
+BATCH_ENDPOINTS = ("/v1/chat/completions", "/v1/completions", "/v1/embeddings", "/completion", "/embedding")
+
+
+class BatchJobError(Exception):
+    """Exception raised for invalid batch input or unknown jobs."""
+    pass
+
+
+class JobStore:
+    """
+    On-disk batch job queue.
+
+    Each job lives in its own directory under BATCH_DIR::
+
+        <job_id>/input.jsonl    one request per line: {"custom_id", "url", "body"}
+        <job_id>/output.jsonl   one result per line, in completion order, tagged with its input line
+        <job_id>/state.json     status, counts and throughput, rewritten atomically
+
+    ``output.jsonl`` doubles as the checkpoint: a resumed job skips every input line
+    that already has a result.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or config.file_paths.BATCH_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _job_dir(self, job_id: str) -> Path:
+        job_dir = self.root / job_id
+        if not (job_dir / "state.json").exists():
+            raise BatchJobError(f"Unknown batch job: {job_id}")
+        return job_dir
+
+    def create_job(self, input_path: str, default_url: str = "/v1/chat/completions") -> Dict[str, Any]:
+        """
+        Queue a JSONL file of requests as a new job.
+
+        Lines may omit ``url`` (``default_url`` is used) and ``custom_id`` (the
+        request's index in the file is used). The whole file is validated before the job is queued.
+
+        Args:
+            input_path: JSONL file to copy into the job directory
+            default_url: Endpoint for lines without a ``url``
+
+        Returns:
+            Dict[str, Any]: Initial job state
+
+        Raises:
+            BatchJobError: If a line is not a JSON object or targets an unsupported endpoint
+        """
+        total = 0
+        with open(input_path, "r") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    raise BatchJobError(f"Line {line_number} is not valid JSON: {e}")
+                if not isinstance(request, dict) or not isinstance(request.get("body", {}), dict):
+                    raise BatchJobError(f"Line {line_number} must be an object with an object 'body'")
+                if request.get("url", default_url) not in BATCH_ENDPOINTS:
+                    raise BatchJobError(f"Line {line_number} targets unsupported endpoint {request.get('url')}")
+                total += 1
+        if not total:
+            raise BatchJobError(f"No requests in {input_path}")
+
+        job_id = f"batch_{uuid.uuid4().hex[:16]}"
+        job_dir = self.root / job_id
+        job_dir.mkdir(parents=True)
+        shutil.copyfile(input_path, job_dir / "input.jsonl")
+        (job_dir / "output.jsonl").touch()
+        state = {
+            "id": job_id,
+            "status": "queued",
+            "default_url": default_url,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "total": total,
+            "completed": 0,
+            "failed": 0,
+            "tokens": 0,
+            "active_seconds": 0.0,
+        }
+        self.save_state(state)
+        logger.info(f"Queued batch job {job_id} with {total} requests")
+        return state
+
+    def save_state(self, state: Dict[str, Any]) -> None:
+        path = self.root / state["id"] / "state.json"
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        temp_path.replace(path)
+
+    def load_state(self, job_id: str) -> Dict[str, Any]:
+        with open(self._job_dir(job_id) / "state.json", "r") as f:
+            return json.load(f)
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        """Get a job's state with derived throughput figures."""
+        state = self.load_state(job_id)
+        active = state.get("active_seconds") or 0
+        done = state["completed"] + state["failed"]
+        state["requests_per_second"] = round(done / active, 2) if active else 0.0
+        state["tokens_per_second"] = round(state.get("tokens", 0) / active, 1) if active else 0.0
+        state["output_path"] = str(self.root / job_id / "output.jsonl")
+        return state
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """All jobs, oldest first."""
+        jobs = []
+        for job_dir in self.root.iterdir():
+            if (job_dir / "state.json").exists():
+                try:
+                    jobs.append(self.get_job(job_dir.name))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Skipping unreadable batch job {job_dir.name}: {e}")
+        return sorted(jobs, key=lambda job: job["created_at"])
+
+    def next_job(self) -> Optional[Dict[str, Any]]:
+        """Oldest job that still has work; interrupted running jobs come first."""
+        pending = [job for job in self.list_jobs() if job["status"] in ("running", "queued")]
+        pending.sort(key=lambda job: (job["status"] != "running", job["created_at"]))
+        return pending[0] if pending else None
+
+    def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        state = self.load_state(job_id)
+        if state["status"] in ("queued", "running"):
+            state["status"] = "cancelled"
+            state["finished_at"] = time.time()
+            self.save_state(state)
+        return state
+
+    def completed_lines(self, job_id: str) -> Dict[int, bool]:
+        """
+        Input lines that already have a result, mapped to whether the request succeeded.
+
+        A torn final record left by a crash mid-write is cut off so appending resumes
+        on a line boundary.
+        """
+        output_path = self._job_dir(job_id) / "output.jsonl"
+        done: Dict[int, bool] = {}
+        valid_bytes = 0
+        with open(output_path, "rb") as f:
+            for raw in f:
+                try:
+                    record = json.loads(raw)
+                    done[record["line"]] = "error" not in record
+                except (ValueError, KeyError):
+                    break
+                valid_bytes += len(raw)
+        if valid_bytes != output_path.stat().st_size:
+            logger.warning(f"Truncating partial record in {output_path}")
+            with open(output_path, "r+b") as f:
+                f.truncate(valid_bytes)
+        return done
+
+    def iter_requests(self, job_id: str, default_url: str) -> Iterator[tuple]:
+        """Yield ``(line, custom_id, url, body)`` for every request in the job's input."""
+        with open(self._job_dir(job_id) / "input.jsonl", "r") as f:
+            line = 0
+            for raw in f:
+                if not raw.strip():
+                    continue
+                request = json.loads(raw)
+                yield line, request.get("custom_id", str(line)), request.get("url", default_url), request.get("body", {})
+                line += 1
+
+
+class BatchWorker:
+    """
+    Stream queued batch jobs through llama-server.
+
+    Up to ``concurrency`` requests are in flight at once (default: the server's
+    parallel slots). Batch traffic has lower priority than interactive traffic: before
+    each request the worker waits while ``interactive_busy()`` (sync or async) reports
+    interactive work. By default that is ``slots_busy()``, which asks llama-server's
+    ``/slots`` endpoint whether more slots are processing than this worker has
+    requests in flight. Progress
+    is flushed to disk every BATCH_CHECKPOINT_INTERVAL results, so a restarted worker
+    resumes where the previous one stopped.
+    """
+
+    def __init__(self, service_info: Dict[str, Any], store: Optional[JobStore] = None,
+                 concurrency: Optional[int] = None,
+                 interactive_busy: Optional[Callable[[], Union[bool, Awaitable[bool]]]] = None,
+                 client: Optional[AsyncHTTPClient] = None):
+        self.base_url = upstream_base_url(service_info)
+        self.uds = service_info.get("upstream_socket")
+        self.store = store or JobStore()
+        self.concurrency = concurrency or config.performance.BATCH_CONCURRENCY or service_info.get("parallel_slots", 1)
+        self.interactive_busy = interactive_busy or self.slots_busy
+        self._client = client
+        self._running = True
+        self._in_flight = 0
+        self._slots_busy = False
+        self._slots_checked_at = 0.0
+
+    def stop(self, *_) -> None:
+        self._running = False
+
+    async def slots_busy(self) -> bool:
+        """
+        Whether llama-server is serving interactive requests, per its ``/slots`` endpoint.
+
+        Slots processing beyond this worker's own in-flight requests belong to
+        interactive clients. The answer is cached for BATCH_YIELD_INTERVAL; if the
+        endpoint is unavailable (``--no-slots``) the worker never yields.
+        """
+        now = time.monotonic()
+        if now - self._slots_checked_at < config.performance.BATCH_YIELD_INTERVAL:
+            return self._slots_busy
+        self._slots_checked_at = now
+        client = self._client or get_async_http_client(self.uds)
+        try:
+            response = await client.get(f"{self.base_url}/slots", retries=1, use_breaker=False)
+            slots = response.json() if response.status_code == 200 else None
+        except (httpx.HTTPError, CircuitOpenError, ValueError):
+            slots = None
+        if not isinstance(slots, list):
+            self._slots_busy = False
+            return False
+        # Newer llama-server reports is_processing, older ones state 1
+        processing = sum(1 for slot in slots if slot.get("is_processing") or slot.get("state") == 1)
+        self._slots_busy = processing > self._in_flight
+        return self._slots_busy
+
+    async def _yield_to_interactive(self) -> None:
+        while self._running:
+            busy = self.interactive_busy()
+            if inspect.isawaitable(busy):
+                busy = await busy
+            if not busy:
+                return
+            await asyncio.sleep(config.performance.BATCH_YIELD_INTERVAL)
+
+    async def _send(self, url: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        client = self._client or get_async_http_client(self.uds)
+        self._in_flight += 1
+        try:
+            response = await client.post(f"{self.base_url}{url}", json=body)
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            return {"error": {"message": str(e)[:500]}}
+        finally:
+            self._in_flight -= 1
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = response.text
+        result = {"response": {"status_code": response.status_code, "body": payload}}
+        if response.status_code >= 400:
+            result["error"] = {"message": f"Upstream returned {response.status_code}"}
+        return result
+
+    @staticmethod
+    def _count_tokens(result: Dict[str, Any]) -> int:
+        body = result.get("response", {}).get("body")
+        if not isinstance(body, dict):
+            return 0
+        usage = body.get("usage") or {}
+        if usage:
+            return usage.get("total_tokens", 0)
+        return body.get("tokens_evaluated", 0) + body.get("tokens_predicted", 0)
+
+    async def run_job(self, job_id: str) -> Dict[str, Any]:
+        """
+        Run (or resume) one job to completion or until the worker is stopped.
+
+        Returns:
+            Dict[str, Any]: Final job state
+        """
+        state = self.store.load_state(job_id)
+        if state["status"] not in ("queued", "running"):
+            return state
+        done = self.store.completed_lines(job_id)
+        # The output file is the source of truth; counts in state.json may lag behind it after a crash
+        state["completed"] = sum(done.values())
+        state["failed"] = len(done) - state["completed"]
+        state["status"] = "running"
+        state["started_at"] = state["started_at"] or time.time()
+        self.store.save_state(state)
+        if done:
+            logger.info(f"Resuming batch job {job_id}: {len(done)}/{state['total']} already done")
+
+        output = open(self.store.root / job_id / "output.jsonl", "a")
+        semaphore = asyncio.Semaphore(self.concurrency)
+        unflushed = 0
+        resumed_at = time.time()
+        active_before = state.get("active_seconds", 0.0)
+
+        def checkpoint() -> None:
+            nonlocal unflushed
+            output.flush()
+            os.fsync(output.fileno())
+            state["active_seconds"] = active_before + time.time() - resumed_at
+            # Pick up a cancellation written by another process instead of overwriting it
+            if self.store.load_state(job_id)["status"] == "cancelled":
+                state["status"] = "cancelled"
+            self.store.save_state(state)
+            unflushed = 0
+
+        async def process(line: int, custom_id: str, url: str, body: Dict[str, Any]) -> None:
+            nonlocal unflushed
+            try:
+                await self._yield_to_interactive()
+                if not self._running:
+                    return
+                result = await self._send(url, body)
+                output.write(json.dumps({"line": line, "custom_id": custom_id, **result}) + "\n")
+                state["failed" if "error" in result else "completed"] += 1
+                state["tokens"] = state.get("tokens", 0) + self._count_tokens(result)
+                unflushed += 1
+                if unflushed >= config.performance.BATCH_CHECKPOINT_INTERVAL:
+                    checkpoint()
+            finally:
+                semaphore.release()
+
+        tasks = set()
+        try:
+            for line, custom_id, url, body in self.store.iter_requests(job_id, state["default_url"]):
+                if line in done:
+                    continue
+                await semaphore.acquire()
+                if not self._running or state["status"] == "cancelled":
+                    semaphore.release()
+                    break
+                task = asyncio.create_task(process(line, custom_id, url, body))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            checkpoint()
+            output.close()
+
+        if state["status"] == "cancelled":
+            state["finished_at"] = state.get("finished_at") or time.time()
+        elif state["completed"] + state["failed"] >= state["total"]:
+            state["status"] = "completed" if state["completed"] else "failed"
+            state["finished_at"] = time.time()
+        self.store.save_state(state)
+        final = self.store.get_job(job_id)
+        logger.info(f"Batch job {job_id} {final['status']}: {final['completed']} ok, {final['failed']} failed, "
+                    f"{final['requests_per_second']} req/s, {final['tokens_per_second']} tok/s")
+        return final
+
+    async def run(self) -> None:
+        """Process queued jobs until stopped."""
+        logger.info(f"Batch worker started with concurrency {self.concurrency}")
+        while self._running:
+            job = self.store.next_job()
+            if job is None:
+                await asyncio.sleep(config.performance.BATCH_POLL_INTERVAL)
+                continue
+            try:
+                await self.run_job(job["id"])
+            except Exception as e:
+                logger.error(f"Batch job {job['id']} failed: {str(e)}", exc_info=True)
+                job = self.store.load_state(job["id"])
+                job["status"] = "failed"
+                job["finished_at"] = time.time()
+                self.store.save_state(job)
+
+
+def main() -> None:
+    """Run a standalone batch worker against the running service."""
+    from local_ai.core import AutonomousLocalAIManager
+    service_info = AutonomousLocalAIManager().get_service_info()
+    worker = BatchWorker(service_info)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    asyncio.run(worker.run())
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import time
+import asyncio
+from loguru import logger
+from typing import Optional, Dict, Any, AsyncIterator, Callable, Awaitable
+from local_ai.config import config
+from local_ai.streams import count_sse_events
+
+IsDisconnected = Callable[[], Awaitable[bool]]
+
+
+class ClientDisconnectedError(Exception):
+    """Exception raised when the client went away before its response was ready."""
+    pass
+
+
+def token_budget(body: Dict[str, Any]) -> int:
+    """Tokens a request may generate: its max_tokens / n_predict, else DEFAULT_MAX_TOKENS."""
+    for key in ("max_completion_tokens", "max_tokens", "n_predict"):
+        value = body.get(key)
+        if isinstance(value, int) and value > 0:
+            return value
+    return config.model.DEFAULT_MAX_TOKENS
+
+
+class CancellationStats:
+    """Counters for generations cut short because their client disconnected."""
+
+    def __init__(self):
+        self.cancelled_streams = 0
+        self.cancelled_requests = 0
+        self.generated_tokens = 0
+        self.reclaimed_tokens = 0
+
+    def record(self, streaming: bool, budget: int, generated: int) -> int:
+        """Count one cancellation; returns the reclaimed (never decoded) token budget."""
+        reclaimed = max(budget - generated, 0)
+        if streaming:
+            self.cancelled_streams += 1
+        else:
+            self.cancelled_requests += 1
+        self.generated_tokens += generated
+        self.reclaimed_tokens += reclaimed
+        return reclaimed
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "cancelled_streams": self.cancelled_streams,
+            "cancelled_requests": self.cancelled_requests,
+            "generated_tokens": self.generated_tokens,
+            "reclaimed_tokens": self.reclaimed_tokens,
+        }
+
+
+_cancellation_stats: Optional[CancellationStats] = None
+
+
+def get_cancellation_stats() -> CancellationStats:
+    """Get the process-wide cancellation counters."""
+    global _cancellation_stats
+    if _cancellation_stats is None:
+        _cancellation_stats = CancellationStats()
+    return _cancellation_stats
+
+
+async def wait_for_disconnect(is_disconnected: IsDisconnected, interval: Optional[float] = None) -> None:
+    """Return once ``is_disconnected()`` (e.g. Starlette's ``request.is_disconnected``) reports true."""
+    interval = interval or config.performance.DISCONNECT_POLL_INTERVAL
+    while not await is_disconnected():
+        await asyncio.sleep(interval)
+
+
+async def guard_stream(chunks: AsyncIterator[bytes], is_disconnected: IsDisconnected, budget: int,
+                       count_tokens: Callable[[bytes], int] = count_sse_events,
+                       stats: Optional[CancellationStats] = None) -> AsyncIterator[bytes]:
+    """
+    Proxy an upstream stream and abort it as soon as the client disconnects.
+
+    Disconnects are noticed both when the server framework stops consuming this
+    generator and by polling ``is_disconnected`` while waiting for the next chunk,
+    which covers long prompt processing before the first token. Either way the
+    upstream iterator is closed; pass a generator that owns the upstream response
+    (``async with client.stream(...)``) so closing it closes the connection, which
+    makes llama-server stop decoding and frees the slot.
+
+    Args:
+        chunks: Upstream byte chunks
+        is_disconnected: Async callable reporting whether the client has gone
+        budget: Token budget of the request (``token_budget(body)``)
+        count_tokens: Counts tokens in a chunk (default: SSE events)
+        stats: Counters to update (default: process-wide)
+    """
+    stats = stats or get_cancellation_stats()
+    iterator = chunks.__aiter__()
+    disconnected = asyncio.ensure_future(wait_for_disconnect(is_disconnected))
+    generated = 0
+    finished = False
+    client_gone = False
+    try:
+        while True:
+            next_chunk = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait({next_chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if next_chunk not in done:
+                next_chunk.cancel()
+                client_gone = True
+                break
+            try:
+                chunk = next_chunk.result()
+            except StopAsyncIteration:
+                finished = True
+                break
+            generated += count_tokens(chunk)
+            yield chunk
+    except (GeneratorExit, asyncio.CancelledError):
+        # The server stopped consuming or cancelled the response: the client is gone
+        client_gone = True
+        raise
+    finally:
+        disconnected.cancel()
+        if not finished:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except (RuntimeError, asyncio.CancelledError):
+                    # Already closed by the cancelled read
+                    pass
+        if client_gone:
+            reclaimed = stats.record(True, budget, generated)
+            logger.info(f"Client disconnected after {generated} tokens, upstream stream closed "
+                        f"({reclaimed} tokens of budget reclaimed)")
+
+
+async def guard_request(request: Callable[[], Awaitable[Any]], is_disconnected: IsDisconnected, budget: int,
+                        tokens_per_second: Optional[float] = None,
+                        stats: Optional[CancellationStats] = None) -> Any:
+    """
+    Run a non-streaming upstream request, cancelling it if the client disconnects first.
+
+    Cancelling the request task aborts the httpx request, which closes the upstream
+    connection; llama-server then drops the task instead of finishing the completion.
+
+    Args:
+        request: Starts the upstream request and returns its result
+        is_disconnected: Async callable reporting whether the client has gone
+        budget: Token budget of the request (``token_budget(body)``)
+        tokens_per_second: Decode speed to estimate tokens generated before the
+            cancel (e.g. the catalog's measured value); None counts none
+        stats: Counters to update (default: process-wide)
+
+    Raises:
+        ClientDisconnectedError: If the client disconnected before the response
+    """
+    stats = stats or get_cancellation_stats()
+    started = time.time()
+    task = asyncio.ensure_future(request())
+    disconnected = asyncio.ensure_future(wait_for_disconnect(is_disconnected))
+    try:
+        done, _ = await asyncio.wait({task, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        disconnected.cancel()
+    if task in done:
+        return task.result()
+
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    except Exception:
+        # The request failed while being cancelled; the client is gone either way
+        pass
+    elapsed = time.time() - started
+    generated = min(int(elapsed * tokens_per_second), budget) if tokens_per_second else 0
+    reclaimed = stats.record(False, budget, generated)
+    logger.info(f"Client disconnected after {elapsed:.1f}s, upstream request aborted "
+                f"({reclaimed} tokens of budget reclaimed)")
+    raise ClientDisconnectedError("Client disconnected")
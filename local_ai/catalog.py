@@ -0,0 +1,356 @@
+import os
+import copy
+import json
+import time
+import fcntl
+import hashlib
+from pathlib import Path
+from loguru import logger
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Set, Iterator
+from local_ai.config import config
+from local_ai.model import MODELS
+from local_ai.gguf import read_gguf_header, summarize_gguf_header, GGUFError
+
+CATALOG_VERSION = 1
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def infer_family(model_name: str) -> Optional[str]:
+    """Infer the model family from its name, matching _build_model_command() ordering."""
+    name = model_name.lower()
+    for family in ("gemma-3n", "gemma-3", "lfm2", "devstral-small", "qwen25", "qwen3", "llama"):
+        if family in name:
+            return family
+    return None
+
+
+class ModelCatalog:
+    """
+    Model registry backed by a local JSON file with in-memory indexes.
+
+    Built-in entries come from ``local_ai.model.MODELS``; the catalog file adds
+    user entries and per-file facts (size, sha256, GGUF header fields, measured
+    tokens/s) so they are computed once per file instead of on every launch.
+
+    The CLI, the daemon and the API may hold catalogs on the same file. Changes
+    are made under an exclusive ``flock`` after re-reading the file, so one
+    process never writes back another's stale copy, and ``reload_if_changed()``
+    (called by ``get_catalog()``) picks up other processes' writes.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the catalog.
+
+        Args:
+            path: Catalog file path (default MODEL_CATALOG_FILE)
+        """
+        self.path = Path(path or config.file_paths.MODEL_CATALOG_FILE)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._by_family: Dict[str, Set[str]] = defaultdict(set)
+        self._by_task: Dict[str, Set[str]] = defaultdict(set)
+        self._by_quant: Dict[str, Set[str]] = defaultdict(set)
+        self._stamp: Optional[tuple] = None
+        self._load()
+
+    def _file_stamp(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def reload_if_changed(self) -> None:
+        """Re-read the catalog file if another process wrote it since it was loaded."""
+        if self._file_stamp() != self._stamp:
+            self._load()
+
+    def _load(self) -> None:
+        """Load built-in entries and overlay the catalog file."""
+        entries = {}
+        self._stamp = self._file_stamp()
+        for name, entry in MODELS.items():
+            entries[name] = copy.deepcopy(entry)
+            entries[name]["source"] = "builtin"
+
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    stored = json.load(f)
+                for name, entry in stored.get("entries", {}).items():
+                    if entry.get("source") == "builtin":
+                        # Built-in definitions win; only the cached facts and user adapters are kept
+                        if name in entries:
+                            entries[name]["facts"] = entry.get("facts", {})
+                            if entry.get("loras"):
+                                entries[name]["loras"] = entry["loras"]
+                    else:
+                        entries[name] = entry
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable model catalog {self.path}: {e}")
+
+        for name, entry in entries.items():
+            entry.setdefault("family", infer_family(name))
+            entry.setdefault("facts", {})
+        self._entries = entries
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self._by_family.clear()
+        self._by_task.clear()
+        self._by_quant.clear()
+        for name, entry in self._entries.items():
+            if entry.get("family"):
+                self._by_family[entry["family"]].add(name)
+            self._by_task[entry.get("task", "chat")].add(name)
+            for quant in entry.get("quants", {}) or [entry.get("quant")]:
+                if quant:
+                    self._by_quant[quant].add(name)
+
+    @contextmanager
+    def _update(self) -> Iterator[None]:
+        """
+        Apply a change on top of the current file contents and write it back.
+
+        The file is locked, re-read if it changed, and saved after the body runs,
+        so concurrent writers in other processes are merged instead of overwritten.
+        Entries fetched before entering must be looked up again inside.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.reload_if_changed()
+            yield
+            self._save()
+
+    def _save(self) -> None:
+        """Atomically write the catalog file; callers hold the lock from ``_update()``."""
+        data = {"version": CATALOG_VERSION, "entries": self._entries}
+        temp_path = self.path.with_suffix(".tmp")
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(data, f, indent=2)
+            temp_path.replace(self.path)
+            self._stamp = self._file_stamp()
+        except OSError as e:
+            logger.error(f"Failed to save model catalog {self.path}: {e}")
+            temp_path.unlink(missing_ok=True)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        return self._entries[name]
+
+    def names(self) -> List[str]:
+        """All model names in registry order."""
+        return list(self._entries)
+
+    def items(self):
+        return self._entries.items()
+
+    def get(self, name: str, default: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Get a catalog entry by name."""
+        return self._entries.get(name, default)
+
+    def by_family(self, family: str) -> List[str]:
+        """Model names in a family."""
+        return sorted(self._by_family.get(family, ()))
+
+    def by_task(self, task: str) -> List[str]:
+        """Model names serving a task (chat, embed, image-generation)."""
+        return sorted(self._by_task.get(task, ()))
+
+    def by_quant(self, quant: str) -> List[str]:
+        """Model names published in a quantization variant."""
+        return sorted(self._by_quant.get(quant, ()))
+
+    def add_entry(self, name: str, repo: str, file: str, task: str = "chat", **fields: Any) -> Dict[str, Any]:
+        """
+        Add or replace a user-defined catalog entry.
+
+        Args:
+            name: Model name used on the command line
+            repo: Hugging Face repo ID
+            file: GGUF file name in the repo
+            task: Model task (default "chat")
+            **fields: Extra registry fields (ram, quant, quants, draft, family, params)
+
+        Returns:
+            Dict[str, Any]: The stored entry
+
+        Raises:
+            ValueError: If the name collides with a built-in entry
+        """
+        with self._update():
+            existing = self._entries.get(name)
+            if existing and existing.get("source") == "builtin":
+                raise ValueError(f"Model '{name}' is a built-in registry entry")
+
+            entry = {"repo": repo, "file": file, "task": task, **fields}
+            entry["source"] = "user"
+            entry.setdefault("family", infer_family(name))
+            entry.setdefault("facts", existing.get("facts", {}) if existing else {})
+            self._entries[name] = entry
+            self._reindex()
+        return entry
+
+    def remove_entry(self, name: str) -> bool:
+        """Remove a user-defined entry. Built-in entries cannot be removed."""
+        with self._update():
+            entry = self._entries.get(name)
+            if not entry or entry.get("source") == "builtin":
+                return False
+            del self._entries[name]
+            self._reindex()
+        return True
+
+    def add_lora(self, name: str, adapter: str, file: str, repo: Optional[str] = None, scale: float = 1.0) -> Dict[str, Any]:
+        """
+        Register a GGUF LoRA adapter for a chat model.
+
+        Adapters are loaded once when llama-server starts and selected per request,
+        so several fine-tunes share one copy of the base weights.
+
+        Args:
+            name: Base model name in the catalog
+            adapter: Adapter name used in requests
+            file: GGUF adapter file name in the repo
+            repo: Hugging Face repo ID (default: the base model's repo)
+            scale: Scale applied when a request selects the adapter without one
+
+        Returns:
+            Dict[str, Any]: The stored adapter entry
+
+        Raises:
+            ValueError: If the model is unknown or does not serve chat
+        """
+        with self._update():
+            entry = self._entries.get(name)
+            if not entry:
+                raise ValueError(f"Model '{name}' is not in the catalog")
+            if entry.get("task", "chat") != "chat":
+                raise ValueError(f"LoRA adapters are only supported for chat models, '{name}' is {entry['task']}")
+            lora = {"repo": repo or entry["repo"], "file": file, "scale": scale}
+            entry.setdefault("loras", {})[adapter] = lora
+        # Adapters are baked into the launch command
+        from local_ai.launch_plan import invalidate_launch_plan
+        invalidate_launch_plan()
+        return lora
+
+    def remove_lora(self, name: str, adapter: str) -> bool:
+        """Remove a registered LoRA adapter."""
+        with self._update():
+            loras = self._entries.get(name, {}).get("loras", {})
+            if adapter not in loras:
+                return False
+            del loras[adapter]
+        from local_ai.launch_plan import invalidate_launch_plan
+        invalidate_launch_plan()
+        return True
+
+    def get_facts(self, name: str, file_name: Optional[str] = None) -> Dict[str, Any]:
+        """Get cached facts for a model file (default: the entry's default file)."""
+        entry = self._entries.get(name)
+        if not entry:
+            return {}
+        return entry["facts"].get(file_name or entry["file"], {})
+
+    def refresh_facts(self, name: str, local_path: str, compute_sha256: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Compute facts for a downloaded model file, reusing cached ones while unchanged.
+
+        The file is only re-read when its size or mtime differs from the cached
+        fingerprint, so repeated launches cost a single stat call.
+
+        Args:
+            name: Model name in the catalog
+            local_path: Path to the model file on disk
+            compute_sha256: Hash the file contents (default CATALOG_HASH_FILES)
+
+        Returns:
+            Dict[str, Any]: Facts for the file
+        """
+        entry = self._entries.get(name)
+        if not entry:
+            return {}
+        if compute_sha256 is None:
+            compute_sha256 = config.file_paths.CATALOG_HASH_FILES
+
+        stat = os.stat(local_path)
+        file_name = os.path.basename(local_path)
+        facts = entry["facts"].get(file_name, {})
+        fingerprint = [stat.st_size, stat.st_mtime_ns]
+        if facts.get("fingerprint") == fingerprint and (facts.get("sha256") or not compute_sha256):
+            return facts
+
+        logger.info(f"Computing catalog facts for {local_path}")
+        measured = {k: v for k, v in facts.items() if k.startswith("measured_")}
+        facts = {"fingerprint": fingerprint, "size": stat.st_size, **measured}
+        try:
+            facts["gguf"] = summarize_gguf_header(read_gguf_header(local_path))
+        except (GGUFError, OSError) as e:
+            logger.debug(f"No GGUF header facts for {local_path}: {e}")
+        if compute_sha256:
+            facts["sha256"] = self._sha256(local_path)
+
+        with self._update():
+            entry = self._entries.get(name)
+            if entry:
+                entry["facts"][file_name] = facts
+        return facts
+
+    def record_tokens_per_second(self, name: str, file_name: str, tokens_per_second: float, samples: int) -> None:
+        """Record measured decode speed for a model file on this host (running average)."""
+        if name not in self._entries or samples <= 0:
+            return
+        with self._update():
+            entry = self._entries.get(name)
+            if not entry:
+                return
+            facts = entry["facts"].setdefault(file_name, {})
+            previous = facts.get("measured_tokens", 0)
+            total = previous + samples
+            average = facts.get("measured_tokens_per_second", 0.0)
+            facts["measured_tokens_per_second"] = (average * previous + tokens_per_second * samples) / total
+            facts["measured_tokens"] = total
+            facts["measured_at"] = time.time()
+
+    def record_load_seconds(self, name: str, file_name: str, seconds: float) -> None:
+        """Record how long loading a model file took on this host (exponential moving average)."""
+        if name not in self._entries or seconds <= 0:
+            return
+        with self._update():
+            entry = self._entries.get(name)
+            if not entry:
+                return
+            facts = entry["facts"].setdefault(file_name, {})
+            previous = facts.get("measured_load_seconds")
+            facts["measured_load_seconds"] = seconds if previous is None else 0.7 * previous + 0.3 * seconds
+            facts["measured_loads"] = facts.get("measured_loads", 0) + 1
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+_catalog: Optional[ModelCatalog] = None
+
+
+def get_catalog() -> ModelCatalog:
+    """Get the process-wide model catalog, loading it on first use and re-reading it when the file changed."""
+    global _catalog
+    if _catalog is None:
+        _catalog = ModelCatalog()
+    else:
+        _catalog.reload_if_changed()
+    return _catalog
@@ -5,11 +5,15 @@ from rich.panel import Panel
 from rich.text import Text
 from rich.table import Table
 from rich import print as rprint
-from local_ai.model import MODELS
+from local_ai.catalog import get_catalog
 from local_ai.core import AutonomousLocalAIManager, ServiceStartError, ModelNotFoundError
     
 from local_ai import __version__
 from local_ai.download import download_model_from_hf
+from local_ai.quant import select_quant
+from local_ai.batch import JobStore, BatchJobError
+from local_ai.config import config
+from local_ai.daemon import ensure_daemon, DaemonClient, DaemonError
 
 def print_banner():
     """Display a beautiful banner for the CLI"""
@@ -60,10 +64,25 @@ def show_available_models():
     console = Console()
     table = Table(title="🤖 Available Preserved Models", border_style="cyan")
     table.add_column("Model Name", style="bold magenta", justify="left")
-    table.add_column("Hash", style="dim", justify="left")
+    table.add_column("Task", justify="left")
+    table.add_column("Family", justify="left")
+    table.add_column("Quants", justify="left")
+    table.add_column("RAM (GB)", justify="right")
+    table.add_column("Tok/s", justify="right")
+    table.add_column("Source", style="dim", justify="left")
     
-    for model_name, model_hash in MODELS.items():
-        table.add_row(model_name, model_hash[:16] + "...")
+    for model_name, entry in get_catalog().items():
+        facts = get_catalog().get_facts(model_name)
+        tokens_per_second = facts.get("measured_tokens_per_second")
+        table.add_row(
+            model_name,
+            entry.get("task", "chat"),
+            entry.get("family") or "-",
+            ", ".join(entry.get("quants", {}) or [entry.get("quant") or "-"]),
+            str(entry.get("ram") or "-"),
+            f"{tokens_per_second:.1f}" if tokens_per_second else "-",
+            entry.get("source", "user")
+        )
         
     console.print(table)
 
@@ -117,7 +136,11 @@ def parse_args():
     download_parser.add_argument(
         "model_name",
         help="The name of the model to download",
-        choices=MODELS.keys()
+        choices=get_catalog().names()
+    )
+    download_parser.add_argument(
+        "--quant",
+        help="Quantization variant such as Q4_K_M (default: selected from host RAM and tokens/s target)"
     )
     
     # Add a subparser for the "run" command
@@ -144,6 +167,133 @@ def parse_args():
         type=int,
         help="Context length for the model (default from config)"
     )
+    run_parser.add_argument(
+        "--quant",
+        help="Quantization variant such as Q4_K_M (default: selected from host RAM and tokens/s target)"
+    )
+    run_parser.add_argument(
+        "--speculative",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Use the registered draft model for speculative decoding (default from config)"
+    )
+    run_parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of API worker processes (default from config)"
+    )
+    run_parser.add_argument(
+        "--replan",
+        action="store_true",
+        help="Ignore the saved launch plan and resolve models and commands again"
+    )
+    
+    # Add a subparser for the "list" command
+    model_subparsers.add_parser(
+        "list",
+        help="List models in the catalog",
+        description="List built-in and user-added models in the catalog"
+    )
+    
+    # Add a subparser for the "add" command
+    add_parser = model_subparsers.add_parser(
+        "add",
+        help="Add a GGUF model from the Hugging Face Hub to the catalog",
+        description="Add a user-defined model entry to the local catalog"
+    )
+    add_parser.add_argument("model_name", help="Name to register the model under")
+    add_parser.add_argument("--repo", required=True, help="Hugging Face repo ID")
+    add_parser.add_argument("--file", required=True, help="GGUF file name in the repo")
+    add_parser.add_argument("--task", default="chat", choices=["chat", "embed", "image-generation"], help="Model task")
+    add_parser.add_argument("--family", help="Model family (default: inferred from the name)")
+    add_parser.add_argument("--ram", type=float, help="Estimated RAM in GB")
+    add_parser.add_argument("--quant", help="Quantization of the file (e.g. Q4_K_M)")
+    
+    # Add a subparser for the "add-lora" command
+    add_lora_parser = model_subparsers.add_parser(
+        "add-lora",
+        help="Register a GGUF LoRA adapter for a chat model",
+        description="Register a LoRA adapter that is loaded with the model and selected per request"
+    )
+    add_lora_parser.add_argument("model_name", help="Base model in the catalog")
+    add_lora_parser.add_argument("adapter_name", help="Adapter name used in requests")
+    add_lora_parser.add_argument("--file", required=True, help="GGUF adapter file name in the repo")
+    add_lora_parser.add_argument("--repo", help="Hugging Face repo ID (default: the base model's repo)")
+    add_lora_parser.add_argument("--scale", type=float, default=1.0, help="Default scale when a request selects the adapter")
+    
+    # Add a subparser for the "reload-api" command
+    model_subparsers.add_parser(
+        "reload-api",
+        help="Restart the API gateway without dropping open streams",
+        description="Start a new API process on the same port and drain the old one"
+    )
+    
+    # Add a subparser for the "stop" command
+    stop_parser = model_subparsers.add_parser(
+        "stop",
+        help="Stop the running service",
+        description="Stop the AI server and API processes"
+    )
+    stop_parser.add_argument("--force", action="store_true", help="Kill processes that do not exit gracefully")
+    
+    # Add a subparser for the "switch" command
+    switch_parser = model_subparsers.add_parser(
+        "switch",
+        help="Switch the running service to another of its models",
+        description="Load one of the service's on-demand models in place of the active one"
+    )
+    switch_parser.add_argument("model", help="Model name passed to 'model run'")
+    
+    # Add a subparser for the "status" command
+    model_subparsers.add_parser(
+        "status",
+        help="Show the running service and manager daemon",
+        description="Show the state of the running service and the manager daemon"
+    )
+    
+    # Add a subparser for the "shutdown-daemon" command
+    shutdown_parser = model_subparsers.add_parser(
+        "shutdown-daemon",
+        help="Stop the manager daemon",
+        description="Stop the manager daemon, and with it the running service"
+    )
+    shutdown_parser.add_argument("--keep-service", action="store_true", help="Leave the service processes running")
+    
+    # Add a subparser for the "draft-report" command
+    model_subparsers.add_parser(
+        "draft-report",
+        help="Show measured speculative decoding accept rates",
+        description="Show the draft model accept rate recorded for each model"
+    )
+    
+    # Add a subparser for the "batch-submit" command
+    batch_submit_parser = model_subparsers.add_parser(
+        "batch-submit",
+        help="Queue a JSONL file of requests as a batch job",
+        description="Queue a JSONL file of {custom_id, url, body} requests for offline processing"
+    )
+    batch_submit_parser.add_argument("input_file", help="JSONL file with one request per line")
+    batch_submit_parser.add_argument(
+        "--url",
+        default="/v1/chat/completions",
+        help="Endpoint for lines without a url (default: /v1/chat/completions)"
+    )
+    
+    # Add a subparser for the "batch-status" command
+    batch_status_parser = model_subparsers.add_parser(
+        "batch-status",
+        help="Show batch job progress and throughput",
+        description="Show the status of one or all batch jobs"
+    )
+    batch_status_parser.add_argument("job_id", nargs="?", help="Job ID (default: all jobs)")
+    
+    # Add a subparser for the "batch-cancel" command
+    batch_cancel_parser = model_subparsers.add_parser(
+        "batch-cancel",
+        help="Cancel a queued or running batch job",
+        description="Cancel a batch job; a running worker stops it at its next checkpoint"
+    )
+    batch_cancel_parser.add_argument("job_id", help="Job ID")
     
     return parser.parse_known_args()
 
@@ -151,7 +301,12 @@ def handle_download(args):
     """Handle model download with beautiful output"""
     print_info(f"Starting download for model: {args.model_name}")
     try:
-        download_model_from_hf(args.model_name)
+        quant = select_quant(args.model_name, requested=args.quant)
+        print_info(f"Using quantization: {quant}")
+        success, _ = download_model_from_hf(args.model_name, quant=quant)
+        if not success:
+            print_error("Download failed")
+            sys.exit(1)
         print_success("Model downloaded successfully!")
     except Exception as e:
         print_error(f"Download failed: {str(e)}")
@@ -161,29 +316,37 @@ def handle_run(args):
     """Handle model run command with beautiful output"""
     print_info(f"Starting AutonomousLocalAI service with models: {args.models}")
     
-    # Validate that model names exist in the MODELS dict
+    # Validate that model names exist in the catalog
+    catalog = get_catalog()
     model_list = [m.strip() for m in args.models.split(',') if m.strip()]
     validated_models = []
     
     for model in model_list:
-        if model in MODELS:
+        if model in catalog:
             validated_models.append(model)
             print_info(f"Found model '{model}' in registry")
         else:
             print_error(f"Model '{model}' not found in registry")
-            print_info("Available models: " + ", ".join(MODELS.keys()))
+            print_info("Available models: " + ", ".join(catalog.names()))
             sys.exit(1)
     
     models_str = ",".join(validated_models)
+    start_args = {
+        "models": models_str,
+        "port": args.port,
+        "host": args.host,
+        "context_length": args.context_length,
+        "speculative": args.speculative,
+        "quant": args.quant,
+        "workers": args.workers,
+        "replan": args.replan
+    }
     
     try:
-        manager = AutonomousLocalAIManager()
-        success = manager.start(
-            models=models_str,
-            port=args.port,
-            host=args.host,
-            context_length=args.context_length
-        )
+        if config.core.USE_DAEMON:
+            success = call_daemon("start", timeout=None, **start_args)
+        else:
+            success = AutonomousLocalAIManager().start(**start_args)
         
         if success:
             print_success("AutonomousLocalAI service started successfully!")
@@ -205,6 +368,214 @@ def handle_run(args):
         print_error(f"Unexpected error: {str(e)}")
         sys.exit(1)
 
+def call_daemon(method, timeout=10.0, **params):
+    """Run a control operation in the manager daemon, starting it if needed"""
+    try:
+        return ensure_daemon().call(method, timeout=timeout, **params)
+    except DaemonError as e:
+        print_error(f"Manager daemon error: {str(e)}")
+        sys.exit(1)
+
+def handle_stop(args):
+    """Handle service stop with beautiful output"""
+    print_info("Stopping AutonomousLocalAI service...")
+    if config.core.USE_DAEMON:
+        success = call_daemon("stop", timeout=None, force=args.force)
+    else:
+        success = AutonomousLocalAIManager().stop(force=args.force)
+    if success:
+        print_success("Service stopped")
+    else:
+        print_error("Failed to stop service")
+        sys.exit(1)
+
+def handle_switch(args):
+    """Handle model switch with beautiful output"""
+    print_info(f"Switching to model: {args.model}")
+    if config.core.USE_DAEMON:
+        success = call_daemon("switch", timeout=None, model=args.model)
+    else:
+        import asyncio
+        success = asyncio.run(AutonomousLocalAIManager().switch_model(args.model))
+    if success:
+        print_success(f"Model '{args.model}' is now active")
+    else:
+        print_error(f"Failed to switch to model '{args.model}'")
+        sys.exit(1)
+
+def handle_status(args):
+    """Handle status command with beautiful output"""
+    client = DaemonClient()
+    if client.is_running():
+        status = client.call("status")
+        daemon_info = status["daemon"]
+        service_info = status["service"]
+        print_info(f"Manager daemon running (PID: {daemon_info['pid']}, uptime {daemon_info['uptime']:.0f}s)")
+        if daemon_info["current_operation"]:
+            print_info(f"Operation in progress: {daemon_info['current_operation']} "
+                       f"({daemon_info['queued_operations']} queued)")
+    else:
+        print_info("Manager daemon not running")
+        try:
+            service_info = AutonomousLocalAIManager().get_service_info()
+        except Exception:
+            service_info = None
+    
+    if not service_info:
+        print_info("No service running")
+        return
+    
+    console = Console()
+    table = Table(title="🟢 Running Service", border_style="green", show_header=False)
+    table.add_column("Field", style="bold cyan")
+    table.add_column("Value")
+    table.add_row("Active model", str(service_info.get("hash")))
+    table.add_row("State", str(service_info.get("ai_state")))
+    table.add_row("API port", str(service_info.get("app_port")))
+    table.add_row("Upstream", str(service_info.get("upstream_socket") or service_info.get("port")))
+    table.add_row("Models", ", ".join(service_info.get("models", {})))
+    console.print(table)
+
+def handle_shutdown_daemon(args):
+    """Handle manager daemon shutdown"""
+    client = DaemonClient()
+    if not client.is_running():
+        print_info("Manager daemon not running")
+        return
+    try:
+        client.call("shutdown", timeout=None, stop_service=not args.keep_service)
+    except DaemonError as e:
+        print_error(f"Manager daemon error: {str(e)}")
+        sys.exit(1)
+    print_success("Manager daemon stopped")
+
+def handle_add(args):
+    """Handle adding a user model to the catalog"""
+    fields = {k: v for k, v in {"family": args.family, "ram": args.ram, "quant": args.quant}.items() if v is not None}
+    try:
+        get_catalog().add_entry(args.model_name, args.repo, args.file, args.task, **fields)
+        print_success(f"Model '{args.model_name}' added to the catalog")
+    except ValueError as e:
+        print_error(str(e))
+        sys.exit(1)
+
+def handle_add_lora(args):
+    """Handle registering a LoRA adapter for a chat model"""
+    try:
+        get_catalog().add_lora(args.model_name, args.adapter_name, args.file, args.repo, args.scale)
+        print_success(f"LoRA adapter '{args.adapter_name}' added to model '{args.model_name}'")
+        print_info("Adapters are loaded on the next start of the model")
+    except ValueError as e:
+        print_error(str(e))
+        sys.exit(1)
+
+def handle_reload_api(args):
+    """Handle graceful API reload with beautiful output"""
+    print_info("Reloading API gateway...")
+    try:
+        if config.core.USE_DAEMON:
+            reloaded = call_daemon("reload_api", timeout=None)
+        else:
+            reloaded = AutonomousLocalAIManager().reload_api()
+        if reloaded:
+            print_success("API gateway reloaded, old process is draining open streams")
+        else:
+            print_error("Failed to reload API gateway")
+            sys.exit(1)
+    except Exception as e:
+        print_error(f"Unexpected error: {str(e)}")
+        sys.exit(1)
+
+def handle_draft_report(args):
+    """Handle draft report command with beautiful output"""
+    try:
+        report = AutonomousLocalAIManager().get_draft_report()
+    except Exception as e:
+        print_error(f"Failed to load draft report: {str(e)}")
+        sys.exit(1)
+    
+    if not report:
+        print_info("No speculative decoding stats recorded yet")
+        return
+    
+    console = Console()
+    table = Table(title="🎯 Speculative Decoding Accept Rates", border_style="cyan")
+    table.add_column("Model", style="bold magenta", justify="left")
+    table.add_column("Draft", style="dim", justify="left")
+    table.add_column("Accepted / Drafted", justify="right")
+    table.add_column("Accept Rate", justify="right")
+    table.add_column("Enabled", justify="center")
+    
+    for model_name, stats in report.items():
+        accept_rate = stats["accept_rate"]
+        table.add_row(
+            model_name,
+            stats["draft"] or "-",
+            f"{stats['accepted']} / {stats['generated']}",
+            f"{accept_rate:.2%}" if accept_rate is not None else "-",
+            "✅" if stats["enabled"] else "❌"
+        )
+    
+    console.print(table)
+
+def handle_batch_submit(args):
+    """Handle batch job submission with beautiful output"""
+    try:
+        job = JobStore().create_job(args.input_file, args.url)
+    except (BatchJobError, OSError) as e:
+        print_error(f"Failed to queue batch job: {str(e)}")
+        sys.exit(1)
+    print_success(f"Queued batch job {job['id']} with {job['total']} requests")
+    print_info("Run 'python -m local_ai.batch' next to the service to process queued jobs")
+
+def handle_batch_status(args):
+    """Handle batch job status with beautiful output"""
+    store = JobStore()
+    try:
+        jobs = [store.get_job(args.job_id)] if args.job_id else store.list_jobs()
+    except BatchJobError as e:
+        print_error(str(e))
+        sys.exit(1)
+    
+    if not jobs:
+        print_info("No batch jobs")
+        return
+    
+    console = Console()
+    table = Table(title="📦 Batch Jobs", border_style="cyan")
+    table.add_column("Job", style="bold magenta", justify="left")
+    table.add_column("Status", justify="left")
+    table.add_column("Done / Total", justify="right")
+    table.add_column("Failed", justify="right")
+    table.add_column("Req/s", justify="right")
+    table.add_column("Tok/s", justify="right")
+    
+    for job in jobs:
+        table.add_row(
+            job["id"],
+            job["status"],
+            f"{job['completed'] + job['failed']} / {job['total']}",
+            str(job["failed"]),
+            f"{job['requests_per_second']:.2f}",
+            f"{job['tokens_per_second']:.1f}"
+        )
+    
+    console.print(table)
+
+def handle_batch_cancel(args):
+    """Handle batch job cancellation with beautiful output"""
+    store = JobStore()
+    try:
+        previous = store.load_state(args.job_id)["status"]
+        job = store.cancel_job(args.job_id)
+    except BatchJobError as e:
+        print_error(str(e))
+        sys.exit(1)
+    if previous not in ("queued", "running"):
+        print_warning(f"Batch job {job['id']} already {job['status']}")
+        return
+    print_success(f"Cancelled batch job {job['id']} at {job['completed'] + job['failed']} / {job['total']} requests")
+
 def main():
     """Main CLI entry point with enhanced error handling"""
     # Show banner
@@ -225,9 +596,33 @@ def main():
             handle_download(known_args)
         elif known_args.model_command == "run":
             handle_run(known_args)
+        elif known_args.model_command == "list":
+            show_available_models()
+        elif known_args.model_command == "add":
+            handle_add(known_args)
+        elif known_args.model_command == "add-lora":
+            handle_add_lora(known_args)
+        elif known_args.model_command == "reload-api":
+            handle_reload_api(known_args)
+        elif known_args.model_command == "stop":
+            handle_stop(known_args)
+        elif known_args.model_command == "switch":
+            handle_switch(known_args)
+        elif known_args.model_command == "status":
+            handle_status(known_args)
+        elif known_args.model_command == "shutdown-daemon":
+            handle_shutdown_daemon(known_args)
+        elif known_args.model_command == "draft-report":
+            handle_draft_report(known_args)
+        elif known_args.model_command == "batch-submit":
+            handle_batch_submit(known_args)
+        elif known_args.model_command == "batch-status":
+            handle_batch_status(known_args)
+        elif known_args.model_command == "batch-cancel":
+            handle_batch_cancel(known_args)
         else:
             print_error(f"Unknown model command: {known_args.model_command}")
-            print_info("Available model commands: run, download")
+            print_info("Available model commands: run, download, list, add, add-lora, stop, switch, status, shutdown-daemon, reload-api, draft-report, batch-submit, batch-status, batch-cancel")
             sys.exit(2)
     else:
         print_error(f"Unknown command: {known_args.command}")
@@ -28,6 +28,14 @@ class BaseConfig:
         if max_val is not None and value > max_val:
             raise ValueError(f"{key} must be <= {max_val}, got {value}")
         return value
+    
+    @staticmethod
+    def get_env_bool(key: str, default: bool) -> bool:
+        """Get environment variable as boolean ("1", "true", "yes", "on" are truthy)."""
+        value = os.getenv(key)
+        if value is None:
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
 
 
 class PerformanceConfig(BaseConfig):
@@ -46,17 +54,24 @@ class PerformanceConfig(BaseConfig):
     STREAM_STALE_TIMEOUT: int = BaseConfig.get_env_int("LOCAL_AI_STREAM_STALE_TIMEOUT", 600, 60)  # 10 min, min 1 min
     STREAM_TIMEOUT: float = BaseConfig.get_env_float("LOCAL_AI_STREAM_TIMEOUT", 7200.0, 30.0)  # 2 hours, min 30 sec
     STREAM_CHUNK_SIZE: int = BaseConfig.get_env_int("LOCAL_AI_STREAM_CHUNK_SIZE", 16384, 1024, 1048576)  # 16KB, 1KB-1MB
+    DISCONNECT_POLL_INTERVAL: float = BaseConfig.get_env_float("LOCAL_AI_DISCONNECT_POLL_INTERVAL", 0.5, 0.05, 10.0)  # Client disconnect checks while waiting on upstream
     
     # Model operations
     MODEL_SWITCH_VERIFICATION_DELAY: float = BaseConfig.get_env_float("LOCAL_AI_MODEL_SWITCH_VERIFICATION_DELAY", 0.5, 0.1, 5.0)
     MODEL_SWITCH_MAX_RETRIES: int = BaseConfig.get_env_int("LOCAL_AI_MODEL_SWITCH_MAX_RETRIES", 3, 1, 10)
     MODEL_SWITCH_STREAM_TIMEOUT: float = BaseConfig.get_env_float("LOCAL_AI_MODEL_SWITCH_STREAM_TIMEOUT", 30.0, 5.0)
     
+    # Request-driven model routing
+    ROUTING_MAX_WAIT: float = BaseConfig.get_env_float("LOCAL_AI_ROUTING_MAX_WAIT", 30.0, 1.0)  # Wait behind a busy model before forcing a switch
+    ROUTING_DEMAND_WINDOW: float = BaseConfig.get_env_float("LOCAL_AI_ROUTING_DEMAND_WINDOW", 60.0, 1.0)  # Request rate averaging window
+    DEFAULT_MODEL_LOAD_SECONDS: float = BaseConfig.get_env_float("LOCAL_AI_DEFAULT_MODEL_LOAD_SECONDS", 30.0, 1.0)  # Until a load is measured
+    
     # Queue and processing - optimized defaults
     QUEUE_BACKPRESSURE_TIMEOUT: float = BaseConfig.get_env_float("LOCAL_AI_QUEUE_BACKPRESSURE_TIMEOUT", 30.0, 1.0)
     PROCESS_CHECK_INTERVAL: float = BaseConfig.get_env_float("LOCAL_AI_PROCESS_CHECK_INTERVAL", 0.1, 0.01, 1.0)
     MAX_QUEUE_SIZE: int = BaseConfig.get_env_int("LOCAL_AI_MAX_QUEUE_SIZE", 100, 10, 1000)  # Increased from 50
     HEALTH_CHECK_INTERVAL: int = BaseConfig.get_env_int("LOCAL_AI_HEALTH_CHECK_INTERVAL", 2, 1, 60)
+    SLOT_REFRESH_INTERVAL: float = BaseConfig.get_env_float("LOCAL_AI_SLOT_REFRESH_INTERVAL", 1.0, 0.05, 60.0)  # Max age of the /slots view
     
     # Timeouts - consolidated and optimized
     SERVICE_START_TIMEOUT: int = BaseConfig.get_env_int("LOCAL_AI_SERVICE_START_TIMEOUT", 3600, 60)  # 1 hour, min 1 min
@@ -74,6 +89,42 @@ class PerformanceConfig(BaseConfig):
     # Retry settings
     MAX_RETRIES: int = BaseConfig.get_env_int("LOCAL_AI_MAX_RETRIES", 3, 1, 10)  # Increased from 2
     RETRY_DELAY: float = BaseConfig.get_env_float("LOCAL_AI_RETRY_DELAY", 0.5, 0.1, 10.0)
+    
+    # Per-host circuit breaking for internal HTTP calls
+    CIRCUIT_FAILURE_THRESHOLD: int = BaseConfig.get_env_int("LOCAL_AI_CIRCUIT_FAILURE_THRESHOLD", 5, 1, 100)
+    CIRCUIT_RESET_TIMEOUT: float = BaseConfig.get_env_float("LOCAL_AI_CIRCUIT_RESET_TIMEOUT", 10.0, 1.0, 300.0)
+    
+    # Batch inference jobs
+    BATCH_CONCURRENCY: int = BaseConfig.get_env_int("LOCAL_AI_BATCH_CONCURRENCY", 0, 0, 256)  # 0 = parallel slots
+    BATCH_CHECKPOINT_INTERVAL: int = BaseConfig.get_env_int("LOCAL_AI_BATCH_CHECKPOINT_INTERVAL", 100, 1)  # Results per fsync
+    BATCH_YIELD_INTERVAL: float = BaseConfig.get_env_float("LOCAL_AI_BATCH_YIELD_INTERVAL", 0.5, 0.01, 60.0)  # Recheck while interactive traffic waits
+    BATCH_POLL_INTERVAL: float = BaseConfig.get_env_float("LOCAL_AI_BATCH_POLL_INTERVAL", 5.0, 0.1, 300.0)  # Job queue poll when idle
+    
+    # Grouping of requests by LoRA adapter configuration
+    LORA_GROUP_MAX_WAIT: float = BaseConfig.get_env_float("LOCAL_AI_LORA_GROUP_MAX_WAIT", 2.0, 0.0, 60.0)  # Seconds before another group gets a turn
+    
+    # Structured output
+    GRAMMAR_CACHE_SIZE: int = BaseConfig.get_env_int("LOCAL_AI_GRAMMAR_CACHE_SIZE", 256, 1, 65536)  # Compiled JSON-schema grammars kept
+    
+    # Image preprocessing for multimodal models
+    IMAGE_MAX_BYTES: int = BaseConfig.get_env_int("LOCAL_AI_IMAGE_MAX_BYTES", 20971520, 1048576)  # 20MB per decoded image
+    IMAGE_MAX_PIXELS: int = BaseConfig.get_env_int("LOCAL_AI_IMAGE_MAX_PIXELS", 40000000, 1000000)  # Decompression bomb guard
+    IMAGE_JPEG_QUALITY: int = BaseConfig.get_env_int("LOCAL_AI_IMAGE_JPEG_QUALITY", 90, 50, 100)
+    IMAGE_CACHE_MB: int = BaseConfig.get_env_int("LOCAL_AI_IMAGE_CACHE_MB", 256, 1, 16384)  # Processed images kept
+    IMAGE_WORKERS: int = BaseConfig.get_env_int("LOCAL_AI_IMAGE_WORKERS", 4, 1, 64)
+    
+    # Built-in vector store (needs numpy)
+    VECTOR_DTYPE: str = os.getenv("LOCAL_AI_VECTOR_DTYPE", "float32")  # Storage of new collections: float32 or float16
+    VECTOR_IVF_THRESHOLD: int = BaseConfig.get_env_int("LOCAL_AI_VECTOR_IVF_THRESHOLD", 20000, 1000)  # Rows before a collection gets an IVF index
+    VECTOR_IVF_NPROBE: int = BaseConfig.get_env_int("LOCAL_AI_VECTOR_IVF_NPROBE", 8, 1, 1024)  # IVF lists scanned per query
+    VECTOR_INGEST_BATCH: int = BaseConfig.get_env_int("LOCAL_AI_VECTOR_INGEST_BATCH", 64, 1, 2048)  # Texts per embedding request
+    
+    # Single-flight deduplication of identical deterministic requests
+    SINGLEFLIGHT_ENABLED: bool = BaseConfig.get_env_bool("LOCAL_AI_SINGLEFLIGHT_ENABLED", True)
+    SINGLEFLIGHT_MAX_REPLAY_BYTES: int = BaseConfig.get_env_int("LOCAL_AI_SINGLEFLIGHT_MAX_REPLAY_BYTES", 4194304, 65536)  # Output kept for late joiners
+    
+    # Shared memory region for state shared between API workers
+    SHARED_STATE_SIZE: int = BaseConfig.get_env_int("LOCAL_AI_SHARED_STATE_SIZE", 4194304, 2097152, 268435456)  # 4MB, 2MB-256MB
 
 
 class CoreConfig(BaseConfig):
@@ -86,6 +137,18 @@ class CoreConfig(BaseConfig):
     PROCESS_TERM_TIMEOUT: int = BaseConfig.get_env_int("LOCAL_AI_PROCESS_TERM_TIMEOUT", 15, 5, 60)
     MAX_PORT_RETRIES: int = BaseConfig.get_env_int("LOCAL_AI_MAX_PORT_RETRIES", 10, 3, 50)  # Increased from 5
     
+    # Crash supervision of the AI server
+    SUPERVISE_AI_SERVER: bool = BaseConfig.get_env_bool("LOCAL_AI_SUPERVISE_AI_SERVER", True)
+    SUPERVISOR_CHECK_INTERVAL: float = BaseConfig.get_env_float("LOCAL_AI_SUPERVISOR_CHECK_INTERVAL", 1.0, 0.1, 30.0)
+    CRASH_LOOP_WINDOW: int = BaseConfig.get_env_int("LOCAL_AI_CRASH_LOOP_WINDOW", 300, 10)  # 5 min, min 10 sec
+    CRASH_LOOP_MAX_RESTARTS: int = BaseConfig.get_env_int("LOCAL_AI_CRASH_LOOP_MAX_RESTARTS", 5, 1, 100)
+    RESTART_BACKOFF_MAX: float = BaseConfig.get_env_float("LOCAL_AI_RESTART_BACKOFF_MAX", 60.0, 1.0, 600.0)
+    REPLAY_WAIT_TIMEOUT: float = BaseConfig.get_env_float("LOCAL_AI_REPLAY_WAIT_TIMEOUT", 120.0, 1.0)
+    
+    # Resident manager daemon serving CLI control requests
+    USE_DAEMON: bool = BaseConfig.get_env_bool("LOCAL_AI_USE_DAEMON", True)
+    DAEMON_START_TIMEOUT: float = BaseConfig.get_env_float("LOCAL_AI_DAEMON_START_TIMEOUT", 15.0, 1.0, 300.0)
+    
     # HTTP request settings
     REQUEST_RETRIES: int = BaseConfig.get_env_int("LOCAL_AI_REQUEST_RETRIES", 3, 1, 10)  # Increased from 2
     REQUEST_DELAY: int = BaseConfig.get_env_int("LOCAL_AI_REQUEST_DELAY", 2, 1, 10)
@@ -104,6 +167,27 @@ class ModelConfig(BaseConfig):
     MAX_MESSAGES: int = BaseConfig.get_env_int("LOCAL_AI_MAX_MESSAGES", 100, 10, 1000)  # Increased from 50
     DEFAULT_MAX_TOKENS: int = BaseConfig.get_env_int("LOCAL_AI_DEFAULT_MAX_TOKENS", 4096, 256, 32768)  # Decreased from 8192
     DEFAULT_CONTEXT_LENGTH: int = BaseConfig.get_env_int("LOCAL_AI_DEFAULT_CONTEXT_LENGTH", 16384, 1024, 131072)  # Decreased from 32768
+    
+    # Continuous batching - parallel decode slots, each with the full context length
+    PARALLEL_SLOTS: int = BaseConfig.get_env_int("LOCAL_AI_PARALLEL_SLOTS", 0, 0, 64)  # 0 = derive from host
+    MAX_PARALLEL_SLOTS: int = BaseConfig.get_env_int("LOCAL_AI_MAX_PARALLEL_SLOTS", 8, 1, 64)
+    CONTEXT_BUDGET: int = BaseConfig.get_env_int("LOCAL_AI_CONTEXT_BUDGET", 65536, 1024, 1048576)  # Total KV tokens across slots
+    
+    # Quantization variant selection
+    MODEL_QUANT: str = os.getenv("LOCAL_AI_MODEL_QUANT", "auto")  # "auto" or a variant name such as Q4_K_M
+    TARGET_TOKENS_PER_SECOND: float = BaseConfig.get_env_float("LOCAL_AI_TARGET_TOKENS_PER_SECOND", 10.0, 0.0)  # Decode floor for auto selection, 0 = best quality that fits
+    MEMORY_BANDWIDTH_GBPS: float = BaseConfig.get_env_float("LOCAL_AI_MEMORY_BANDWIDTH_GBPS", 50.0, 1.0)  # Host decode bandwidth
+    RAM_USAGE_FRACTION: float = BaseConfig.get_env_float("LOCAL_AI_RAM_USAGE_FRACTION", 0.8, 0.1, 1.0)
+    ALLOW_REQUANTIZE: bool = BaseConfig.get_env_bool("LOCAL_AI_ALLOW_REQUANTIZE", False)
+    REQUANTIZE_TARGETS: str = os.getenv("LOCAL_AI_REQUANTIZE_TARGETS", "Q4_K_M,Q5_K_M,Q6_K")
+    
+    # Speculative decoding with a small same-family draft model
+    SPECULATIVE_DECODING: bool = BaseConfig.get_env_bool("LOCAL_AI_SPECULATIVE_DECODING", False)
+    DRAFT_MAX: int = BaseConfig.get_env_int("LOCAL_AI_DRAFT_MAX", 16, 1, 64)  # Max tokens drafted per step
+    DRAFT_MIN: int = BaseConfig.get_env_int("LOCAL_AI_DRAFT_MIN", 2, 0, 64)  # Min tokens drafted per step
+    DRAFT_P_MIN: float = BaseConfig.get_env_float("LOCAL_AI_DRAFT_P_MIN", 0.75, 0.0, 1.0)  # Min draft token probability
+    DRAFT_MIN_ACCEPT_RATE: float = BaseConfig.get_env_float("LOCAL_AI_DRAFT_MIN_ACCEPT_RATE", 0.4, 0.0, 1.0)  # Disable below this
+    DRAFT_MIN_SAMPLES: int = BaseConfig.get_env_int("LOCAL_AI_DRAFT_MIN_SAMPLES", 512, 1)  # Drafted tokens before judging
 
 
 class FilePathConfig(BaseConfig):
@@ -112,12 +196,22 @@ class FilePathConfig(BaseConfig):
     # Service files
     RUNNING_SERVICE_FILE: str = os.getenv("LOCAL_AI_RUNNING_SERVICE_FILE", "running_service.msgpack")
     START_LOCK_FILE: str = os.getenv("LOCAL_AI_START_LOCK_FILE", "start_lock.lock")
+    DRAFT_STATS_FILE: str = os.getenv("LOCAL_AI_DRAFT_STATS_FILE", "draft_stats.json")
+    SHARED_STATE_FILE: str = os.getenv("LOCAL_AI_SHARED_STATE_FILE", "running_service.state")
+    LAUNCH_PLAN_FILE: str = os.getenv("LOCAL_AI_LAUNCH_PLAN_FILE", "launch_plan.msgpack")
+    DAEMON_SOCKET: str = os.getenv("LOCAL_AI_DAEMON_SOCKET", os.path.join(os.getenv("LOCAL_AI_RUN_DIR", "run"), "manager.sock"))
+    BATCH_DIR: str = os.getenv("LOCAL_AI_BATCH_DIR", "batch")
+    VECTOR_DIR: str = os.getenv("LOCAL_AI_VECTOR_DIR", "vectors")
+    MODEL_CATALOG_FILE: str = os.getenv("LOCAL_AI_MODEL_CATALOG_FILE", str(DEFAULT_MODEL_DIR / "catalog.json"))
+    CATALOG_HASH_FILES: bool = BaseConfig.get_env_bool("LOCAL_AI_CATALOG_HASH_FILES", False)  # SHA-256 of multi-GB files is slow
     
     # Directories
     LOGS_DIR: str = os.getenv("LOCAL_AI_LOGS_DIR", "logs")
+    RUN_DIR: str = os.getenv("LOCAL_AI_RUN_DIR", "run")  # Unix domain sockets
     
     # External commands
     LLAMA_SERVER: Optional[str] = os.getenv("LOCAL_AI_LLAMA_SERVER")
+    LLAMA_QUANTIZE: Optional[str] = os.getenv("LOCAL_AI_LLAMA_QUANTIZE")
     TAR_COMMAND: Optional[str] = os.getenv("LOCAL_AI_TAR_COMMAND", "tar")
     PIGZ_COMMAND: Optional[str] = os.getenv("LOCAL_AI_PIGZ_COMMAND", "pigz")
     CAT_COMMAND: Optional[str] = os.getenv("LOCAL_AI_CAT_COMMAND", "cat")
@@ -129,6 +223,8 @@ class NetworkConfig(BaseConfig):
     # Server settings
     DEFAULT_PORT: int = BaseConfig.get_env_int("LOCAL_AI_DEFAULT_PORT", 8080, 1024, 65535)
     DEFAULT_HOST: str = os.getenv("LOCAL_AI_DEFAULT_HOST", "0.0.0.0")
+    API_WORKERS: int = BaseConfig.get_env_int("LOCAL_AI_API_WORKERS", 1, 1, 64)  # API processes sharing the port
+    UPSTREAM_TRANSPORT: str = os.getenv("LOCAL_AI_UPSTREAM_TRANSPORT", "tcp")  # "tcp" or "unix" for llama-server
     
     # Download settings - optimized
     DEFAULT_CHUNK_SIZE: int = BaseConfig.get_env_int("LOCAL_AI_DEFAULT_CHUNK_SIZE", 65536, 1024, 1048576)  # 64KB, increased from 8KB
@@ -191,6 +287,9 @@ class Config:
             if self.network.DEFAULT_PORT < 1024 or self.network.DEFAULT_PORT > 65535:
                 raise ValueError("DEFAULT_PORT must be between 1024 and 65535")
             
+            if self.network.UPSTREAM_TRANSPORT not in ("tcp", "unix"):
+                raise ValueError("UPSTREAM_TRANSPORT must be 'tcp' or 'unix'")
+            
             return True
         except ValueError as e:
             print(f"Configuration validation error: {e}")
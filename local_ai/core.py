@@ -1,11 +1,16 @@
 import os
+import re
+import sys
 import json
 import time
+import fcntl
 import signal
 import msgpack
+import threading
 import psutil
 import asyncio
 import socket
+import httpx
 import requests
 import subprocess
 import pkg_resources
@@ -15,8 +20,12 @@ from loguru import logger
 from local_ai.config import config
 from typing import Optional, Dict, Any, List
 from local_ai.utils import wait_for_health
-from local_ai.download import download_model_from_hf
-from local_ai.model import MODELS
+from local_ai.http_client import get_http_client, get_async_http_client, upstream_base_url, CircuitOpenError
+from local_ai.download import download_model_from_hf, download_lora_from_hf
+from local_ai.catalog import get_catalog, infer_family
+from local_ai.quant import get_quant_variants, select_quant
+from local_ai.shared_state import SharedState, SharedStateError
+from local_ai.launch_plan import launch_plan_key, load_launch_plan, save_launch_plan, invalidate_launch_plan
 
 class AutonomousLocalAIServiceError(Exception):
     """Base exception for AutonomousLocalAI service errors."""
@@ -44,6 +53,8 @@ class AutonomousLocalAIManager:
         
         # File paths from config
         self.msgpack_file = Path(config.file_paths.RUNNING_SERVICE_FILE)
+        self.shared_state_file = Path(config.file_paths.SHARED_STATE_FILE)
+        self._shared_state: Optional[SharedState] = None
         self.loaded_models: Dict[str, Any] = {}
         self.llama_server_path = config.file_paths.LLAMA_SERVER or os.getenv("LLAMA_SERVER")
         if not self.llama_server_path or not os.path.exists(self.llama_server_path):
@@ -79,6 +90,35 @@ class AutonomousLocalAIManager:
             s.bind(("", 0))
             return s.getsockname()[1]
 
+    def _allocate_upstream(self, task: str, app_port: int, current_port: Optional[int] = None) -> tuple[int, Optional[str]]:
+        """
+        Choose where the model server listens.
+        
+        With UPSTREAM_TRANSPORT=unix, llama-server binds a Unix domain socket under RUN_DIR,
+        which skips loopback TCP on every streamed chunk and cannot race with other
+        processes for the port. Image generation servers, platforms without AF_UNIX and
+        socket paths over the sun_path limit fall back to TCP.
+        
+        Args:
+            task: Task of the model being launched
+            app_port: API port, used to name the socket
+            current_port: TCP port to keep when relaunching
+            
+        Returns:
+            tuple[int, Optional[str]]: (TCP port, socket path); the port is 0 when a socket is used
+        """
+        if config.network.UPSTREAM_TRANSPORT == "unix" and task != "image-generation":
+            socket_path = (Path(config.file_paths.RUN_DIR) / f"ai-{app_port}.sock").absolute()
+            if not hasattr(socket, "AF_UNIX"):
+                logger.warning("Unix domain sockets not supported on this platform, using TCP for the AI server")
+            elif len(str(socket_path).encode()) > 103:
+                logger.warning(f"Socket path {socket_path} exceeds the Unix socket path limit, using TCP for the AI server")
+            else:
+                socket_path.parent.mkdir(parents=True, exist_ok=True)
+                socket_path.unlink(missing_ok=True)
+                return 0, str(socket_path)
+        return current_port or self._get_free_port(), None
+
     def _get_family_template_and_practice(self, model_family: str):
         """Helper to get template and best practice paths based on folder name."""
         return (
@@ -90,49 +130,13 @@ class AutonomousLocalAIManager:
         """
         Utility to retry a GET request for JSON data with optimized parameters.
         Returns parsed JSON data or None on failure.
-        """
-        # Use config values as defaults
-        retries = retries or config.core.REQUEST_RETRIES
-        delay = delay or config.core.REQUEST_DELAY
-        timeout = timeout or config.core.REQUEST_TIMEOUT
-        
-        backoff_delay = delay
-        last_error = None
         
-        for attempt in range(retries):
-            try:
-                # Use session for connection pooling if making multiple requests
-                response = requests.get(url, timeout=timeout)
-                response.raise_for_status()  # Raise exception for HTTP errors
-                
-                # Parse JSON once and return
-                return response.json()
-                
-            except requests.exceptions.Timeout as e:
-                last_error = f"Timeout after {timeout}s"
-                logger.warning(f"Attempt {attempt+1}/{retries} timed out for {url}")
-            except requests.exceptions.ConnectionError as e:
-                last_error = f"Connection error: {str(e)[:100]}"
-                logger.warning(f"Attempt {attempt+1}/{retries} connection failed for {url}")
-            except requests.exceptions.HTTPError as e:
-                last_error = f"HTTP error {e.response.status_code}"
-                logger.warning(f"Attempt {attempt+1}/{retries} HTTP error for {url}: {e}")
-                # Don't retry on 4xx errors (client errors)
-                if 400 <= e.response.status_code < 500:
-                    break
-            except (requests.exceptions.RequestException, ValueError) as e:
-                last_error = f"Request error: {str(e)[:100]}"
-                logger.warning(f"Attempt {attempt+1}/{retries} failed for {url}: {e}")
-            
-            # Sleep with exponential backoff (except on last attempt)
-            if attempt < retries - 1:
-                time.sleep(backoff_delay)
-                backoff_delay = min(backoff_delay * 1.5, 8)  # Cap at 8 seconds
-        
-        logger.error(f"Failed to fetch {url} after {retries} attempts. Last error: {last_error}")
-        return None
+        Requests go through the shared keep-alive HTTP client, which retries connection
+        failures and 5xx responses with backoff and fails fast while the host's circuit is open.
+        """
+        return get_http_client().get_json(url, retries=retries, retry_delay=delay, timeout=timeout)
 
-    def start(self, models: str, port: int = None, host: str = None, context_length: int = None) -> bool:
+    def start(self, models: str, port: int = None, host: str = None, context_length: int = None, speculative: Optional[bool] = None, quant: Optional[str] = None, workers: Optional[int] = None, replan: bool = False) -> bool:
         """
         Start the AutonomousLocalAI service with multi-model support and on-demand loading.
 
@@ -142,6 +146,19 @@ class AutonomousLocalAIManager:
             port (int): Port number for the AutonomousLocalAI service (default from config).
             host (str): Host address for the AutonomousLocalAI service (default from config).
             context_length (int): Context length for the model (default from config).
+            speculative (bool): Launch chat models with their registered draft model for
+                                speculative decoding (default from config).
+            quant (str): Quantization variant for every model; selected per model from
+                         host RAM and the tokens/s target when not provided.
+            workers (int): Number of API worker processes sharing the port (default from config).
+            replan (bool): Ignore the saved launch plan and resolve models and commands again.
+                           Without it, a plan saved by a previous start with the same inputs is
+                           reused when none of its files changed.
+
+        The AI server and the API are launched together. The API is handed the service
+        metadata with ``ai_state`` "loading" as soon as it listens, and again with
+        "running" once the model is healthy, so start() takes as long as the slower
+        of the two instead of their sum.
 
         Returns:
             bool: True if service started successfully, False otherwise.
@@ -164,6 +181,9 @@ class AutonomousLocalAIManager:
         port = port or config.network.DEFAULT_PORT
         host = host or config.network.DEFAULT_HOST
         context_length = context_length or config.model.DEFAULT_CONTEXT_LENGTH
+        workers = workers or config.network.API_WORKERS
+        if speculative is None:
+            speculative = config.model.SPECULATIVE_DECODING
 
         # Main model is the first hash (on_demand: false)
         main_model = model_list[0]
@@ -206,9 +226,12 @@ class AutonomousLocalAIManager:
             self._release_start_lock()
             exit(1)
         
-        # Set up signal handlers for graceful cleanup
-        original_sigint = signal.signal(signal.SIGINT, signal_handler)
-        original_sigterm = signal.signal(signal.SIGTERM, signal_handler)
+        # Set up signal handlers for graceful cleanup; inside the manager daemon start()
+        # runs on a worker thread and the daemon handles signals itself
+        in_main_thread = threading.current_thread() is threading.main_thread()
+        if in_main_thread:
+            original_sigint = signal.signal(signal.SIGINT, signal_handler)
+            original_sigterm = signal.signal(signal.SIGTERM, signal_handler)
         
         try:
             # Check if the requested port is available before doing expensive operations
@@ -221,42 +244,12 @@ class AutonomousLocalAIManager:
                 if on_demand_models:
                     logger.info(f"On-demand models: {on_demand_models}")
                 
-                # Download and prepare all models
-                models_info = {}
-                for i, model in enumerate(model_list):
-                    logger.info(f"Downloading model {i+1}/{len(model_list)}: {model}")
-                    success, local_model_path = download_model_from_hf(model)
-                    if not success or not local_model_path:
-                        raise ModelNotFoundError(f"Model file not found for: {model}")
-                    
-                    if not os.path.exists(local_model_path):
-                        raise ModelNotFoundError(f"Model file not found at: {local_model_path}")
-
-                    # Get metadata from MODELS dictionary
-                    if model in MODELS:
-                        model_info = MODELS[model]
-                        metadata = {
-                            "task": model_info.get("task", "chat"),
-                            "ram": model_info.get("ram", None),
-                            "folder_name": model,  # Use model name as folder name
-                            "family": "qwen3" if "qwen3" in model else None,  # Infer family from model name
-                        }
-                    else:
-                        # Fallback metadata if model not in MODELS dict
-                        metadata = {
-                            "task": "chat",
-                            "ram": None,
-                            "folder_name": model,
-                            "family": None,
-                        }
-                    
-                    models_info[model] = {
-                        "local_model_path": local_model_path,
-                        "metadata": metadata,
-                        "on_demand": i > 0,  # First model is not on-demand
-                        "local_projector_path": local_model_path + "-projector"
-                    }
-
+                # Reuse the previous launch plan when nothing it was built from changed
+                plan_key = launch_plan_key(model_list, port, host, context_length, speculative, quant, workers)
+                plan = None if replan else load_launch_plan(plan_key)
+                if plan is None:
+                    models_info = self._prepare_models(model_list, quant)
+                
                 # Check if any existing model is running
                 model_running = self.get_running_model()
                 if model_running:
@@ -266,115 +259,14 @@ class AutonomousLocalAIManager:
                     logger.info(f"Stopping existing model '{model_running}' on port {port}")
                     self.stop(force=True)
 
-                # Start the main model
-                main_model_info = models_info[main_model]
-                local_model_path = main_model_info["local_model_path"]
-                metadata = main_model_info["metadata"]
-                
-                folder_name = metadata.get("folder_name", "")
-                family = metadata.get("family", None)
-                ram = metadata.get("ram", None)
-                task = metadata.get("task", "chat")
-                config_name = metadata.get("config_name", "flux-dev")
-                is_lora = metadata.get("lora", False)
-                
-                local_ai_port = self._get_free_port()
-                
-                # Build command and service metadata for main model
-                if task == "embed":
-                    running_ai_command = self._build_embed_command(local_model_path, local_ai_port, host)
-                    service_metadata = self._create_service_metadata(
-                        main_model, local_model_path, local_ai_port, port, context_length, task, False, None
-                    )
-                elif task == "image-generation":
-                    if not shutil.which("mlx-flux"):
-                        raise AutonomousLocalAIServiceError("mlx-flux command not found in PATH")
-                    
-                    # Initialize LoRA variables
-                    lora_paths = None
-                    lora_scales = None
-                    effective_model_path = local_model_path
-                    
-                    if is_lora:
-                        lora_metadata_path = os.path.join(local_model_path, "metadata.json")
-                        lora_metadata, error_msg = self._load_lora_metadata(lora_metadata_path)
-                        if lora_metadata is None:
-                            logger.error(f"Failed to load LoRA metadata: {error_msg}")
-                            logger.warning("Falling back to regular model mode")
-                            is_lora = False
-                        else:
-                            try:
-                                base_model_hash = lora_metadata["base_model"]
-                                success, base_model_path = download_model_from_hf(base_model_hash)
-                                if not success or not base_model_path:
-                                    raise ModelNotFoundError(f"Base model file not found for: {base_model_hash}")
-                                
-                                # Construct absolute LoRA paths
-                                lora_paths = []
-                                for lora_path in lora_metadata["lora_paths"]:
-                                    if os.path.isabs(lora_path):
-                                        lora_paths.append(lora_path)
-                                    else:
-                                        lora_paths.append(os.path.join(local_model_path, lora_path))
-                                
-                                lora_scales = lora_metadata["lora_scales"]
-                                effective_model_path = base_model_path  # Use base model path for LoRA
-                                
-                                logger.info(f"LoRA model detected - using base model: {base_model_path}")
-                                logger.info(f"LoRA paths: {lora_paths}")
-                                logger.info(f"LoRA scales: {lora_scales}")
-                                
-                            except KeyError as e:
-                                logger.error(f"Missing required field in LoRA metadata: {e}")
-                                logger.warning("Falling back to regular model mode")
-                                is_lora = False
-                            except (OSError, IOError) as e:
-                                logger.error(f"File system error during LoRA setup: {e}")
-                                logger.warning("Falling back to regular model mode")
-                                is_lora = False
-                            except Exception as e:
-                                logger.error(f"Unexpected error during LoRA setup: {e}")
-                                logger.warning("Falling back to regular model mode")
-                                is_lora = False
-                        
-                    running_ai_command = self._build_image_generation_command(
-                        effective_model_path, local_ai_port, host, config_name, lora_paths, lora_scales
-                    )
-                    service_metadata = self._create_service_metadata(
-                        main_model, local_model_path, local_ai_port, port, context_length, task, False, None
-                    )
+                if plan is not None:
+                    logger.info("Launch plan unchanged since the last start, skipping model resolution")
+                    service_metadata, running_ai_command, local_ai_port, upstream_socket = self._apply_launch_plan(plan, port, host)
                 else:
-                    is_multimodal, projector_path = self._check_multimodal_support(local_model_path)
-                    
-                    service_metadata = self._create_service_metadata(
-                        main_model, local_model_path, local_ai_port, port, context_length, 
-                        task, is_multimodal, projector_path
+                    service_metadata, running_ai_command, local_ai_port, upstream_socket = self._plan_launch(
+                        models_info, main_model, port, host, context_length, speculative, workers
                     )
-
-                    # Build command based on model family
-                    running_ai_command = self._build_model_command(folder_name, local_model_path, local_ai_port, host, context_length)
-
-                    if service_metadata["multimodal"]:
-                        running_ai_command.extend([
-                            "--mmproj", str(projector_path)
-                        ])
-
-                # Add main model metadata
-                service_metadata["family"] = family
-                service_metadata["folder_name"] = folder_name
-                service_metadata["ram"] = ram
-                service_metadata["running_ai_command"] = running_ai_command
-                
-                # Add multi-model information
-                service_metadata["models"] = {}
-                for model_name, model_info in models_info.items():
-                    service_metadata["models"][model_name] = {
-                        "local_model_path": model_info["local_model_path"],
-                        "local_projector_path": model_info["local_projector_path"],
-                        "metadata": model_info["metadata"],
-                        "on_demand": model_info["on_demand"],
-                        "active": model_name == main_model
-                    }
+                    save_launch_plan(plan_key, service_metadata, running_ai_command)
                 
                 logger.info(f"Starting main model process: {' '.join(running_ai_command)}")
                 
@@ -392,22 +284,10 @@ class AutonomousLocalAIManager:
                     logger.error(f"Error starting AutonomousLocalAI service: {str(e)}", exc_info=True)
                     cleanup_processes()
                     return False
-        
-                if not wait_for_health(local_ai_port):
-                    logger.error(f"Service failed to start within 600 seconds")
-                    cleanup_processes()
-                    return False
+                load_started = time.time()
                 
-                logger.info(f"[AUTONOMOUSLOCALAI] Main model service started on port {local_ai_port}")
-
-                # Start the FastAPI app
-                uvicorn_command = [
-                    "uvicorn",
-                    "local_ai.apis:app",
-                    "--host", host,
-                    "--port", str(port),
-                    "--log-level", "info"
-                ]
+                # Start the FastAPI app while the model loads; it reports "loading" until told otherwise
+                uvicorn_command = self._build_api_command(host, port, workers)
                 logger.info(f"Starting API process: {' '.join(uvicorn_command)}")
                 
                 api_log_stderr = self.logs_dir / "api.log"
@@ -424,33 +304,52 @@ class AutonomousLocalAIManager:
                     cleanup_processes()
                     return False
                 
-                if not wait_for_health(port):
-                    logger.error(f"API service failed to start within 600 seconds")
+                if not self._wait_for_listen(apis_process.pid, port, self.HEALTH_CHECK_TIMEOUT):
+                    logger.error(f"API service failed to listen on port {port} within {self.HEALTH_CHECK_TIMEOUT} seconds")
                     cleanup_processes()
                     return False
-
-                logger.info(f"Multi-model service started on port {port}")
-                if on_demand_models:
-                    logger.info(f"On-demand models ready: {on_demand_models}")
-
-                # Update service metadata with process IDs
+                
+                main_model_path = service_metadata.get("local_text_path") or ""
                 service_metadata.update({
                     "pid": ai_process.pid,
-                    "app_pid": apis_process.pid
+                    "app_pid": apis_process.pid,
+                    "ai_state": "loading",
+                    "load_started_at": load_started,
+                    "estimated_load_seconds": get_catalog().get_facts(
+                        main_model, os.path.basename(main_model_path) or None
+                    ).get("measured_load_seconds") or config.performance.DEFAULT_MODEL_LOAD_SECONDS
                 })
+                if not self._publish_service_metadata(port, service_metadata):
+                    cleanup_processes()
+                    self._cleanup_service_metadata(force=True)
+                    return False
+                logger.info(f"API service accepting connections on port {port} after {time.time() - load_started:.1f}s, model still loading")
+        
+                if not wait_for_health(local_ai_port, timeout=self.HEALTH_CHECK_TIMEOUT, socket_path=upstream_socket, process=ai_process):
+                    logger.error(f"Service failed to start within {self.HEALTH_CHECK_TIMEOUT} seconds")
+                    cleanup_processes()
+                    self._cleanup_service_metadata(force=True)
+                    return False
+                
+                load_seconds = time.time() - load_started
+                logger.info(f"[AUTONOMOUSLOCALAI] Main model service started on {upstream_socket or f'port {local_ai_port}'} in {load_seconds:.1f}s")
+                get_catalog().record_load_seconds(main_model, os.path.basename(main_model_path), load_seconds)
 
-                self._dump_running_service(service_metadata)
+                logger.info(f"Multi-model service started on port {port}")
+                if on_demand_models:
+                    logger.info(f"On-demand models ready: {on_demand_models}")
 
-                # Update service metadata to the FastAPI app
-                try:
-                    update_url = f"http://localhost:{port}/update"
-                    response = requests.post(update_url, json=service_metadata, timeout=10)
-                    response.raise_for_status()
-                except requests.exceptions.RequestException as e:
-                    logger.error(f"Failed to update service metadata: {str(e)}")
+                service_metadata["ai_state"] = "running"
+                if not self._publish_service_metadata(port, service_metadata):
                     cleanup_processes()
+                    self._cleanup_service_metadata(force=True)
                     return False
                 
+                if config.core.SUPERVISE_AI_SERVER:
+                    supervisor_pid = self._start_supervisor()
+                    if supervisor_pid:
+                        self.update_service_info({"supervisor_pid": supervisor_pid})
+                
                 return True
 
             except Exception as e:
@@ -460,19 +359,321 @@ class AutonomousLocalAIManager:
                 
         finally:
             # Restore original signal handlers
-            signal.signal(signal.SIGINT, original_sigint)
-            signal.signal(signal.SIGTERM, original_sigterm)
+            if in_main_thread:
+                signal.signal(signal.SIGINT, original_sigint)
+                signal.signal(signal.SIGTERM, original_sigterm)
             # Always remove the lock when done (success or failure)
             self._release_start_lock()
 
-    def _dump_running_service(self, metadata: dict):
-        """Dump the running service details to a file."""
+    def _prepare_models(self, model_list: List[str], quant: Optional[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Download every model and resolve its metadata from the catalog.
+        
+        Args:
+            model_list: Model names, main model first
+            quant: Quantization variant for every model, or None to select per model
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: Model name mapped to its local paths and metadata
+        """
+        catalog = get_catalog()
+        
+        models_info = {}
+        for i, model in enumerate(model_list):
+            logger.info(f"Downloading model {i+1}/{len(model_list)}: {model}")
+            model_quant = select_quant(model, requested=quant) if model in catalog else None
+            success, local_model_path = download_model_from_hf(model, quant=model_quant)
+            if not success or not local_model_path:
+                raise ModelNotFoundError(f"Model file not found for: {model}")
+            
+            if not os.path.exists(local_model_path):
+                raise ModelNotFoundError(f"Model file not found at: {local_model_path}")
+
+            # Get metadata from the model catalog
+            if model in catalog:
+                model_info = catalog[model]
+                variant = get_quant_variants(model).get(model_quant, {})
+                facts = catalog.refresh_facts(model, local_model_path)
+                metadata = {
+                    "task": model_info.get("task", "chat"),
+                    "ram": variant.get("ram", model_info.get("ram", None)),
+                    "quant": model_quant,
+                    "folder_name": model,  # Use model name as folder name
+                    "family": model_info.get("family"),
+                    "file_size": facts.get("size"),
+                    "sha256": facts.get("sha256"),
+                }
+                if model_info.get("loras") and metadata["task"] == "chat":
+                    metadata["loras"] = self._prepare_loras(model)
+            else:
+                # Fallback metadata if model not in the catalog
+                metadata = {
+                    "task": "chat",
+                    "ram": None,
+                    "folder_name": model,
+                    "family": None,
+                }
+            
+            models_info[model] = {
+                "local_model_path": local_model_path,
+                "metadata": metadata,
+                "on_demand": i > 0,  # First model is not on-demand
+                "local_projector_path": local_model_path + "-projector"
+            }
+        return models_info
+
+    def _prepare_loras(self, model: str) -> List[Dict[str, Any]]:
+        """
+        Download the LoRA adapters registered for a chat model.
+        
+        Returns:
+            List[Dict[str, Any]]: Adapters in llama-server ``--lora`` order, with the
+                ``id`` requests use to select them
+        """
+        loras = []
+        for adapter_name, lora_info in get_catalog()[model]["loras"].items():
+            success, lora_path = download_lora_from_hf(model, adapter_name)
+            if not success or not lora_path:
+                raise ModelNotFoundError(f"LoRA adapter file not found for: {model}/{adapter_name}")
+            loras.append({
+                "id": len(loras),
+                "name": adapter_name,
+                "path": lora_path,
+                "scale": lora_info.get("scale", 1.0)
+            })
+        logger.info(f"LoRA adapters for {model}: {[lora['name'] for lora in loras]}")
+        return loras
+
+    def _plan_launch(self, models_info: Dict[str, Dict[str, Any]], main_model: str, port: int, host: str,
+                     context_length: int, speculative: bool, workers: int) -> tuple[Dict[str, Any], list, int, Optional[str]]:
+        """
+        Build the service metadata and AI server command for the main model.
+        
+        Returns:
+            tuple: (service_metadata, running_ai_command, local_ai_port, upstream_socket)
+        """
+        main_model_info = models_info[main_model]
+        local_model_path = main_model_info["local_model_path"]
+        metadata = main_model_info["metadata"]
+        
+        folder_name = metadata.get("folder_name", "")
+        family = metadata.get("family", None)
+        ram = metadata.get("ram", None)
+        task = metadata.get("task", "chat")
+        config_name = metadata.get("config_name", "flux-dev")
+        is_lora = metadata.get("lora", False)
+        
+        # llama-server treats a --host ending in .sock as a Unix domain socket
+        local_ai_port, upstream_socket = self._allocate_upstream(task, port)
+        upstream_host = upstream_socket or host
+        
+        # Build command and service metadata for main model
+        if task == "embed":
+            running_ai_command = self._build_embed_command(local_model_path, local_ai_port, upstream_host)
+            service_metadata = self._create_service_metadata(
+                main_model, local_model_path, local_ai_port, port, context_length, task, False, None
+            )
+        elif task == "image-generation":
+            if not shutil.which("mlx-flux"):
+                raise AutonomousLocalAIServiceError("mlx-flux command not found in PATH")
+            
+            # Initialize LoRA variables
+            lora_paths = None
+            lora_scales = None
+            effective_model_path = local_model_path
+            
+            if is_lora:
+                lora_metadata_path = os.path.join(local_model_path, "metadata.json")
+                lora_metadata, error_msg = self._load_lora_metadata(lora_metadata_path)
+                if lora_metadata is None:
+                    logger.error(f"Failed to load LoRA metadata: {error_msg}")
+                    logger.warning("Falling back to regular model mode")
+                    is_lora = False
+                else:
+                    try:
+                        base_model_hash = lora_metadata["base_model"]
+                        success, base_model_path = download_model_from_hf(base_model_hash)
+                        if not success or not base_model_path:
+                            raise ModelNotFoundError(f"Base model file not found for: {base_model_hash}")
+                        
+                        # Construct absolute LoRA paths
+                        lora_paths = []
+                        for lora_path in lora_metadata["lora_paths"]:
+                            if os.path.isabs(lora_path):
+                                lora_paths.append(lora_path)
+                            else:
+                                lora_paths.append(os.path.join(local_model_path, lora_path))
+                        
+                        lora_scales = lora_metadata["lora_scales"]
+                        effective_model_path = base_model_path  # Use base model path for LoRA
+                        
+                        logger.info(f"LoRA model detected - using base model: {base_model_path}")
+                        logger.info(f"LoRA paths: {lora_paths}")
+                        logger.info(f"LoRA scales: {lora_scales}")
+                        
+                    except KeyError as e:
+                        logger.error(f"Missing required field in LoRA metadata: {e}")
+                        logger.warning("Falling back to regular model mode")
+                        is_lora = False
+                    except (OSError, IOError) as e:
+                        logger.error(f"File system error during LoRA setup: {e}")
+                        logger.warning("Falling back to regular model mode")
+                        is_lora = False
+                    except Exception as e:
+                        logger.error(f"Unexpected error during LoRA setup: {e}")
+                        logger.warning("Falling back to regular model mode")
+                        is_lora = False
+                
+            running_ai_command = self._build_image_generation_command(
+                effective_model_path, local_ai_port, host, config_name, lora_paths, lora_scales
+            )
+            service_metadata = self._create_service_metadata(
+                main_model, local_model_path, local_ai_port, port, context_length, task, False, None
+            )
+        else:
+            is_multimodal, projector_path = self._check_multimodal_support(local_model_path)
+            
+            service_metadata = self._create_service_metadata(
+                main_model, local_model_path, local_ai_port, port, context_length, 
+                task, is_multimodal, projector_path
+            )
+
+            # Resolve the draft model for speculative decoding, if any
+            draft_model, draft_model_path = self._resolve_draft_model(main_model, speculative)
+            service_metadata["draft_model"] = draft_model
+            service_metadata["draft_model_path"] = draft_model_path
+
+            # Size continuous-batching slots from the host and context budget
+            slot_context_length = self._family_context_length(folder_name, context_length)
+            parallel_slots = self._compute_parallel_slots(slot_context_length, ram)
+            service_metadata["parallel_slots"] = parallel_slots
+            service_metadata["slot_context_length"] = slot_context_length
+
+            # Adapters share the base weights and are selected per request
+            loras = metadata.get("loras", [])
+            service_metadata["loras"] = loras
+
+            # Build command based on model family
+            running_ai_command = self._build_model_command(
+                folder_name, local_model_path, local_ai_port, upstream_host, context_length, draft_model_path,
+                parallel_slots, [lora["path"] for lora in loras]
+            )
+
+            if service_metadata["multimodal"]:
+                running_ai_command.extend([
+                    "--mmproj", str(projector_path)
+                ])
+
+        # Add main model metadata
+        service_metadata["host"] = host
+        service_metadata["upstream_socket"] = upstream_socket
+        service_metadata["api_workers"] = workers
+        service_metadata["shared_state_path"] = str(self.shared_state_file.absolute())
+        service_metadata["family"] = family
+        service_metadata["folder_name"] = folder_name
+        service_metadata["ram"] = ram
+        service_metadata["speculative"] = speculative
+        service_metadata["running_ai_command"] = running_ai_command
+        
+        # Add multi-model information
+        service_metadata["models"] = {}
+        for model_name, model_info in models_info.items():
+            service_metadata["models"][model_name] = {
+                "local_model_path": model_info["local_model_path"],
+                "local_projector_path": model_info["local_projector_path"],
+                "metadata": model_info["metadata"],
+                "on_demand": model_info["on_demand"],
+                "active": model_name == main_model
+            }
+        
+        return service_metadata, running_ai_command, local_ai_port, upstream_socket
+
+    def _apply_launch_plan(self, plan: Dict[str, Any], port: int, host: str) -> tuple[Dict[str, Any], list, int, Optional[str]]:
+        """
+        Prepare a saved launch plan for launch.
+        
+        Only the AI server endpoint is resolved again, since a TCP port picked last time
+        may have been taken since.
+        
+        Returns:
+            tuple: (service_metadata, running_ai_command, local_ai_port, upstream_socket)
+        """
+        service_metadata = dict(plan["service_metadata"])
+        running_ai_command = list(plan["running_ai_command"])
+        local_ai_port, upstream_socket = self._allocate_upstream(service_metadata.get("task", "chat"), port)
+        if "--port" in running_ai_command:
+            running_ai_command[running_ai_command.index("--port") + 1] = str(local_ai_port)
+        if "--host" in running_ai_command:
+            running_ai_command[running_ai_command.index("--host") + 1] = upstream_socket or host
+        service_metadata.update({
+            "port": local_ai_port,
+            "upstream_socket": upstream_socket,
+            "running_ai_command": running_ai_command,
+            "last_activity": time.time(),
+        })
+        return service_metadata, running_ai_command, local_ai_port, upstream_socket
+
+    def _publish_service_metadata(self, port: int, service_metadata: dict) -> bool:
+        """Write service metadata to disk and push it to the FastAPI app."""
+        self._dump_running_service(service_metadata)
         try:
-            with open(self.msgpack_file, "wb") as f:
+            update_url = f"http://localhost:{port}/update"
+            response = get_http_client().post(update_url, json=service_metadata, timeout=10)
+            response.raise_for_status()
+            return True
+        except (requests.exceptions.RequestException, CircuitOpenError) as e:
+            logger.error(f"Failed to update service metadata: {str(e)}")
+            return False
+
+    def _start_supervisor(self) -> Optional[int]:
+        """Launch the detached crash supervisor for the AI server and return its PID."""
+        supervisor_command = [sys.executable, "-m", "local_ai.supervisor"]
+        supervisor_log = self.logs_dir / "supervisor.log"
+        try:
+            with open(supervisor_log, 'a') as log_file:
+                supervisor_process = subprocess.Popen(
+                    supervisor_command,
+                    stdout=log_file,
+                    stderr=log_file,
+                    preexec_fn=os.setsid
+                )
+            logger.info(f"AI server supervisor started (PID: {supervisor_process.pid}), logs written to {supervisor_log}")
+            return supervisor_process.pid
+        except Exception as e:
+            logger.error(f"Failed to start AI server supervisor: {str(e)}")
+            return None
+
+    def _dump_running_service(self, metadata: dict) -> bool:
+        """Dump the running service details to a file and publish them to the API workers."""
+        # Readers (the supervisor, the CLI) must never see a half-written file
+        temp_path = f"{self.msgpack_file}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
                 msgpack.dump(metadata, f)
+            os.replace(temp_path, self.msgpack_file)
         except Exception as e:
             logger.error(f"Error dumping running service: {str(e)}", exc_info=True)
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
             return False
+        self._publish_shared_state(metadata)
+        return True
+
+    def _publish_shared_state(self, metadata: dict) -> None:
+        """
+        Publish service metadata to the shared memory region read by the API workers.
+
+        Workers only re-decode the metadata when its version changes, instead of
+        re-reading the msgpack file on every request.
+        """
+        try:
+            if self._shared_state is None:
+                self._shared_state = SharedState(self.shared_state_file, create=True)
+            self._shared_state.publish_metadata(metadata)
+        except (SharedStateError, OSError) as e:
+            logger.warning(f"Failed to publish service metadata to shared state: {str(e)}")
 
     def get_running_model(self) -> Optional[str]:
         """
@@ -519,22 +720,43 @@ class AutonomousLocalAIManager:
             app_pid = service_info.get("app_pid")
             app_port = service_info.get("app_port")
             local_ai_port = service_info.get("port")
+            upstream_socket = service_info.get("upstream_socket")
+            
+            # Stop the supervisor first so it does not restart the server we are stopping
+            self.update_service_info({"ai_state": "stopping"})
+            self._terminate_process_safely(service_info.get("supervisor_pid"), "AI server supervisor", timeout=5, force=force)
 
             if force:
                 logger.info(f"Force stopping AutonomousLocalAI service '{hash_val}' running on port {app_port} (AI PID: {pid}, API PID: {app_pid})...")
             else:
                 logger.info(f"Stopping AutonomousLocalAI service '{hash_val}' running on port {app_port} (AI PID: {pid}, API PID: {app_pid})...")
             
+            # Persist speculative decoding and decode speed stats before the log is overwritten by the next launch
+            self._record_draft_stats(service_info)
+            self._record_decode_speed(service_info)
+            
             # Use the optimized termination methods with force parameter
             timeout = 0 if force else 15
             ai_stopped = self._terminate_process_safely(pid, "AutonomousLocalAI service", timeout=timeout, force=force)
             api_stopped = self._terminate_process_safely(app_pid, "API service", timeout=timeout, force=force)
+            # Old API processes left draining streams by reload_api()
+            for draining_pid in service_info.get("draining_api_pids", []):
+                self._terminate_process_safely(draining_pid, "draining API service", timeout=timeout, force=force)
             
             # Brief pause to allow system cleanup
             time.sleep(1)
             
-            # Verify ports are freed
-            ports_info = [(app_port, "API"), (local_ai_port, "AI")]
+            # Verify ports are freed; a socket-bound AI server holds no port
+            if upstream_socket:
+                ports_info = [(app_port, "API")]
+                try:
+                    os.unlink(upstream_socket)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"Failed to remove AI server socket {upstream_socket}: {e}")
+            else:
+                ports_info = [(app_port, "API"), (local_ai_port, "AI")]
             ports_freed = self._check_ports_freed(ports_info, max_retries=3)
             
             # Clean up metadata file - ONLY rely on direct process verification, not return values
@@ -1019,6 +1241,10 @@ class AutonomousLocalAIManager:
                     logger.warning(f"Could not verify process status, proceeding with cleanup: {e}")
             
             os.remove(self.msgpack_file)
+            if self._shared_state is not None:
+                self._shared_state.close()
+                self._shared_state = None
+            self.shared_state_file.unlink(missing_ok=True)
             logger.info("Service metadata file removed successfully")
             return True
             
@@ -1056,14 +1282,22 @@ class AutonomousLocalAIManager:
         ]
         return command
 
-    def _build_ai_command(self, model_path: str, port: int, host: str, context_length: int, template_path: Optional[str] = None, best_practice_path: Optional[str] = None) -> list:
-        """Build the AI command with common parameters."""
+    def _build_ai_command(self, model_path: str, port: int, host: str, context_length: int, template_path: Optional[str] = None, best_practice_path: Optional[str] = None, draft_model_path: Optional[str] = None, parallel_slots: int = 1, lora_paths: Optional[List[str]] = None) -> list:
+        """
+        Build the AI command with common parameters.
+        
+        llama-server splits ``-c`` evenly across slots, so the total context is scaled
+        by the slot count to give every slot the full ``context_length``. LoRA adapters
+        are loaded once with a scale of zero; requests enable them with a ``lora`` list.
+        """
         command = [
             self.llama_server_path,
             "--model", str(model_path),
             "--port", str(port),
             "--host", host,
-            "-c", str(context_length),
+            "-c", str(context_length * parallel_slots),
+            "-np", str(parallel_slots),
+            "--cont-batching",
             "-fa",
             "--pooling", "cls",
             "--embeddings",
@@ -1081,8 +1315,219 @@ class AutonomousLocalAIManager:
                 best_practice = json.load(f)
                 for key, value in best_practice.items():
                     command.extend([f"--{key}", str(value)])
+        
+        if draft_model_path:
+            command.extend([
+                "--model-draft", str(draft_model_path),
+                "--draft-max", str(config.model.DRAFT_MAX),
+                "--draft-min", str(config.model.DRAFT_MIN),
+                "--draft-p-min", str(config.model.DRAFT_P_MIN),
+                "-ngld", "9999"
+            ])
+        
+        if lora_paths:
+            for lora_path in lora_paths:
+                command.extend(["--lora", str(lora_path)])
+            command.append("--lora-init-without-apply")
         return command
 
+    def _compute_parallel_slots(self, context_length: int, ram: Optional[float] = None) -> int:
+        """
+        Compute the number of parallel decode slots for llama-server.
+        
+        The count is bounded by physical cores (decode threads are shared between slots),
+        by how many full-length contexts fit in CONTEXT_BUDGET, and drops to a single slot
+        when the host does not have memory headroom beyond the model itself.
+        
+        Args:
+            context_length: Context length each slot must support
+            ram: Estimated model RAM in GB from the registry, if known
+            
+        Returns:
+            int: Number of slots to pass to ``-np``
+        """
+        if config.model.PARALLEL_SLOTS:
+            return config.model.PARALLEL_SLOTS
+        
+        physical_cores = psutil.cpu_count(logical=False) or psutil.cpu_count() or 1
+        by_cores = max(1, physical_cores // 2)
+        by_context = max(1, config.model.CONTEXT_BUDGET // max(context_length, 1))
+        slots = min(config.model.MAX_PARALLEL_SLOTS, by_cores, by_context)
+        
+        if ram:
+            available_gb = psutil.virtual_memory().available / (1024 ** 3)
+            if available_gb < ram * 1.25:
+                logger.info(f"Limited memory headroom ({available_gb:.1f}GB available, model needs ~{ram}GB), using 1 slot")
+                slots = 1
+        
+        logger.info(f"Using {slots} parallel slots with {context_length} context tokens each")
+        return slots
+
+    def _resolve_draft_model(self, model_name: str, speculative: bool) -> tuple[Optional[str], Optional[str]]:
+        """
+        Resolve and download the draft model registered for a chat model.
+        
+        Args:
+            model_name: Name of the target model in the registry
+            speculative: Whether speculative decoding is requested
+            
+        Returns:
+            tuple: (draft_model_name, draft_model_path), both None if no draft model is used
+        """
+        if not speculative:
+            return None, None
+        
+        catalog = get_catalog()
+        draft_model = catalog.get(model_name, {}).get("draft")
+        if not draft_model or draft_model == model_name:
+            return None, None
+        
+        if draft_model not in catalog:
+            logger.warning(f"Draft model '{draft_model}' for '{model_name}' is not in the registry, skipping")
+            return None, None
+        
+        stats = self._load_draft_stats().get(model_name)
+        if stats and not self._draft_pays_off(stats):
+            logger.info(
+                f"Speculative decoding disabled for '{model_name}': "
+                f"measured accept rate {stats['accepted'] / stats['generated']:.2f} "
+                f"< {config.model.DRAFT_MIN_ACCEPT_RATE:.2f}"
+            )
+            return None, None
+        
+        logger.info(f"Downloading draft model '{draft_model}' for '{model_name}'")
+        success, draft_model_path = download_model_from_hf(draft_model, quant=select_quant(draft_model))
+        if not success or not draft_model_path or not os.path.exists(draft_model_path):
+            logger.warning(f"Draft model '{draft_model}' unavailable, continuing without speculative decoding")
+            return None, None
+        
+        return draft_model, draft_model_path
+
+    def _draft_pays_off(self, stats: Dict[str, Any]) -> bool:
+        """Check whether recorded draft acceptance is high enough to keep speculative decoding on."""
+        generated = stats.get("generated", 0)
+        if generated < config.model.DRAFT_MIN_SAMPLES:
+            return True
+        return stats.get("accepted", 0) / generated >= config.model.DRAFT_MIN_ACCEPT_RATE
+
+    def _load_draft_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Load accumulated speculative decoding stats keyed by model name."""
+        stats_file = Path(config.file_paths.DRAFT_STATS_FILE)
+        if not stats_file.exists():
+            return {}
+        try:
+            with open(stats_file, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable draft stats file {stats_file}: {e}")
+            return {}
+
+    def _record_draft_stats(self, service_info: Dict[str, Any]) -> None:
+        """
+        Accumulate the draft acceptance counters llama-server logged for the running model.
+        
+        llama-server prints one "draft acceptance rate" line per finished request, so the
+        totals are summed from the AI log of the current process.
+        """
+        draft_model = service_info.get("draft_model")
+        model_name = service_info.get("hash")
+        ai_log = self.logs_dir / "ai.log"
+        if not draft_model or not model_name or not ai_log.exists():
+            return
+        
+        pattern = re.compile(r"draft acceptance rate = [\d.]+ \(\s*(\d+) accepted /\s*(\d+) generated\)")
+        accepted = generated = 0
+        try:
+            with open(ai_log, "r", errors="replace") as f:
+                for line in f:
+                    match = pattern.search(line)
+                    if match:
+                        accepted += int(match.group(1))
+                        generated += int(match.group(2))
+        except OSError as e:
+            logger.warning(f"Failed to read draft stats from {ai_log}: {e}")
+            return
+        
+        if not generated:
+            return
+        
+        stats = self._load_draft_stats()
+        entry = stats.get(model_name, {"accepted": 0, "generated": 0})
+        if entry.get("draft") != draft_model:
+            entry = {"accepted": 0, "generated": 0}
+        paid_off = self._draft_pays_off(entry)
+        entry["draft"] = draft_model
+        entry["accepted"] += accepted
+        entry["generated"] += generated
+        entry["updated_at"] = time.time()
+        stats[model_name] = entry
+        
+        try:
+            with open(config.file_paths.DRAFT_STATS_FILE, "w") as f:
+                json.dump(stats, f, indent=2)
+            logger.info(
+                f"Draft acceptance for '{model_name}' with '{draft_model}': "
+                f"{accepted}/{generated} this run, {entry['accepted'] / entry['generated']:.2f} overall"
+            )
+        except OSError as e:
+            logger.warning(f"Failed to write draft stats: {e}")
+            return
+        if paid_off and not self._draft_pays_off(entry):
+            # The saved plan still launches with --model-draft
+            invalidate_launch_plan()
+
+    def _record_decode_speed(self, service_info: Dict[str, Any]) -> None:
+        """
+        Record the decode tokens/s llama-server measured for the running model in the catalog.
+        
+        Speeds from a run with a draft model are skipped since they do not reflect the
+        plain decode speed the quantization planner compares against.
+        """
+        model_name = service_info.get("hash")
+        model_path = service_info.get("local_text_path")
+        ai_log = self.logs_dir / "ai.log"
+        if not model_name or not model_path or service_info.get("draft_model") or not ai_log.exists():
+            return
+        
+        pattern = re.compile(r"(?<!prompt )eval time =\s*([\d.]+) ms /\s*(\d+) (?:tokens|runs)")
+        total_ms = 0.0
+        total_tokens = 0
+        try:
+            with open(ai_log, "r", errors="replace") as f:
+                for line in f:
+                    match = pattern.search(line)
+                    if match:
+                        total_ms += float(match.group(1))
+                        total_tokens += int(match.group(2))
+        except OSError as e:
+            logger.warning(f"Failed to read decode timings from {ai_log}: {e}")
+            return
+        
+        if total_tokens and total_ms > 0:
+            get_catalog().record_tokens_per_second(
+                model_name, os.path.basename(model_path), total_tokens / (total_ms / 1000), total_tokens
+            )
+
+    def get_draft_report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the measured speculative decoding accept rate per model.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Model name mapped to draft model, token counts,
+                                       accept rate and whether the draft stays enabled.
+        """
+        report = {}
+        for model_name, stats in self._load_draft_stats().items():
+            generated = stats.get("generated", 0)
+            report[model_name] = {
+                "draft": stats.get("draft"),
+                "accepted": stats.get("accepted", 0),
+                "generated": generated,
+                "accept_rate": stats.get("accepted", 0) / generated if generated else None,
+                "enabled": self._draft_pays_off(stats),
+            }
+        return report
+
 
     
     def _check_multimodal_support(self, local_model_path: str) -> tuple[bool, Optional[str]]:
@@ -1425,6 +1870,14 @@ class AutonomousLocalAIManager:
                 
             logger.info(f"Attempting to kill AI server with PID {pid}")
             
+            # Persist speculative decoding and decode speed stats before the log is overwritten by the next launch
+            self._record_draft_stats(service_info)
+            self._record_decode_speed(service_info)
+            
+            # Tell the supervisor this exit is intentional
+            service_info["ai_state"] = "stopping"
+            self._dump_running_service(service_info)
+            
             # Use the optimized async termination method
             success = await self._terminate_process_safely_async(pid, "AI server", timeout=15)
             
@@ -1434,8 +1887,7 @@ class AutonomousLocalAIManager:
                     # Remove PID from service info to indicate server is no longer running
                     service_info.pop("pid", None)
                     
-                    with open(self.msgpack_file, "wb") as f:
-                        msgpack.dump(service_info, f)
+                    self._dump_running_service(service_info)
                     
                     logger.info("AI server stopped successfully and service info cleaned up")
                 except Exception as e:
@@ -1468,6 +1920,11 @@ class AutonomousLocalAIManager:
                 
             logger.info(f"Reloading AI server with command: {running_ai_command}")
 
+            # A crashed server leaves its socket file behind, which would make the bind fail
+            upstream_socket = service_info.get("upstream_socket")
+            if upstream_socket:
+                Path(upstream_socket).unlink(missing_ok=True)
+
             ai_log_stderr = self.logs_dir / "ai.log"
             
             try:
@@ -1484,26 +1941,139 @@ class AutonomousLocalAIManager:
             
             # Wait for the process to start by checking the health endpoint
             port = service_info["port"]
-            if not wait_for_health(port, timeout=service_start_timeout):
+            if not wait_for_health(port, timeout=service_start_timeout, socket_path=upstream_socket):
                 logger.error(f"AI server failed to start within {service_start_timeout} seconds")
-                return False
-            
-            # Check if the process is running
-            if ai_process.poll() is None:
+            elif ai_process.poll() is None:
                 # Update the service info with new PID
                 service_info["pid"] = ai_process.pid
-                with open(self.msgpack_file, "wb") as f:
-                    msgpack.dump(service_info, f)
+                service_info["ai_state"] = "running"
+                self._dump_running_service(service_info)
                 logger.info(f"Successfully reloaded AI server with PID {ai_process.pid}")
                 return True
             else:
                 logger.error(f"Failed to reload AI server: Process exited with code {ai_process.returncode}")
-                return False
+            
+            # Do not leave a half-started server holding the port, and do not let the
+            # metadata name the old dead PID, which would read as a fresh crash
+            await self._terminate_process_safely_async(ai_process.pid, "failed AI server", timeout=5)
+            self.update_service_info({"pid": None, "ai_state": "crashed"})
+            return False
                 
         except Exception as e:
             logger.error(f"Error reloading AI server: {str(e)}", exc_info=True)
             return False
     
+    def _build_api_command(self, host: str, port: int, workers: int = 1) -> list:
+        """
+        Build the API command.
+        
+        The API runs through local_ai.serve, which binds the port with SO_REUSEPORT so
+        reload_api() can start a replacement process on the same port. With more than
+        one worker each worker process binds its own SO_REUSEPORT socket and the
+        kernel spreads connections across them.
+        """
+        return [
+            sys.executable, "-m", "local_ai.serve",
+            "--app", "local_ai.apis:app",
+            "--host", host,
+            "--port", str(port),
+            "--workers", str(workers),
+            "--log-level", "info",
+            "--graceful-timeout", str(int(config.performance.STREAM_TIMEOUT))
+        ]
+
+    def _wait_for_listen(self, pid: int, port: int, timeout: int) -> bool:
+        """Wait until process ``pid`` or one of its worker processes has a listening socket on ``port``."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                process = psutil.Process(pid)
+                if process.status() == psutil.STATUS_ZOMBIE:
+                    return False
+                for candidate in [process] + process.children(recursive=True):
+                    try:
+                        connections = candidate.net_connections(kind="inet")
+                    except psutil.NoSuchProcess:
+                        continue
+                    for conn in connections:
+                        if conn.status == psutil.CONN_LISTEN and conn.laddr and conn.laddr.port == port:
+                            return True
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                return False
+            time.sleep(config.performance.PROCESS_CHECK_INTERVAL)
+        return False
+
+    def reload_api(self) -> bool:
+        """
+        Replace the API process without dropping connections.
+
+        A new API process binds the same port via SO_REUSEPORT. Once it is listening the
+        old process gets SIGTERM, which makes uvicorn close its listener immediately and
+        drain open SSE streams for up to STREAM_TIMEOUT before exiting. Its PID is kept
+        in ``draining_api_pids`` so ``stop()`` can terminate it if it is still draining.
+        The service metadata is then posted to the new process.
+
+        Returns:
+            bool: True if the new API process is serving, False otherwise.
+        """
+        try:
+            service_info = self.get_service_info()
+        except AutonomousLocalAIServiceError as e:
+            logger.error(f"Cannot reload API: {str(e)}")
+            return False
+        
+        old_pid = service_info.get("app_pid")
+        port = service_info.get("app_port")
+        host = service_info.get("host", config.network.DEFAULT_HOST)
+        workers = service_info.get("api_workers", 1)
+        api_command = self._build_api_command(host, port, workers)
+        logger.info(f"Starting replacement API process: {' '.join(api_command)}")
+        
+        api_log_stderr = self.logs_dir / "api.log"
+        try:
+            with open(api_log_stderr, 'a') as stderr_log:
+                new_process = subprocess.Popen(
+                    api_command,
+                    stderr=stderr_log,
+                    preexec_fn=os.setsid
+                )
+        except Exception as e:
+            logger.error(f"Error starting replacement API process: {str(e)}", exc_info=True)
+            return False
+        
+        if not self._wait_for_listen(new_process.pid, port, self.HEALTH_CHECK_TIMEOUT):
+            logger.error("Replacement API process failed to bind its port, keeping the current one")
+            self._terminate_process_safely(new_process.pid, "replacement API service", timeout=5)
+            return False
+        
+        # Stop the old process from accepting; it drains open streams on its own schedule
+        draining = [pid for pid in service_info.get("draining_api_pids", []) if psutil.pid_exists(pid)]
+        if old_pid and psutil.pid_exists(old_pid):
+            try:
+                os.kill(old_pid, signal.SIGTERM)
+                draining.append(old_pid)
+                logger.info(f"Old API process (PID: {old_pid}) draining open streams for up to {int(config.performance.STREAM_TIMEOUT)}s")
+            except (ProcessLookupError, PermissionError) as e:
+                logger.warning(f"Failed to signal old API process (PID: {old_pid}): {e}")
+        service_info["draining_api_pids"] = draining
+        self.update_service_info({"draining_api_pids": draining})
+        
+        if not wait_for_health(port):
+            logger.error("Replacement API process failed health check")
+            return False
+        
+        service_info["app_pid"] = new_process.pid
+        try:
+            response = get_http_client().post(f"http://localhost:{port}/update", json=service_info, timeout=10)
+            response.raise_for_status()
+        except (requests.exceptions.RequestException, CircuitOpenError) as e:
+            logger.error(f"Failed to update service metadata on the replacement API: {str(e)}")
+            return False
+        
+        self.update_service_info({"app_pid": new_process.pid})
+        logger.info(f"API reloaded with PID {new_process.pid}")
+        return True
+
     def get_service_info(self) -> Dict[str, Any]:
         """Get service info from msgpack file with error handling."""
         if not os.path.exists(self.msgpack_file):
@@ -1526,10 +2096,7 @@ class AutonomousLocalAIManager:
             
             service_info.update(updates)
             
-            with open(self.msgpack_file, "wb") as f:
-                msgpack.dump(service_info, f)
-            
-            return True
+            return self._dump_running_service(service_info)
         except Exception as e:
             logger.error(f"Failed to update service info: {str(e)}")
             return False
@@ -1563,53 +2130,54 @@ class AutonomousLocalAIManager:
         
         return command
 
-    def _build_model_command(self, folder_name: str, local_model_path: str, local_ai_port: int, host: str, context_length: int) -> list:
+    def _family_context_length(self, folder_name: str, context_length: int) -> int:
+        """Per-slot context a model family actually runs with (gemma-3 uses half the configured length)."""
+        if infer_family(folder_name) == "gemma-3":
+            return context_length // 2
+        return context_length
+
+    def _build_model_command(self, folder_name: str, local_model_path: str, local_ai_port: int, host: str, context_length: int, draft_model_path: Optional[str] = None, parallel_slots: int = 1, lora_paths: Optional[List[str]] = None) -> list:
         """Build the appropriate command for a model based on its family."""
-        if "gemma-3n" in folder_name.lower():
-            template_path, best_practice_path = self._get_family_template_and_practice("gemma-3n")
+        family = infer_family(folder_name)
+        if family is None:
             return self._build_ai_command(
-                local_model_path, local_ai_port, host, context_length, template_path
-            )
-        elif "gemma-3" in folder_name.lower():
-            context_length = context_length // 2
-            template_path, best_practice_path = self._get_family_template_and_practice("gemma-3")
-            return self._build_ai_command(
-                local_model_path, local_ai_port, host, context_length, template_path
-            )
-        elif "lfm2" in folder_name.lower():
-            template_path, best_practice_path = self._get_family_template_and_practice("lfm2")
-            return self._build_ai_command(
-                local_model_path, local_ai_port, host, context_length, template_path, best_practice_path
-            )
-        elif "devstral-small" in folder_name.lower():
-            template_path, best_practice_path = self._get_family_template_and_practice("devstral-small")
-            return self._build_ai_command(
-                local_model_path, local_ai_port, host, context_length, template_path, best_practice_path
-            )
-        elif "qwen25" in folder_name.lower():
-            template_path, best_practice_path = self._get_family_template_and_practice("qwen25")
-            return self._build_ai_command(
-                local_model_path, local_ai_port, host, context_length, template_path, best_practice_path
-            )
-        elif "qwen3" in folder_name.lower():
-            template_path, best_practice_path = self._get_family_template_and_practice("qwen3")
-            return self._build_ai_command(
-                local_model_path, local_ai_port, host, context_length, template_path, best_practice_path
-            )
-        elif "llama" in folder_name.lower():
-            template_path, best_practice_path = self._get_family_template_and_practice("llama")
-            return self._build_ai_command(
-                local_model_path, local_ai_port, host, context_length, template_path, best_practice_path
-            )
-        else:
-            return self._build_ai_command(
-                local_model_path, local_ai_port, host, context_length
+                local_model_path, local_ai_port, host, context_length,
+                draft_model_path=draft_model_path, parallel_slots=parallel_slots, lora_paths=lora_paths
             )
+        template_path, best_practice_path = self._get_family_template_and_practice(family)
+        context_length = self._family_context_length(folder_name, context_length)
+        if family in ("gemma-3n", "gemma-3"):
+            best_practice_path = None
+        return self._build_ai_command(
+            local_model_path, local_ai_port, host, context_length, template_path, best_practice_path,
+            draft_model_path=draft_model_path, parallel_slots=parallel_slots, lora_paths=lora_paths
+        )
+
+    def switch_model_blocking(self, target_hash: str, service_start_timeout: int = 120) -> bool:
+        """
+        Run ``switch_model()`` to completion on its own event loop, one switch at a time.
+
+        ``switch_model()`` blocks in health checks and draft downloads, so callers on an
+        event loop run this in a thread. An ``flock`` on ``RUN_DIR/switch.lock`` orders
+        switches from every process (API workers, the daemon); a switch that finds its
+        target already active after waiting returns True without touching the server.
+        """
+        lock_path = Path(config.file_paths.RUN_DIR) / "switch.lock"
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            return asyncio.run(self.switch_model(target_hash, service_start_timeout))
 
     async def switch_model(self, target_hash: str, service_start_timeout: int = 120) -> bool:
         """
         Switch to a different model that was registered during multi-model start.
         This will offload the currently active model and load the requested model.
+        
+        The new model is verified with a warmup generation and relaunched up to
+        MODEL_SWITCH_MAX_RETRIES times. The gateway should call this through
+        ``AdmissionController.switch`` so in-flight streams drain first and new
+        requests queue during the load, and off its event loop through
+        ``switch_model_blocking()``.
 
         Args:
             target_hash (str): Hash of the model to switch to.
@@ -1640,6 +2208,7 @@ class AutonomousLocalAIManager:
 
             target_model = models[target_hash]
             logger.info(f"Switching to model: {target_hash}")
+            switch_started = time.time()
 
             # Kill current AI server process
             if not await self.kill_ai_server():
@@ -1654,13 +2223,16 @@ class AutonomousLocalAIManager:
             config_name = metadata.get("config_name", "flux-dev")
             
             # Get current service configuration
-            local_ai_port = service_info["port"]
             host = service_info.get("host", "localhost")
             context_length = service_info.get("context_length", 32768)
+            current_port = None if service_info.get("upstream_socket") else service_info["port"]
+            local_ai_port, upstream_socket = self._allocate_upstream(task, service_info.get("app_port"), current_port)
+            upstream_host = upstream_socket or host
 
             # Build appropriate command based on task
+            draft_model, draft_model_path = None, None
             if task == "embed":
-                running_ai_command = self._build_embed_command(local_model_path, local_ai_port, host)
+                running_ai_command = self._build_embed_command(local_model_path, local_ai_port, upstream_host)
             elif task == "image-generation":
                 if not shutil.which("mlx-flux"):
                     raise AutonomousLocalAIServiceError("mlx-flux command not found in PATH")
@@ -1717,7 +2289,17 @@ class AutonomousLocalAIManager:
                     effective_model_path, local_ai_port, host, config_name, lora_paths, lora_scales
                 )
             else:
-                running_ai_command = self._build_model_command(folder_name, local_model_path, local_ai_port, host, context_length)
+                draft_model, draft_model_path = self._resolve_draft_model(
+                    target_hash, service_info.get("speculative", config.model.SPECULATIVE_DECODING)
+                )
+                slot_context_length = self._family_context_length(folder_name, context_length)
+                parallel_slots = self._compute_parallel_slots(slot_context_length, metadata.get("ram"))
+                service_info["parallel_slots"] = parallel_slots
+                service_info["slot_context_length"] = slot_context_length
+                running_ai_command = self._build_model_command(
+                    folder_name, local_model_path, local_ai_port, upstream_host, context_length, draft_model_path,
+                    parallel_slots, [lora["path"] for lora in metadata.get("loras", [])]
+                )
                 
                 # Add multimodal support if available
                 is_multimodal, projector_path = self._check_multimodal_support(local_model_path)
@@ -1728,44 +2310,70 @@ class AutonomousLocalAIManager:
 
             logger.info(f"Starting new model with command: {running_ai_command}")
 
-            # Start new AI server process
+            # Start new AI server process, relaunching it if it fails health or warmup
             ai_log_stderr = self.logs_dir / "ai.log"
-            try:
-                with open(ai_log_stderr, 'w') as stderr_log:
-                    ai_process = subprocess.Popen(
-                        running_ai_command,
-                        stderr=stderr_log,
-                        preexec_fn=os.setsid
-                    )
-                logger.info(f"AI logs written to {ai_log_stderr}")
-            except Exception as e:
-                logger.error(f"Error starting new model: {str(e)}", exc_info=True)
-                return False
+            max_retries = config.performance.MODEL_SWITCH_MAX_RETRIES
+            ai_process = None
+            for attempt in range(1, max_retries + 1):
+                if upstream_socket:
+                    Path(upstream_socket).unlink(missing_ok=True)
+                try:
+                    with open(ai_log_stderr, 'w') as stderr_log:
+                        ai_process = subprocess.Popen(
+                            running_ai_command,
+                            stderr=stderr_log,
+                            preexec_fn=os.setsid
+                        )
+                    logger.info(f"AI logs written to {ai_log_stderr}")
+                except Exception as e:
+                    logger.error(f"Error starting new model: {str(e)}", exc_info=True)
+                    return False
+
+                if not wait_for_health(local_ai_port, timeout=service_start_timeout, socket_path=upstream_socket):
+                    logger.warning(f"New model failed to start within {service_start_timeout} seconds (attempt {attempt}/{max_retries})")
+                elif await self._verify_model(task, local_ai_port, upstream_socket):
+                    break
+                else:
+                    logger.warning(f"New model failed warmup generation (attempt {attempt}/{max_retries})")
+
+                await self._terminate_process_safely_async(ai_process.pid, "AutonomousLocalAI service", timeout=5)
+                ai_process = None
+                if attempt < max_retries:
+                    await asyncio.sleep(config.performance.MODEL_SWITCH_VERIFICATION_DELAY)
 
-            # Wait for the new process to start
-            if not wait_for_health(local_ai_port, timeout=service_start_timeout):
-                logger.error(f"New model failed to start within {service_start_timeout} seconds")
+            if ai_process is None:
+                logger.error(f"Failed to switch to model {target_hash} after {max_retries} attempts")
                 return False
+            
+            # Switch cost as seen by clients, used by the router to weigh future switches
+            get_catalog().record_load_seconds(
+                target_hash, os.path.basename(local_model_path), time.time() - switch_started
+            )
 
             # Update service metadata
             service_info["hash"] = target_hash
+            service_info["port"] = local_ai_port
+            service_info["upstream_socket"] = upstream_socket
             service_info["pid"] = ai_process.pid
+            service_info["ai_state"] = "running"
             service_info["running_ai_command"] = running_ai_command
             service_info["local_text_path"] = local_model_path
             service_info["family"] = metadata.get("family", None)
             service_info["folder_name"] = folder_name
             service_info["ram"] = metadata.get("ram", None)
             service_info["task"] = task
+            service_info["loras"] = metadata.get("loras", []) if task == "chat" else []
             service_info["multimodal"] = target_model.get("multimodal", False)
             service_info["local_projector_path"] = target_model.get("local_projector_path")
+            service_info["draft_model"] = draft_model
+            service_info["draft_model_path"] = draft_model_path
 
             # Update active model flags
             for hash_val in models:
                 models[hash_val]["active"] = (hash_val == target_hash)
 
             # Save updated service info
-            with open(self.msgpack_file, "wb") as f:
-                msgpack.dump(service_info, f)
+            self._dump_running_service(service_info)
 
             logger.info(f"Successfully switched to model {target_hash} with PID {ai_process.pid}")
             return True
@@ -1774,6 +2382,42 @@ class AutonomousLocalAIManager:
             logger.error(f"Error switching model: {str(e)}", exc_info=True)
             return False
 
+    async def _verify_model(self, task: str, port: int, upstream_socket: Optional[str] = None) -> bool:
+        """
+        Verify a freshly loaded model with a real one-token warmup request.
+        
+        /health reports ok as soon as the weights are mapped; a warmup generation also
+        catches models that load but cannot generate, and pages the weights in before
+        client traffic arrives.
+        
+        Args:
+            task: Task of the loaded model
+            port: AI server port
+            upstream_socket: Unix domain socket of the AI server, if any
+            
+        Returns:
+            bool: True if the warmup request succeeded
+        """
+        if task == "image-generation":
+            return True
+        
+        await asyncio.sleep(config.performance.MODEL_SWITCH_VERIFICATION_DELAY)
+        base_url = upstream_base_url({"port": port, "upstream_socket": upstream_socket})
+        if task == "embed":
+            url, body = f"{base_url}/embedding", {"content": "warmup"}
+        else:
+            url, body = f"{base_url}/completion", {"prompt": "Hello", "n_predict": 1, "cache_prompt": False}
+        
+        try:
+            response = await get_async_http_client(upstream_socket).post(
+                url, json=body, retries=1, use_breaker=False, timeout=config.core.REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            return True
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            logger.warning(f"Warmup request to {url} failed: {str(e)[:100]}")
+            return False
+
     def get_available_models(self) -> Dict[str, Dict[str, Any]]:
         """
         Get information about all available models in the current service.
@@ -0,0 +1,291 @@
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import asyncio
+import subprocess
+from pathlib import Path
+from loguru import logger
+from typing import Optional, Dict, Any, Callable, Awaitable
+from local_ai.config import config
+
+# Control operations run one at a time; status and ping are answered immediately
+SERIALIZED_METHODS = ("start", "stop", "switch", "reload_api")
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+
+class DaemonError(Exception):
+    """Exception raised when the manager daemon is unreachable or an RPC fails."""
+    pass
+
+
+def _pid_file(socket_path: Path) -> Path:
+    return socket_path.with_name(socket_path.name + ".pid")
+
+
+def daemon_alive(socket_path: Optional[str] = None) -> bool:
+    """
+    Whether a daemon owns the control socket, even if it is too busy to answer.
+
+    Checks the owner PID recorded next to the socket, then whether anything accepts
+    connections on it; a connect succeeds as soon as the listener exists, unlike a ping.
+    """
+    socket_path = Path(socket_path or config.file_paths.DAEMON_SOCKET)
+    if not socket_path.exists():
+        return False
+    try:
+        pid = int(_pid_file(socket_path).read_text().strip())
+        os.kill(pid, 0)
+        return True
+    except (OSError, ValueError):
+        pass
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(0.5)
+            sock.connect(str(socket_path))
+        return True
+    except OSError:
+        return False
+
+
+class ManagerDaemon:
+    """
+    Resident owner of the llama-server and API processes.
+
+    One ``AutonomousLocalAIManager`` lives for the lifetime of the daemon, so binary
+    discovery and metadata loading happen once, and every service process is a child
+    of the daemon. Clients talk to it over a Unix socket with one JSON object per
+    line: ``{"method": ..., "params": {...}}`` answered by ``{"ok": true, "result": ...}``
+    or ``{"ok": false, "error": ...}``. Control operations (start, stop, switch,
+    reload_api) queue behind a lock instead of failing on the start lock file.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, manager=None):
+        if manager is None:
+            from local_ai.core import AutonomousLocalAIManager
+            manager = AutonomousLocalAIManager()
+        self.manager = manager
+        self.socket_path = Path(socket_path or config.file_paths.DAEMON_SOCKET)
+        self.started_at = time.time()
+        self.current_operation: Optional[str] = None
+        self.queued_operations = 0
+        self._control_lock = asyncio.Lock()
+        self._stopping: Optional[asyncio.Event] = None
+        self._methods: Dict[str, Callable[..., Awaitable[Any]]] = {
+            "ping": self._ping,
+            "status": self._status,
+            "start": self._start,
+            "stop": self._stop,
+            "switch": self._switch,
+            "reload_api": self._reload_api,
+            "shutdown": self._shutdown,
+        }
+
+    async def _ping(self) -> Dict[str, Any]:
+        return {"pid": os.getpid()}
+
+    async def _status(self) -> Dict[str, Any]:
+        try:
+            service_info = self.manager.get_service_info()
+        except Exception:
+            service_info = None
+        return {
+            "daemon": {
+                "pid": os.getpid(),
+                "uptime": round(time.time() - self.started_at, 1),
+                "current_operation": self.current_operation,
+                "queued_operations": self.queued_operations,
+            },
+            "service": service_info,
+        }
+
+    async def _start(self, **params: Any) -> bool:
+        # start() blocks on health checks for minutes, keep the event loop answering status
+        return await asyncio.to_thread(self.manager.start, **params)
+
+    async def _stop(self, force: bool = False) -> bool:
+        return await asyncio.to_thread(self.manager.stop, force)
+
+    async def _switch(self, model: str) -> bool:
+        # switch_model() blocks in wait_for_health(), so give it its own loop in a thread
+        return await asyncio.to_thread(self.manager.switch_model_blocking, model)
+
+    async def _reload_api(self) -> bool:
+        return await asyncio.to_thread(self.manager.reload_api)
+
+    async def _shutdown(self, stop_service: bool = True) -> bool:
+        if stop_service and self.manager.get_running_model():
+            await self._call("stop", {"force": False})
+        self._stopping.set()
+        return True
+
+    async def _call(self, method: str, params: Dict[str, Any]) -> Any:
+        handler = self._methods.get(method)
+        if handler is None:
+            raise DaemonError(f"Unknown method: {method}")
+        if method not in SERIALIZED_METHODS:
+            return await handler(**params)
+
+        self.queued_operations += 1
+        if self._control_lock.locked():
+            logger.info(f"Queuing {method} behind {self.current_operation}")
+        try:
+            await self._control_lock.acquire()
+        finally:
+            self.queued_operations -= 1
+        self.current_operation = method
+        started = time.time()
+        try:
+            return await handler(**params)
+        finally:
+            self.current_operation = None
+            self._control_lock.release()
+            logger.info(f"{method} finished in {time.time() - started:.1f}s")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    result = await self._call(request["method"], request.get("params") or {})
+                    response = {"ok": True, "result": result}
+                except (ValueError, KeyError, TypeError) as e:
+                    response = {"ok": False, "error": f"Invalid request: {e}"}
+                except DaemonError as e:
+                    response = {"ok": False, "error": str(e)}
+                except Exception as e:
+                    logger.error(f"Control request failed: {str(e)}", exc_info=True)
+                    response = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(response, default=str).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        """Serve control requests until ``shutdown`` or SIGTERM/SIGINT."""
+        self._stopping = asyncio.Event()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if daemon_alive(str(self.socket_path)):
+            raise DaemonError(f"Another manager daemon owns {self.socket_path}")
+        self.socket_path.unlink(missing_ok=True)
+        server = await asyncio.start_unix_server(self._handle_connection, path=str(self.socket_path),
+                                                 limit=MAX_MESSAGE_SIZE)
+        os.chmod(self.socket_path, 0o600)
+        pid_file = _pid_file(self.socket_path)
+        pid_file.write_text(str(os.getpid()))
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, lambda: loop.create_task(self._shutdown()))
+
+        logger.info(f"Manager daemon listening on {self.socket_path} (PID: {os.getpid()})")
+        try:
+            async with server:
+                await self._stopping.wait()
+        finally:
+            self.socket_path.unlink(missing_ok=True)
+            pid_file.unlink(missing_ok=True)
+            logger.info("Manager daemon stopped")
+
+
+class DaemonClient:
+    """Blocking client for the manager daemon's control socket."""
+
+    def __init__(self, socket_path: Optional[str] = None):
+        self.socket_path = str(socket_path or config.file_paths.DAEMON_SOCKET)
+
+    def call(self, method: str, timeout: Optional[float] = 10.0, **params: Any) -> Any:
+        """
+        Invoke a daemon method.
+
+        Args:
+            method: Method name (start, stop, switch, reload_api, status, ping, shutdown)
+            timeout: Seconds to wait for the reply, None to wait indefinitely
+            **params: Method parameters
+
+        Returns:
+            Any: The method's result
+
+        Raises:
+            DaemonError: If the daemon is unreachable or the method failed
+        """
+        request = json.dumps({"method": method, "params": params}).encode() + b"\n"
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout)
+                sock.connect(self.socket_path)
+                sock.sendall(request)
+                with sock.makefile("rb") as reply:
+                    line = reply.readline(MAX_MESSAGE_SIZE)
+        except OSError as e:
+            raise DaemonError(f"Manager daemon unreachable at {self.socket_path}: {e}")
+        if not line:
+            raise DaemonError("Manager daemon closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "Unknown error"))
+        return response.get("result")
+
+    def is_running(self) -> bool:
+        try:
+            self.call("ping", timeout=2)
+            return True
+        except DaemonError:
+            return False
+
+
+def ensure_daemon(socket_path: Optional[str] = None, timeout: Optional[float] = None) -> DaemonClient:
+    """
+    Connect to the manager daemon, spawning a detached one if none is running.
+
+    Raises:
+        DaemonError: If the daemon does not come up within ``timeout`` (default DAEMON_START_TIMEOUT)
+    """
+    client = DaemonClient(socket_path)
+    if daemon_alive(client.socket_path):
+        # A daemon busy with a long operation may not answer a ping; never start a second one
+        return client
+
+    logs_dir = Path(config.file_paths.LOGS_DIR)
+    logs_dir.mkdir(exist_ok=True)
+    command = [sys.executable, "-m", "local_ai.daemon", "--socket", client.socket_path]
+    with open(logs_dir / "daemon.log", "a") as log_file:
+        subprocess.Popen(command, stdout=log_file, stderr=log_file, stdin=subprocess.DEVNULL,
+                         start_new_session=True)
+
+    deadline = time.time() + (timeout or config.core.DAEMON_START_TIMEOUT)
+    while time.time() < deadline:
+        if daemon_alive(client.socket_path) and client.is_running():
+            return client
+        time.sleep(0.1)
+    raise DaemonError(f"Manager daemon did not start within {timeout or config.core.DAEMON_START_TIMEOUT}s, "
+                      f"see {logs_dir / 'daemon.log'}")
+
+
+def main() -> None:
+    """Run the manager daemon in the foreground."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Local AI manager daemon")
+    parser.add_argument("--socket", help="Control socket path (default from config)")
+    args = parser.parse_args()
+
+    client = DaemonClient(args.socket)
+    if daemon_alive(client.socket_path):
+        logger.error(f"Manager daemon already running on {client.socket_path}")
+        sys.exit(1)
+    try:
+        asyncio.run(ManagerDaemon(args.socket).serve())
+    except DaemonError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,35 @@
 import time
+from typing import Optional, Tuple
 from loguru import logger
-from local_ai.model import MODELS
+from local_ai.catalog import get_catalog
 from local_ai.config import DEFAULT_MODEL_DIR
+from local_ai.quant import get_quant_variants, requantize, QuantizationError
 from huggingface_hub import hf_hub_download
 
-def download_model_from_hf(model_name: str, attempt: int = 3) -> str:
+def download_model_from_hf(model_name: str, attempt: int = 3, quant: Optional[str] = None) -> str:
+    
+    model_info = get_catalog()[model_name]
+    repo_id = model_info["repo"]
+    file_name = model_info["file"]
+    
+    if quant:
+        variants = get_quant_variants(model_name)
+        if quant not in variants:
+            logger.error(f"Quantization {quant} not available for model {model_name}")
+            return False, None
+        variant = variants[quant]
+        if variant.get("requantize_from"):
+            # Fetch the published source variant, then requantize it into the local cache
+            success, source_path = download_model_from_hf(model_name, attempt, variant["requantize_from"])
+            if not success:
+                return False, None
+            try:
+                return True, requantize(source_path, quant)
+            except QuantizationError as e:
+                logger.error(f"Failed to requantize model {model_name} to {quant}: {e}")
+                return False, None
+        file_name = variant["file"]
     
-    repo_id = MODELS[model_name]["repo"]
-    file_name = MODELS[model_name]["file"]
     file_path = DEFAULT_MODEL_DIR / file_name
     
     if file_path.exists():
@@ -28,3 +50,27 @@ def download_model_from_hf(model_name: str, attempt: int = 3) -> str:
             time.sleep(1)
     logger.error(f"Failed to download model {model_name} after {attempt} attempts")
     return False, None
+
+def download_lora_from_hf(model_name: str, adapter_name: str, attempt: int = 3) -> Tuple[bool, Optional[str]]:
+    
+    lora_info = get_catalog()[model_name]["loras"][adapter_name]
+    file_path = DEFAULT_MODEL_DIR / lora_info["file"]
+    
+    if file_path.exists():
+        return True, str(file_path)
+    
+    for _ in range(attempt):
+        try:
+            hf_hub_download(
+                repo_id = lora_info["repo"],
+                filename = lora_info["file"],
+                local_dir = DEFAULT_MODEL_DIR
+            )
+            logger.success(f"LoRA adapter {adapter_name} for {model_name} downloaded successfully")
+            
+            return True, str(file_path)
+        except Exception:
+            logger.warning(f"Failed to download LoRA adapter {adapter_name} after {_ + 1} attempts")
+            time.sleep(1)
+    logger.error(f"Failed to download LoRA adapter {adapter_name} after {attempt} attempts")
+    return False, None
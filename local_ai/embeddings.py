@@ -0,0 +1,157 @@
+import json
+import base64
+import msgpack
+from typing import Optional, Dict, Any, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency: pip install AutonomousLocalAI[vectors]
+    np = None
+
+ENCODING_FORMATS = ("float", "base64")
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack")
+# Little-endian wire types, as OpenAI's base64 float32 encoding
+WIRE_DTYPES = {"float32": "<f4", "float16": "<f2", "int8": "i1"}
+DEFAULT_OPTIONS = {"encoding_format": "float", "dtype": "float32", "dimensions": None, "normalize": False}
+# Request fields the gateway handles; llama-server never sees them
+OPTION_FIELDS = ("encoding_format", "dtype", "dimensions", "normalize")
+
+
+class EmbeddingFormatError(ValueError):
+    """Exception raised for unsupported embedding output options."""
+    pass
+
+
+def parse_embedding_options(body: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Split an embeddings request into the upstream body and the output options.
+
+    Options (all optional, OpenAI-compatible where OpenAI has the field):
+        encoding_format: "float" (JSON numbers) or "base64" (little-endian bytes)
+        dtype: "float32", "float16" or "int8" (symmetric, per-vector ``scale``)
+        dimensions: Keep the first N dimensions (Matryoshka truncation)
+        normalize: L2-normalize; defaults to true when ``dimensions`` is set
+
+    Returns:
+        tuple: (body to forward, options)
+
+    Raises:
+        EmbeddingFormatError: If an option is invalid
+    """
+    encoding_format = body.get("encoding_format") or "float"
+    if encoding_format not in ENCODING_FORMATS:
+        raise EmbeddingFormatError(f"encoding_format must be one of {', '.join(ENCODING_FORMATS)}")
+    dtype = body.get("dtype") or "float32"
+    if dtype not in EMBEDDING_DTYPES:
+        raise EmbeddingFormatError(f"dtype must be one of {', '.join(EMBEDDING_DTYPES)}")
+    dimensions = body.get("dimensions")
+    if dimensions is not None and (not isinstance(dimensions, int) or isinstance(dimensions, bool) or dimensions < 1):
+        raise EmbeddingFormatError("dimensions must be a positive integer")
+    normalize = body.get("normalize")
+    if normalize is None:
+        normalize = dimensions is not None
+
+    options = {"encoding_format": encoding_format, "dtype": dtype, "dimensions": dimensions, "normalize": bool(normalize)}
+    upstream = {key: value for key, value in body.items() if key not in OPTION_FIELDS}
+    if np is not None:
+        # Ask llama-server for base64 too, so the gateway never parses float text
+        upstream["encoding_format"] = "base64"
+    return upstream, options
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """Whether an Accept header asks for a msgpack body."""
+    return bool(accept) and any(content_type in accept for content_type in MSGPACK_CONTENT_TYPES)
+
+
+def decode_embedding_matrix(data: List[Dict[str, Any]]) -> "np.ndarray":
+    """Stack the ``data`` items of an embeddings response (float lists or base64 float32) into a matrix."""
+    rows = []
+    for item in data:
+        embedding = item.get("embedding")
+        if isinstance(embedding, str):
+            rows.append(np.frombuffer(base64.b64decode(embedding), dtype="<f4"))
+        else:
+            rows.append(np.asarray(embedding, dtype=np.float32))
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32)
+    if any(row.ndim != 1 or len(row) != len(rows[0]) for row in rows):
+        raise EmbeddingFormatError("Per-token embeddings (pooling none) cannot be reformatted")
+    return np.stack(rows)
+
+
+def encode_embeddings(response: Dict[str, Any], options: Dict[str, Any], binary: bool = False) -> Dict[str, Any]:
+    """
+    Reformat an upstream ``/v1/embeddings`` response; all inputs are processed as one matrix.
+
+    Args:
+        response: Upstream response body (float lists or base64 float32)
+        options: From ``parse_embedding_options()``
+        binary: Emit raw bytes instead of base64 strings, for msgpack bodies
+
+    Raises:
+        EmbeddingFormatError: If numpy is missing or ``dimensions`` exceeds the model's
+    """
+    if np is None:
+        if options == DEFAULT_OPTIONS and not binary:
+            return response
+        raise EmbeddingFormatError("Embedding output options need numpy: pip install 'AutonomousLocalAI[vectors]'")
+    data = response.get("data") or []
+    matrix = decode_embedding_matrix(data)
+
+    dimensions = options.get("dimensions")
+    if dimensions is not None:
+        if dimensions > matrix.shape[1]:
+            raise EmbeddingFormatError(f"dimensions {dimensions} exceeds the model's {matrix.shape[1]}")
+        matrix = matrix[:, :dimensions]
+    if options.get("normalize"):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+
+    dtype = options.get("dtype", "float32")
+    scales = None
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        matrix = np.rint(matrix / scales[:, None])
+    matrix = matrix.astype(WIRE_DTYPES[dtype])
+
+    as_bytes = binary or options.get("encoding_format") == "base64"
+    items = []
+    for i, item in enumerate(data):
+        if as_bytes:
+            raw = matrix[i].tobytes()
+            embedding = raw if binary else base64.b64encode(raw).decode("ascii")
+        else:
+            embedding = matrix[i].tolist()
+        encoded = {"object": "embedding", "index": item.get("index", i), "embedding": embedding}
+        if scales is not None:
+            encoded["scale"] = float(scales[i])
+        items.append(encoded)
+
+    result = {key: value for key, value in response.items() if key != "data"}
+    result["data"] = items
+    if dtype != "float32" or binary:
+        result["dtype"] = dtype
+        result["dimensions"] = int(matrix.shape[1])
+    return result
+
+
+def render_embeddings(response: Dict[str, Any], options: Dict[str, Any],
+                      accept: Optional[str] = None) -> Tuple[bytes, str]:
+    """
+    Final embeddings response body and content type for the client.
+
+    With ``Accept: application/msgpack`` vectors are sent as raw bytes in a msgpack
+    map, the most compact form; otherwise JSON per ``encoding_format``.
+
+    Returns:
+        tuple: (body, content type)
+    """
+    if wants_msgpack(accept):
+        encoded = encode_embeddings(response, options, binary=True)
+        return msgpack.packb(encoded, use_bin_type=True), MSGPACK_CONTENT_TYPES[0]
+    encoded = encode_embeddings(response, options)
+    return json.dumps(encoded, separators=(",", ":")).encode(), "application/json"
@@ -0,0 +1,145 @@
+import struct
+from typing import Dict, Any, BinaryIO, Optional, Iterable
+
+GGUF_MAGIC = b"GGUF"
+
+# GGUF metadata value types
+GGUF_TYPE_UINT8 = 0
+GGUF_TYPE_INT8 = 1
+GGUF_TYPE_UINT16 = 2
+GGUF_TYPE_INT16 = 3
+GGUF_TYPE_UINT32 = 4
+GGUF_TYPE_INT32 = 5
+GGUF_TYPE_FLOAT32 = 6
+GGUF_TYPE_BOOL = 7
+GGUF_TYPE_STRING = 8
+GGUF_TYPE_ARRAY = 9
+GGUF_TYPE_UINT64 = 10
+GGUF_TYPE_INT64 = 11
+GGUF_TYPE_FLOAT64 = 12
+
+_SCALAR_FORMATS = {
+    GGUF_TYPE_UINT8: "<B",
+    GGUF_TYPE_INT8: "<b",
+    GGUF_TYPE_UINT16: "<H",
+    GGUF_TYPE_INT16: "<h",
+    GGUF_TYPE_UINT32: "<I",
+    GGUF_TYPE_INT32: "<i",
+    GGUF_TYPE_FLOAT32: "<f",
+    GGUF_TYPE_BOOL: "<?",
+    GGUF_TYPE_UINT64: "<Q",
+    GGUF_TYPE_INT64: "<q",
+    GGUF_TYPE_FLOAT64: "<d",
+}
+
+
+class GGUFError(Exception):
+    """Exception raised when a file is not a readable GGUF file."""
+    pass
+
+
+def _read(f: BinaryIO, fmt: str):
+    size = struct.calcsize(fmt)
+    data = f.read(size)
+    if len(data) != size:
+        raise GGUFError("Unexpected end of file in GGUF header")
+    return struct.unpack(fmt, data)[0]
+
+
+def _read_string(f: BinaryIO) -> str:
+    length = _read(f, "<Q")
+    data = f.read(length)
+    if len(data) != length:
+        raise GGUFError("Unexpected end of file in GGUF string")
+    return data.decode("utf-8", errors="replace")
+
+
+def _skip_value(f: BinaryIO, value_type: int) -> None:
+    if value_type == GGUF_TYPE_STRING:
+        f.seek(_read(f, "<Q"), 1)
+    elif value_type == GGUF_TYPE_ARRAY:
+        item_type = _read(f, "<I")
+        count = _read(f, "<Q")
+        if item_type in _SCALAR_FORMATS:
+            f.seek(struct.calcsize(_SCALAR_FORMATS[item_type]) * count, 1)
+        else:
+            for _ in range(count):
+                _skip_value(f, item_type)
+    elif value_type in _SCALAR_FORMATS:
+        f.seek(struct.calcsize(_SCALAR_FORMATS[value_type]), 1)
+    else:
+        raise GGUFError(f"Unknown GGUF value type: {value_type}")
+
+
+def _read_value(f: BinaryIO, value_type: int) -> Any:
+    if value_type == GGUF_TYPE_STRING:
+        return _read_string(f)
+    if value_type in _SCALAR_FORMATS:
+        return _read(f, _SCALAR_FORMATS[value_type])
+    raise GGUFError(f"Unsupported GGUF value type: {value_type}")
+
+
+def read_gguf_header(path: str, keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Read scalar metadata from a GGUF file header without loading tensors.
+
+    Arrays (e.g. the tokenizer vocabulary) are skipped and reported by length only,
+    so this reads a few hundred KB at most even for multi-GB models.
+
+    Args:
+        path: Path to the GGUF file
+        keys: Optional set of metadata keys to keep (default: all scalar keys)
+
+    Returns:
+        Dict[str, Any]: Metadata with ``gguf.version`` and ``gguf.tensor_count`` added
+
+    Raises:
+        GGUFError: If the file is not a valid GGUF file
+    """
+    wanted = set(keys) if keys is not None else None
+    metadata: Dict[str, Any] = {}
+    with open(path, "rb") as f:
+        if f.read(4) != GGUF_MAGIC:
+            raise GGUFError(f"Not a GGUF file: {path}")
+        metadata["gguf.version"] = _read(f, "<I")
+        metadata["gguf.tensor_count"] = _read(f, "<Q")
+        kv_count = _read(f, "<Q")
+
+        for _ in range(kv_count):
+            key = _read_string(f)
+            value_type = _read(f, "<I")
+            if value_type == GGUF_TYPE_ARRAY:
+                if wanted is None or key in wanted:
+                    item_type = _read(f, "<I")
+                    count = _read(f, "<Q")
+                    metadata[f"{key}.length"] = count
+                    if item_type in _SCALAR_FORMATS:
+                        f.seek(struct.calcsize(_SCALAR_FORMATS[item_type]) * count, 1)
+                    else:
+                        for _ in range(count):
+                            _skip_value(f, item_type)
+                else:
+                    _skip_value(f, value_type)
+            elif wanted is None or key in wanted:
+                metadata[key] = _read_value(f, value_type)
+            else:
+                _skip_value(f, value_type)
+
+    return metadata
+
+
+def summarize_gguf_header(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the architecture fields the manager and planner care about."""
+    arch = metadata.get("general.architecture")
+    summary = {
+        "version": metadata.get("gguf.version"),
+        "tensor_count": metadata.get("gguf.tensor_count"),
+        "architecture": arch,
+        "name": metadata.get("general.name"),
+        "file_type": metadata.get("general.file_type"),
+    }
+    if arch:
+        for field in ("context_length", "block_count", "embedding_length",
+                      "attention.head_count", "attention.head_count_kv"):
+            summary[field.replace(".", "_")] = metadata.get(f"{arch}.{field}")
+    return summary
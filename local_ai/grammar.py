@@ -0,0 +1,370 @@
+import re
+import json
+import hashlib
+import json_repair
+from collections import OrderedDict
+from loguru import logger
+from typing import Optional, Dict, Any, List
+from local_ai.config import config
+
+SPACE_RULE = '| " " | "\\n" [ \\t]{0,20}'
+
+PRIMITIVE_RULES = {
+    "boolean": '("true" | "false") space',
+    "null": '"null" space',
+    "integral-part": "[0] | [1-9] [0-9]{0,15}",
+    "decimal-part": "[0-9]{1,16}",
+    "integer": '("-"? integral-part) space',
+    "number": '("-"? integral-part) ("." decimal-part)? ([eE] [-+]? integral-part)? space',
+    "char": '[^"\\\\\\x7F\\x00-\\x1F] | [\\\\] (["\\\\/bfnrt] | "u" [0-9a-fA-F]{4})',
+    "string": '"\\"" char* "\\"" space',
+    "value": "object | array | string | number | boolean | null",
+    "object": '"{" space ( string ":" space value ("," space string ":" space value)* )? "}" space',
+    "array": '"[" space ( value ("," space value)* )? "]" space',
+}
+
+# Rules each primitive depends on, so only what a schema uses ends up in its grammar
+PRIMITIVE_DEPS = {
+    "integer": ["integral-part"],
+    "number": ["integral-part", "decimal-part"],
+    "string": ["char"],
+    "value": ["object", "array", "string", "number", "boolean", "null"],
+    "object": ["string", "value"],
+    "array": ["value"],
+}
+
+
+class GrammarError(ValueError):
+    """Exception raised for JSON schemas that cannot be compiled to a grammar."""
+    pass
+
+
+def _literal(value: Any) -> str:
+    """GBNF literal matching the JSON encoding of ``value``."""
+    text = json.dumps(value, ensure_ascii=False)
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _repeat(item: str, min_items: int, max_items: Optional[int], separator: str = '"," space') -> str:
+    """GBNF for ``min_items``..``max_items`` occurrences of ``item`` joined by ``separator``."""
+    if max_items is not None and max_items < min_items:
+        raise GrammarError(f"maxItems {max_items} is less than minItems {min_items}")
+    if max_items == 0:
+        return ""
+    upper = "" if max_items is None else str(max_items - 1)
+    rest = f"({separator} {item}){{{max(min_items - 1, 0)},{upper}}}"
+    if min_items == 0:
+        return f"({item} {rest})?"
+    return f"{item} {rest}"
+
+
+class _SchemaConverter:
+    """
+    Convert a JSON schema to a llama.cpp GBNF grammar.
+
+    Supports the subset structured-output clients send in practice: object
+    properties with ``required``, ``additionalProperties`` on property-less objects,
+    arrays with ``items``/``prefixItems`` and item counts, string length bounds,
+    ``enum``, ``const``, ``anyOf``/``oneOf``, type lists and local ``$ref``s
+    (including recursive ones). Keywords the grammar cannot express, such as
+    ``pattern`` or numeric ranges, are dropped and enforced by the caller, if at all.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.root_schema = schema
+        self.rules: Dict[str, str] = {"space": SPACE_RULE}
+        self._refs: Dict[str, str] = {}
+
+    def _add_rule(self, name: str, body: str) -> str:
+        name = re.sub(r"[^a-zA-Z0-9-]+", "-", name).strip("-") or "rule"
+        key, i = name, 0
+        while key in self.rules and self.rules[key] != body:
+            i += 1
+            key = f"{name}{i}"
+        self.rules[key] = body
+        return key
+
+    def _primitive(self, name: str) -> str:
+        if name not in self.rules:
+            self.rules[name] = PRIMITIVE_RULES[name]
+            for dep in PRIMITIVE_DEPS.get(name, []):
+                self._primitive(dep)
+        return name
+
+    def _resolve_ref(self, ref: str) -> str:
+        if ref in self._refs:
+            return self._refs[ref]
+        target = self._lookup(ref)
+        base = re.sub(r"[^a-zA-Z0-9-]+", "-", f"ref-{ref.rsplit('/', 1)[-1] or 'root'}").rstrip("-")
+        name, i = base, 0
+        while name in self.rules:
+            i += 1
+            name = f"{base}{i}"
+        # Register before visiting so recursive schemas terminate
+        self._refs[ref] = name
+        self.rules[name] = ""
+        self.rules[name] = self.visit(target, f"{name}-body", inline=True)
+        return name
+
+    def visit(self, schema: Any, name: str, inline: bool = False) -> str:
+        """
+        Compile ``schema`` and return a rule reference (or, with ``inline``, the rule body).
+        """
+        body = self._visit_body(schema, name)
+        if inline:
+            return body
+        if re.fullmatch(r"[a-zA-Z0-9-]+", body):
+            return body
+        return self._add_rule(name, body)
+
+    def _visit_body(self, schema: Any, name: str) -> str:
+        if schema is True or schema == {}:
+            return self._primitive("value")
+        if not isinstance(schema, dict):
+            raise GrammarError(f"Invalid schema at {name}: {schema!r}")
+
+        if "$ref" in schema:
+            return self._resolve_ref(schema["$ref"])
+        if "const" in schema:
+            return f"{_literal(schema['const'])} space"
+        if "enum" in schema:
+            if not schema["enum"]:
+                raise GrammarError(f"Empty enum at {name}")
+            return "(" + " | ".join(_literal(v) for v in schema["enum"]) + ") space"
+        for key in ("anyOf", "oneOf"):
+            if key in schema:
+                alternatives = [self.visit(alt, f"{name}-{i}") for i, alt in enumerate(schema[key])]
+                return " | ".join(alternatives)
+        if "allOf" in schema:
+            return self._visit_body(self._merge_all_of(schema), name)
+
+        schema_type = schema.get("type")
+        if isinstance(schema_type, list):
+            alternatives = [self.visit({**schema, "type": t}, f"{name}-{t}") for t in schema_type]
+            return " | ".join(alternatives)
+        if schema_type == "object" or (schema_type is None and "properties" in schema):
+            return self._visit_object(schema, name)
+        if schema_type == "array" or (schema_type is None and ("items" in schema or "prefixItems" in schema)):
+            return self._visit_array(schema, name)
+        if schema_type == "string":
+            return self._visit_string(schema)
+        if schema_type in ("integer", "number", "boolean", "null"):
+            return self._primitive(schema_type)
+        if schema_type is None:
+            return self._primitive("value")
+        raise GrammarError(f"Unsupported type at {name}: {schema_type}")
+
+    def _merge_all_of(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        merged = {k: v for k, v in schema.items() if k != "allOf"}
+        for part in schema["allOf"]:
+            if "$ref" in part:
+                part = self._lookup(part["$ref"])
+            if not isinstance(part, dict):
+                raise GrammarError("allOf entries must be objects")
+            merged["properties"] = {**merged.get("properties", {}), **part.get("properties", {})}
+            merged["required"] = list(dict.fromkeys(merged.get("required", []) + part.get("required", [])))
+            for key, value in part.items():
+                if key not in ("properties", "required"):
+                    merged.setdefault(key, value)
+        return merged
+
+    def _lookup(self, ref: str) -> Any:
+        if ref != "#" and not ref.startswith("#/"):
+            raise GrammarError(f"Only local $ref values are supported: {ref}")
+        target: Any = self.root_schema
+        for part in filter(None, ref[2:].split("/")):
+            part = part.replace("~1", "/").replace("~0", "~")
+            if not isinstance(target, dict) or part not in target:
+                raise GrammarError(f"Unresolvable $ref: {ref}")
+            target = target[part]
+        return target
+
+    def _visit_object(self, schema: Dict[str, Any], name: str) -> str:
+        properties = schema.get("properties") or {}
+        if not properties:
+            additional = schema.get("additionalProperties", True)
+            if isinstance(additional, dict) and additional:
+                value = self.visit(additional, f"{name}-value")
+                kv = f'{self._primitive("string")} ":" space {value}'
+                return f'"{{" space {_repeat(kv, 0, None)} "}}" space'
+            return self._primitive("object")
+
+        required = [k for k in properties if k in schema.get("required", [])]
+        optional = [k for k in properties if k not in required]
+        kv_rules = {
+            key: self._add_rule(f"{name}-{key}-kv", f'{_literal(key)} space ":" space '
+                                                    f'{self.visit(properties[key], f"{name}-{key}")}')
+            for key in properties
+        }
+
+        def optional_chain(keys: List[str], first_is_optional: bool) -> str:
+            # Optional properties keep schema order; any subset may appear
+            first, rest = keys[0], keys[1:]
+            chain = f'( "," space {kv_rules[first]} )?' if first_is_optional else kv_rules[first]
+            if rest:
+                chain += " " + self._add_rule(f"{name}-{first}-rest", optional_chain(rest, True))
+            return chain
+
+        body = '"{" space '
+        body += ' "," space '.join(kv_rules[k] for k in required)
+        if optional:
+            alternatives = " | ".join(optional_chain(optional[i:], False) for i in range(len(optional)))
+            body += f' ( "," space ( {alternatives} ) )?' if required else f" ( {alternatives} )?"
+        return body + ' "}" space'
+
+    def _visit_array(self, schema: Dict[str, Any], name: str) -> str:
+        prefix = schema.get("prefixItems")
+        if prefix is None and isinstance(schema.get("items"), list):
+            prefix = schema["items"]
+        if prefix is not None:
+            items = [self.visit(item, f"{name}-{i}") for i, item in enumerate(prefix)]
+            return '"[" space ' + ' "," space '.join(items) + ' "]" space'
+
+        item = self.visit(schema.get("items", True), f"{name}-item")
+        min_items = int(schema.get("minItems", 0))
+        max_items = schema.get("maxItems")
+        return f'"[" space {_repeat(item, min_items, None if max_items is None else int(max_items))} "]" space'
+
+    def _visit_string(self, schema: Dict[str, Any]) -> str:
+        if "pattern" in schema or "format" in schema:
+            logger.debug("Grammar does not enforce string pattern/format; using a plain string")
+        min_length = int(schema.get("minLength", 0))
+        max_length = schema.get("maxLength")
+        if max_length is not None and int(max_length) < min_length:
+            raise GrammarError(f"maxLength {max_length} is less than minLength {min_length}")
+        if not min_length and max_length is None:
+            return self._primitive("string")
+        self._primitive("char")
+        upper = "" if max_length is None else int(max_length)
+        return f'"\\"" char{{{min_length},{upper}}} "\\"" space'
+
+    def format(self, root: str) -> str:
+        lines = [f"root ::= {root}"]
+        lines += [f"{name} ::= {body}" for name, body in sorted(self.rules.items())]
+        return "\n".join(lines) + "\n"
+
+
+def schema_to_grammar(schema: Dict[str, Any]) -> str:
+    """
+    Compile a JSON schema to a GBNF grammar for llama-server's ``grammar`` field.
+
+    Raises:
+        GrammarError: If the schema is malformed or uses unresolvable references
+    """
+    converter = _SchemaConverter(schema)
+    return converter.format(converter.visit(schema, "root", inline=True))
+
+
+def schema_hash(schema: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(schema, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+class GrammarCache:
+    """LRU cache of compiled grammars keyed by the canonical schema hash."""
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size or config.performance.GRAMMAR_CACHE_SIZE
+        self._grammars: "OrderedDict[str, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.repairs = 0
+
+    def get(self, schema: Dict[str, Any]) -> str:
+        """Compiled grammar for ``schema``, compiling it on first use."""
+        key = schema_hash(schema)
+        grammar = self._grammars.get(key)
+        if grammar is not None:
+            self._grammars.move_to_end(key)
+            self.hits += 1
+            return grammar
+        self.misses += 1
+        grammar = schema_to_grammar(schema)
+        self._grammars[key] = grammar
+        if len(self._grammars) > self.max_size:
+            self._grammars.popitem(last=False)
+        return grammar
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"size": len(self._grammars), "max_size": self.max_size,
+                "hits": self.hits, "misses": self.misses, "repairs": self.repairs}
+
+
+_grammar_cache: Optional[GrammarCache] = None
+
+
+def get_grammar_cache() -> GrammarCache:
+    """Get the process-wide grammar cache."""
+    global _grammar_cache
+    if _grammar_cache is None:
+        _grammar_cache = GrammarCache()
+    return _grammar_cache
+
+
+def _requested_schema(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    response_format = body.get("response_format")
+    if isinstance(response_format, dict):
+        format_type = response_format.get("type")
+        if format_type == "json_schema":
+            # OpenAI nests the schema under json_schema; llama.cpp also accepts it at the top level
+            nested = response_format.get("json_schema") or {}
+            schema = nested.get("schema", response_format.get("schema"))
+            if not isinstance(schema, dict):
+                raise GrammarError("response_format.json_schema.schema must be an object")
+            return schema
+        if format_type == "json_object":
+            return response_format.get("schema") or {"type": "object"}
+        if format_type not in (None, "text"):
+            raise GrammarError(f"Unsupported response_format type: {format_type}")
+        return None
+    if isinstance(body.get("json_schema"), dict):
+        return body["json_schema"]
+    return None
+
+
+def apply_response_format(body: Dict[str, Any], cache: Optional[GrammarCache] = None) -> Dict[str, Any]:
+    """
+    Replace a request's ``response_format``/``json_schema`` with a cached compiled grammar.
+
+    llama-server would otherwise convert the schema on every request. Requests that
+    already carry a ``grammar`` are left alone.
+
+    Args:
+        body: Chat or completion request body
+        cache: Grammar cache (default: the process-wide cache)
+
+    Returns:
+        Dict[str, Any]: Request body to forward upstream
+
+    Raises:
+        GrammarError: If the requested schema cannot be compiled
+    """
+    if body.get("grammar"):
+        return body
+    schema = _requested_schema(body)
+    if schema is None:
+        return body
+    forwarded = {k: v for k, v in body.items() if k not in ("response_format", "json_schema")}
+    forwarded["grammar"] = (cache or get_grammar_cache()).get(schema)
+    return forwarded
+
+
+def parse_json_output(text: str, cache: Optional[GrammarCache] = None) -> Any:
+    """
+    Parse model output that was meant to be JSON.
+
+    Grammar-constrained output parses directly. ``json_repair`` is only the fallback
+    for output cut off by ``max_tokens`` or produced without a grammar.
+
+    Raises:
+        ValueError: If the text cannot be parsed or repaired
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    (cache or get_grammar_cache()).repairs += 1
+    logger.warning("Model output was not valid JSON, repairing it")
+    repaired = json_repair.repair_json(text, return_objects=True)
+    if repaired == "" and text.strip():
+        raise ValueError("Model output could not be repaired into JSON")
+    return repaired
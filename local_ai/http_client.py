@@ -0,0 +1,340 @@
+import time
+import asyncio
+import threading
+import httpx
+import requests
+import urllib3
+from loguru import logger
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any
+from local_ai.config import config
+
+# Methods that are safe to send again after the server may have processed them
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class CircuitOpenError(Exception):
+    """Exception raised when a host's circuit breaker is open and requests are short-circuited."""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After FAILURE_THRESHOLD consecutive connection failures or 5xx responses the
+    circuit opens (read timeouts only mean a slow response and are not counted) and requests fail fast for RESET_TIMEOUT seconds; the next request
+    after that is let through as a probe and closes the circuit on success. While
+    the probe is out (half-open) every other request keeps failing fast; a probe
+    that never reports back is replaced after another RESET_TIMEOUT.
+    """
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.failure_threshold = failure_threshold or config.performance.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or config.performance.CIRCUIT_RESET_TIMEOUT
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; in half-open state only one trial request at a time."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            if self.probe_started_at is not None and now - self.probe_started_at < self.reset_timeout:
+                return False
+            self.probe_started_at = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started_at = None
+
+    def release(self) -> None:
+        """End a request without counting it either way, freeing the half-open probe slot."""
+        with self._lock:
+            self.probe_started_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.probe_started_at = None
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+
+class _BreakerRegistry:
+    """Circuit breakers keyed by scheme://host:port."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url: str) -> CircuitBreaker:
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker()
+            return breaker
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                host: {"state": breaker.state, "failures": breaker.failures}
+                for host, breaker in self._breakers.items()
+            }
+
+
+def _backoff(attempt: int, delay: float) -> float:
+    """Exponential backoff capped at 8 seconds."""
+    return min(delay * (2 ** attempt), 8.0)
+
+
+def _retryable(method: str, not_sent: bool, status_code: Optional[int]) -> bool:
+    """
+    Whether a failed attempt may be sent again.
+
+    Idempotent methods are retried on any failure; others (POST) only when the server
+    cannot have processed them: the connection never came up, or it answered 503.
+    """
+    return method.upper() in IDEMPOTENT_METHODS or not_sent or status_code == 503
+
+
+class HTTPClient:
+    """
+    Synchronous HTTP client shared by the manager.
+
+    Wraps a keep-alive ``requests.Session`` sized from POOL_CONNECTIONS/POOL_KEEPALIVE,
+    with retry/backoff from MAX_RETRIES/RETRY_DELAY and per-host circuit breaking.
+    """
+
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=config.performance.POOL_KEEPALIVE,
+            pool_maxsize=config.performance.POOL_CONNECTIONS,
+            max_retries=0
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.breakers = _BreakerRegistry()
+
+    def request(self, method: str, url: str, retries: Optional[int] = None, retry_delay: Optional[float] = None,
+                timeout: Optional[float] = None, use_breaker: bool = True, **kwargs: Any) -> requests.Response:
+        """
+        Send a request with retries and circuit breaking.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            retries: Total attempts (default MAX_RETRIES; at least one is made).
+                Non-idempotent methods are only retried on connect errors and 503s
+            retry_delay: Initial backoff delay in seconds (default RETRY_DELAY)
+            timeout: Per-attempt timeout (default REQUEST_TIMEOUT)
+            use_breaker: Consult and update the host's circuit breaker
+            **kwargs: Passed through to ``requests.Session.request``
+
+        Returns:
+            requests.Response: Successful (non-5xx) response; 4xx responses are returned as-is
+
+        Raises:
+            CircuitOpenError: If the host's circuit is open
+            requests.exceptions.RequestException: If all attempts fail
+        """
+        retries = max(config.performance.MAX_RETRIES if retries is None else retries, 1)
+        retry_delay = retry_delay or config.performance.RETRY_DELAY
+        timeout = timeout or config.core.REQUEST_TIMEOUT
+        breaker = self.breakers.for_url(url) if use_breaker else None
+
+        last_error: Optional[Exception] = None
+        for attempt in range(retries):
+            if breaker and not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {url}")
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+                if response.status_code >= 500:
+                    response.raise_for_status()
+                if breaker:
+                    breaker.record_success()
+                return response
+            except requests.exceptions.RequestException as e:
+                last_error = e
+                if breaker:
+                    if isinstance(e, requests.exceptions.ReadTimeout):
+                        breaker.release()
+                    else:
+                        breaker.record_failure()
+                logger.debug(f"Attempt {attempt+1}/{retries} {method} {url} failed: {str(e)[:100]}")
+                # requests reports a connection dropped mid-response as ConnectionError(ProtocolError)
+                not_sent = isinstance(e, requests.exceptions.ConnectionError) and not (
+                    e.args and isinstance(e.args[0], urllib3.exceptions.ProtocolError)
+                )
+                status_code = e.response.status_code if e.response is not None else None
+                if not _retryable(method, not_sent, status_code):
+                    raise
+
+            if attempt < retries - 1:
+                time.sleep(_backoff(attempt, retry_delay))
+
+        raise last_error
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def get_json(self, url: str, **kwargs: Any) -> Optional[dict]:
+        """GET a JSON document, returning None on any failure."""
+        try:
+            response = self.get(url, **kwargs)
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, CircuitOpenError, ValueError) as e:
+            logger.error(f"Failed to fetch {url}: {str(e)[:100]}")
+            return None
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncHTTPClient:
+    """
+    Asynchronous counterpart of HTTPClient backed by a pooled ``httpx.AsyncClient``.
+
+    With ``uds`` set, every request is sent over that Unix domain socket whatever
+    the URL's host and port; use ``upstream_base_url()`` to build the URLs.
+    """
+
+    def __init__(self, uds: Optional[str] = None):
+        limits = httpx.Limits(
+            max_connections=config.performance.POOL_CONNECTIONS,
+            max_keepalive_connections=config.performance.POOL_KEEPALIVE
+        )
+        self.uds = uds
+        self.client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=uds, limits=limits) if uds else None,
+            limits=limits,
+            timeout=httpx.Timeout(config.performance.HTTP_TIMEOUT, connect=config.core.REQUEST_TIMEOUT)
+        )
+        self.breakers = _BreakerRegistry()
+
+    async def request(self, method: str, url: str, retries: Optional[int] = None, retry_delay: Optional[float] = None,
+                      use_breaker: bool = True, **kwargs: Any) -> httpx.Response:
+        """Async version of HTTPClient.request; see there for arguments."""
+        retries = max(config.performance.MAX_RETRIES if retries is None else retries, 1)
+        retry_delay = retry_delay or config.performance.RETRY_DELAY
+        breaker = self.breakers.for_url(url) if use_breaker else None
+
+        last_error: Optional[Exception] = None
+        for attempt in range(retries):
+            if breaker and not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {url}")
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                if response.status_code >= 500:
+                    response.raise_for_status()
+                if breaker:
+                    breaker.record_success()
+                return response
+            except httpx.HTTPError as e:
+                last_error = e
+                if breaker:
+                    if isinstance(e, httpx.ReadTimeout):
+                        breaker.release()
+                    else:
+                        breaker.record_failure()
+                logger.debug(f"Attempt {attempt+1}/{retries} {method} {url} failed: {str(e)[:100]}")
+                not_sent = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                status_code = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+                if not _retryable(method, not_sent, status_code):
+                    raise
+
+            if attempt < retries - 1:
+                await asyncio.sleep(_backoff(attempt, retry_delay))
+
+        raise last_error
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+def upstream_base_url(service_info: Dict[str, Any]) -> str:
+    """
+    Base URL of the running llama-server.
+
+    When the server listens on a Unix domain socket (``upstream_socket`` in the service
+    metadata) the host part is only used for the Host header; pair the URL with a client
+    from ``get_unix_http_client()`` or ``get_async_http_client(uds=...)``.
+    """
+    if service_info.get("upstream_socket"):
+        return "http://localhost"
+    return f"http://localhost:{service_info['port']}"
+
+
+_http_client: Optional[HTTPClient] = None
+_unix_http_clients: Dict[str, httpx.Client] = {}
+_async_http_clients: Dict[Optional[str], AsyncHTTPClient] = {}
+_async_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_client() -> HTTPClient:
+    """Get the process-wide synchronous HTTP client."""
+    global _http_client
+    if _http_client is None:
+        _http_client = HTTPClient()
+    return _http_client
+
+
+def get_unix_http_client(socket_path: str) -> httpx.Client:
+    """Get a keep-alive synchronous client that sends every request over ``socket_path``."""
+    client = _unix_http_clients.get(socket_path)
+    if client is None:
+        client = _unix_http_clients[socket_path] = httpx.Client(
+            transport=httpx.HTTPTransport(uds=socket_path),
+            timeout=httpx.Timeout(config.performance.HTTP_TIMEOUT, connect=config.core.REQUEST_TIMEOUT)
+        )
+    return client
+
+
+def get_async_http_client(uds: Optional[str] = None) -> AsyncHTTPClient:
+    """
+    Get the async HTTP client for the running event loop (pools are loop-bound).
+
+    Args:
+        uds: Unix domain socket to send requests over, or None for TCP
+    """
+    global _async_http_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_http_client_loop is not loop:
+        _async_http_clients.clear()
+        _async_http_client_loop = loop
+    client = _async_http_clients.get(uds)
+    if client is None:
+        client = _async_http_clients[uds] = AsyncHTTPClient(uds)
+    return client
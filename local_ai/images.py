@@ -0,0 +1,273 @@
+import io
+import base64
+import asyncio
+import hashlib
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from loguru import logger
+from typing import Optional, Dict, Any, Tuple
+from PIL import Image, ImageOps, UnidentifiedImageError
+from local_ai.config import config
+from local_ai.gguf import read_gguf_header, GGUFError
+
+PROJECTOR_IMAGE_SIZE_KEY = "clip.vision.image_size"
+# Formats llama-server decodes directly; anything else is re-encoded
+PASSTHROUGH_FORMATS = ("JPEG", "PNG")
+# Pillow's own decompression bomb check uses the same limit, and its warning (between
+# the limit and twice the limit) is an error too, so no oversized image gets decoded
+Image.MAX_IMAGE_PIXELS = config.performance.IMAGE_MAX_PIXELS
+warnings.simplefilter("error", Image.DecompressionBombWarning)
+DECOMPRESSION_BOMB_ERRORS = (Image.DecompressionBombError, Image.DecompressionBombWarning)
+
+
+class ImageError(ValueError):
+    """Exception raised for image inputs that are too large or cannot be decoded."""
+    pass
+
+
+@lru_cache(maxsize=16)
+def projector_image_size(projector_path: str) -> Optional[int]:
+    """
+    Native input resolution of a multimodal projector, from its GGUF header.
+
+    Returns:
+        Optional[int]: Side length in pixels, or None if the header does not say
+    """
+    try:
+        size = read_gguf_header(projector_path, keys=[PROJECTOR_IMAGE_SIZE_KEY]).get(PROJECTOR_IMAGE_SIZE_KEY)
+    except (OSError, GGUFError) as e:
+        logger.warning(f"Could not read projector header {projector_path}: {str(e)}")
+        return None
+    return int(size) if size else None
+
+
+def _parse_data_url(url: str) -> Optional[str]:
+    """Base64 payload of a ``data:image/...;base64,`` URL, None for other URLs."""
+    if not url.startswith("data:"):
+        return None
+    header, _, payload = url.partition(",")
+    if not header.endswith(";base64"):
+        return None
+    return payload
+
+
+def process_image(data: bytes, max_side: Optional[int]) -> Tuple[bytes, str]:
+    """
+    Decode, downscale and re-encode one image. Runs in a worker thread.
+
+    Images already within ``max_side`` in a format llama-server reads are returned
+    unchanged. Larger ones are resized (keeping the aspect ratio, never upscaling)
+    so their longest side is ``max_side``, and re-encoded as JPEG, or PNG when they
+    have transparency.
+
+    Returns:
+        tuple: (image bytes, MIME type)
+
+    Raises:
+        ImageError: If the image cannot be decoded or exceeds IMAGE_MAX_PIXELS
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+    except DECOMPRESSION_BOMB_ERRORS as e:
+        raise ImageError(f"Image exceeds {config.performance.IMAGE_MAX_PIXELS} pixels: {e}")
+    except (UnidentifiedImageError, OSError) as e:
+        raise ImageError(f"Cannot decode image: {e}")
+    # Image.open only reads the header, so oversized images are rejected before decoding
+    width, height = image.size
+    if width * height > config.performance.IMAGE_MAX_PIXELS:
+        raise ImageError(f"Image is {width}x{height}, more than {config.performance.IMAGE_MAX_PIXELS} pixels")
+
+    source_format = image.format
+    needs_resize = max_side is not None and max(width, height) > max_side
+    rotated = image.getexif().get(0x0112, 1) != 1
+    if not needs_resize and not rotated and source_format in PASSTHROUGH_FORMATS:
+        return data, Image.MIME[source_format]
+
+    try:
+        image = ImageOps.exif_transpose(image)
+        if needs_resize:
+            image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        out = io.BytesIO()
+        if has_alpha:
+            image.save(out, format="PNG", optimize=False)
+            return out.getvalue(), "image/png"
+        image.convert("RGB").save(out, format="JPEG", quality=config.performance.IMAGE_JPEG_QUALITY)
+        return out.getvalue(), "image/jpeg"
+    except DECOMPRESSION_BOMB_ERRORS as e:
+        raise ImageError(f"Image exceeds {config.performance.IMAGE_MAX_PIXELS} pixels: {e}")
+    except (OSError, ValueError) as e:
+        raise ImageError(f"Cannot process image: {e}")
+
+
+class ImageCache:
+    """LRU cache of processed images as data URLs, bounded by total size."""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes or config.performance.IMAGE_CACHE_MB * 1024 * 1024
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        url = self._entries.get(key)
+        if url is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return url
+
+    def put(self, key: str, url: str) -> None:
+        if len(url) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._entries[key] = url
+        self.size += len(url)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
+
+
+class ImagePreprocessor:
+    """
+    Shrink images in chat requests to what the projector actually uses.
+
+    Clients (agents sending screenshots especially) post full-resolution base64
+    images that llama-server would decode and resize on every request. Each image
+    is processed once in a small thread pool and the resulting data URL is cached
+    under the SHA-256 of the original payload, so a repeated image costs one hash.
+    Identical images arriving concurrently share one processing job.
+    """
+
+    def __init__(self, max_side: Optional[int] = None, cache: Optional[ImageCache] = None,
+                 max_workers: Optional[int] = None):
+        """
+        Args:
+            max_side: Longest side to downscale to, normally ``projector_image_size()``;
+                None only enforces the size limits
+            cache: Processed image cache (default: a new one sized by IMAGE_CACHE_MB)
+            max_workers: Processing threads (default IMAGE_WORKERS)
+        """
+        self.max_side = max_side
+        self.cache = cache or ImageCache()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or config.performance.IMAGE_WORKERS,
+                                            thread_name_prefix="image")
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _process_payload(self, payload: str) -> str:
+        try:
+            data = base64.b64decode(payload, validate=True)
+        except ValueError as e:
+            raise ImageError(f"Invalid base64 image data: {e}")
+        image_bytes, mime = process_image(data, self.max_side)
+        if image_bytes is data:
+            return f"data:{mime};base64,{payload}"
+        return f"data:{mime};base64,{base64.b64encode(image_bytes).decode()}"
+
+    async def process_url(self, url: str) -> str:
+        """
+        Processed data URL for an image URL; non-data URLs are returned unchanged.
+
+        Raises:
+            ImageError: If the image is over IMAGE_MAX_BYTES or IMAGE_MAX_PIXELS or invalid
+        """
+        payload = _parse_data_url(url)
+        if payload is None:
+            return url
+        # Reject on the encoded length before spending time on decoding
+        if len(payload) * 3 // 4 > config.performance.IMAGE_MAX_BYTES:
+            raise ImageError(f"Image is larger than {config.performance.IMAGE_MAX_BYTES} bytes")
+
+        key = f"{hashlib.sha256(payload.encode()).hexdigest()}:{self.max_side}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, self._process_payload, payload)
+        self._in_flight[key] = future
+        try:
+            processed = await asyncio.shield(future)
+        finally:
+            self._in_flight.pop(key, None)
+        self.cache.put(key, processed)
+        if len(processed) < len(url):
+            logger.debug(f"Image reduced from {len(url)} to {len(processed)} bytes")
+        return processed
+
+    async def preprocess(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return ``body`` with every ``image_url`` content part in its messages processed.
+
+        Raises:
+            ImageError: If any image is rejected
+        """
+        messages = body.get("messages")
+        if not isinstance(messages, list):
+            return body
+
+        jobs = []
+        new_messages = []
+        for message in messages:
+            content = message.get("content") if isinstance(message, dict) else None
+            if not isinstance(content, list):
+                new_messages.append(message)
+                continue
+            parts = []
+            for part in content:
+                image_url = part.get("image_url") if isinstance(part, dict) and part.get("type") == "image_url" else None
+                url = image_url.get("url") if isinstance(image_url, dict) else image_url
+                if isinstance(url, str) and url.startswith("data:"):
+                    part = {**part, "image_url": dict(image_url) if isinstance(image_url, dict) else url}
+                    jobs.append((part, url))
+                parts.append(part)
+            new_messages.append({**message, "content": parts})
+        if not jobs:
+            return body
+
+        urls = await asyncio.gather(*(self.process_url(url) for _, url in jobs))
+        for (part, _), url in zip(jobs, urls):
+            if isinstance(part["image_url"], dict):
+                part["image_url"]["url"] = url
+            else:
+                part["image_url"] = url
+        return {**body, "messages": new_messages}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_preprocessors: Dict[Optional[str], ImagePreprocessor] = {}
+_shared_cache: Optional[ImageCache] = None
+
+
+def get_image_preprocessor(projector_path: Optional[str]) -> ImagePreprocessor:
+    """
+    Get the preprocessor for a model's projector (``service_info["local_projector_path"]``).
+
+    Preprocessors for different projectors share one cache; entries are keyed by
+    target size, so a model switch does not serve images sized for another projector.
+    """
+    global _shared_cache
+    preprocessor = _preprocessors.get(projector_path)
+    if preprocessor is None:
+        if _shared_cache is None:
+            _shared_cache = ImageCache()
+        max_side = projector_image_size(projector_path) if projector_path else None
+        preprocessor = _preprocessors[projector_path] = ImagePreprocessor(max_side, _shared_cache)
+        logger.info(f"Image preprocessing for {projector_path or 'no projector'}: "
+                    f"max side {max_side or 'unchanged'}")
+    return preprocessor
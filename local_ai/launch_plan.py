@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import hashlib
+import msgpack
+import psutil
+from pathlib import Path
+from loguru import logger
+from typing import Optional, Dict, Any, List
+from local_ai.config import config
+from local_ai.catalog import get_catalog
+from local_ai.version import __version__
+
+PLAN_VERSION = 1
+
+
+def launch_plan_key(model_list: List[str], port: int, host: str, context_length: int,
+                    speculative: bool, quant: Optional[str], workers: int) -> str:
+    """
+    Key identifying the inputs of a launch plan.
+
+    Covers the start() arguments, every configuration value, host RAM (which drives
+    quantization and slot sizing), the package version (which ships the chat
+    templates and best-practice flags) and the catalog entries of the models and
+    their drafts (files, quant variants, LoRA adapters), without the measured facts
+    that change on every run.
+    """
+    catalog = get_catalog()
+    names = set(model_list)
+    names.update(catalog.get(name, {}).get("draft") for name in model_list)
+    entries = {
+        name: {k: v for k, v in catalog[name].items() if k != "facts"}
+        for name in sorted(n for n in names if n and n in catalog)
+    }
+    inputs = {
+        "plan_version": PLAN_VERSION,
+        "package_version": __version__,
+        "models": model_list,
+        "port": port,
+        "host": host,
+        "context_length": context_length,
+        "speculative": speculative,
+        "quant": quant,
+        "workers": workers,
+        "ram": psutil.virtual_memory().total,
+        "config": config.get_env_summary(),
+        "catalog": entries,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _fingerprint(path: str) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def plan_files(service_metadata: Dict[str, Any], running_ai_command: List[str]) -> List[str]:
+    """Files a plan depends on: the server binary, every file on its command line and all model files."""
+    files = {arg for arg in running_ai_command if isinstance(arg, str) and os.path.isfile(arg)}
+    for model_info in service_metadata.get("models", {}).values():
+        model_path = model_info.get("local_model_path")
+        if model_path:
+            # The projector is listed even when absent, so one added later invalidates the plan
+            files.update((model_path, f"{model_path}-projector"))
+        if model_info.get("local_projector_path"):
+            files.add(model_info["local_projector_path"])
+    return sorted(files)
+
+
+def save_launch_plan(key: str, service_metadata: Dict[str, Any], running_ai_command: List[str]) -> None:
+    """
+    Persist the resolved launch plan so the next start() with the same inputs can skip planning.
+
+    Args:
+        key: Output of launch_plan_key()
+        service_metadata: Service metadata before any process was launched
+        running_ai_command: AI server command line
+    """
+    plan = {
+        "key": key,
+        "created_at": time.time(),
+        "service_metadata": service_metadata,
+        "running_ai_command": running_ai_command,
+        "fingerprints": {path: _fingerprint(path) for path in plan_files(service_metadata, running_ai_command)},
+    }
+    path = Path(config.file_paths.LAUNCH_PLAN_FILE)
+    temp_path = path.with_suffix(path.suffix + ".tmp")
+    try:
+        with open(temp_path, "wb") as f:
+            msgpack.dump(plan, f)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"Failed to save launch plan: {e}")
+
+
+def load_launch_plan(key: str) -> Optional[Dict[str, Any]]:
+    """
+    Load the saved launch plan if it was built from the same inputs and no file it depends on changed.
+
+    Validation costs one ``stat`` per file; no file is read or hashed.
+
+    Args:
+        key: Output of launch_plan_key()
+
+    Returns:
+        Optional[Dict[str, Any]]: The plan, or None if there is none or it is stale
+    """
+    path = Path(config.file_paths.LAUNCH_PLAN_FILE)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "rb") as f:
+            plan = msgpack.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable launch plan: {e}")
+        return None
+
+    if plan.get("key") != key:
+        logger.info("Launch inputs changed since the last start, replanning")
+        return None
+    for file_path, fingerprint in plan.get("fingerprints", {}).items():
+        if _fingerprint(file_path) != fingerprint:
+            logger.info(f"{file_path} changed since the last start, replanning")
+            return None
+    return plan
+
+
+def invalidate_launch_plan() -> None:
+    """Drop the saved launch plan so the next start() plans from scratch."""
+    Path(config.file_paths.LAUNCH_PLAN_FILE).unlink(missing_ok=True)
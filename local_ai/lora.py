@@ -0,0 +1,157 @@
+import asyncio
+import time
+from collections import deque
+from loguru import logger
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, Tuple, Deque, AsyncIterator
+from local_ai.config import config
+from local_ai.admission import AdmissionError
+
+AdapterKey = Tuple[Tuple[int, float], ...]
+
+
+class LoraError(ValueError):
+    """Exception raised for requests selecting unknown adapters or invalid scales."""
+    pass
+
+
+def resolve_lora(requested: Any, adapters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Normalize a request's ``lora`` field to llama-server's per-request form.
+
+    Accepts a list of ``{"id" | "name", "scale"}`` objects or a ``{name: scale}``
+    mapping. Adapters selected without a scale use their registered default.
+
+    Args:
+        requested: The request's ``lora`` field
+        adapters: The service's adapters (``service_info["loras"]``)
+
+    Returns:
+        List[Dict[str, Any]]: ``[{"id", "scale"}]`` covering every loaded adapter, so no
+            adapter keeps a scale from an earlier request
+
+    Raises:
+        LoraError: If an adapter is unknown or a scale is not a number
+    """
+    by_name = {adapter["name"]: adapter for adapter in adapters}
+    by_id = {adapter["id"]: adapter for adapter in adapters}
+    if isinstance(requested, dict):
+        requested = [{"name": name, "scale": scale} for name, scale in requested.items()]
+    if not isinstance(requested, list):
+        raise LoraError("lora must be a list of {id|name, scale} objects or a {name: scale} mapping")
+
+    scales = {adapter["id"]: 0.0 for adapter in adapters}
+    for item in requested:
+        if not isinstance(item, dict):
+            raise LoraError(f"Invalid lora entry: {item!r}")
+        adapter = by_id.get(item["id"]) if "id" in item else by_name.get(item.get("name"))
+        if adapter is None:
+            raise LoraError(f"Unknown LoRA adapter: {item.get('name', item.get('id'))}")
+        scale = item.get("scale", adapter.get("scale", 1.0))
+        if not isinstance(scale, (int, float)) or isinstance(scale, bool):
+            raise LoraError(f"LoRA scale for {adapter['name']} must be a number")
+        scales[adapter["id"]] = float(scale)
+    return [{"id": adapter_id, "scale": scale} for adapter_id, scale in sorted(scales.items())]
+
+
+def adapter_key(lora: List[Dict[str, Any]]) -> AdapterKey:
+    """Hashable adapter configuration; requests with equal keys can share a decode batch."""
+    return tuple((item["id"], item["scale"]) for item in lora if item["scale"])
+
+
+def apply_lora(body: Dict[str, Any], adapters: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], AdapterKey]:
+    """
+    Prepare a chat or completion request for a server with LoRA adapters loaded.
+
+    Returns:
+        tuple: (request body to forward, adapter key for ``AdapterGrouper.hold()``)
+
+    Raises:
+        LoraError: If the request selects adapters the service does not have
+    """
+    if not adapters:
+        if body.get("lora"):
+            raise LoraError("The running model has no LoRA adapters")
+        return body, ()
+    lora = resolve_lora(body.get("lora") or [], adapters)
+    return {**body, "lora": lora}, adapter_key(lora)
+
+
+class AdapterGrouper:
+    """
+    Admit requests in groups that share one adapter configuration.
+
+    llama-server only decodes slots together when their adapter scales match, so
+    interleaving fine-tunes serializes the batch. Requests for the configuration
+    that is currently decoding are admitted immediately; others wait until it
+    drains. Once a waiting group's oldest request has waited LORA_GROUP_MAX_WAIT, new
+    requests for the current configuration queue behind it so no group starves.
+    """
+
+    def __init__(self, max_wait: Optional[float] = None):
+        self.max_wait = max_wait if max_wait is not None else config.performance.LORA_GROUP_MAX_WAIT
+        self.active_key: Optional[AdapterKey] = None
+        self.in_flight = 0
+        self.waiting: Dict[AdapterKey, Deque[float]] = {}
+        self._condition = asyncio.Condition()
+
+    def _next_key(self) -> Optional[AdapterKey]:
+        """Waiting group with the oldest request."""
+        queued = [(queue[0], key) for key, queue in self.waiting.items() if queue]
+        return min(queued)[1] if queued else None
+
+    def _can_enter(self, key: AdapterKey) -> bool:
+        if self.in_flight == 0:
+            next_key = self._next_key()
+            return next_key is None or next_key == key
+        if key != self.active_key:
+            return False
+        now = time.monotonic()
+        return not any(queue and now - queue[0] >= self.max_wait
+                       for other, queue in self.waiting.items() if other != key)
+
+    @asynccontextmanager
+    async def hold(self, key: AdapterKey, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold an admission for one upstream request with adapter configuration ``key``.
+
+        Raises:
+            AdmissionError: If the request waited longer than ``timeout`` (default QUEUE_BACKPRESSURE_TIMEOUT)
+        """
+        timeout = timeout or config.performance.QUEUE_BACKPRESSURE_TIMEOUT
+        async with self._condition:
+            if not self._can_enter(key):
+                queue = self.waiting.setdefault(key, deque())
+                arrival = time.monotonic()
+                queue.append(arrival)
+                try:
+                    await asyncio.wait_for(self._condition.wait_for(lambda: self._can_enter(key)),
+                                           timeout=timeout)
+                except asyncio.TimeoutError:
+                    raise AdmissionError(f"Adapter group did not get a turn within {timeout}s")
+                finally:
+                    queue.remove(arrival)
+                    if not queue:
+                        del self.waiting[key]
+                    self._condition.notify_all()
+            if key != self.active_key:
+                logger.debug(f"Adapter configuration switched to {key or 'base model'}")
+            self.active_key = key
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "active": [list(item) for item in self.active_key] if self.active_key is not None else None,
+            "in_flight": self.in_flight,
+            "waiting": [
+                {"adapters": [list(item) for item in key], "queued": len(queue), "oldest_wait": round(now - queue[0], 1)}
+                for key, queue in self.waiting.items() if queue
+            ],
+        }
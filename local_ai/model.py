@@ -3,24 +3,56 @@ MODELS = {
         "repo": "Qwen/Qwen3-1.7B-GGUF",
         "file": "Qwen3-1.7B-Q8_0.gguf",
         "task": "chat",
-        "ram": 5.71
+        "params": 2.03,
+        "ram": 5.71,
+        "quant": "Q8_0",
+        "quants": {
+            "Q8_0": {"file": "Qwen3-1.7B-Q8_0.gguf", "ram": 5.71}
+        }
     },
     "qwen3-4b": {
         "repo": "Qwen/Qwen3-4B-GGUF",
         "file": "Qwen3-4B-Q8_0.gguf",
         "task": "chat",
-        "ram": 7.9
+        "draft": "qwen3-1.7b",
+        "params": 4.02,
+        "ram": 7.9,
+        "quant": "Q8_0",
+        "quants": {
+            "Q4_K_M": {"file": "Qwen3-4B-Q4_K_M.gguf", "ram": 6.06},
+            "Q5_K_M": {"file": "Qwen3-4B-Q5_K_M.gguf", "ram": 6.49},
+            "Q6_K": {"file": "Qwen3-4B-Q6_K.gguf", "ram": 6.92},
+            "Q8_0": {"file": "Qwen3-4B-Q8_0.gguf", "ram": 7.9}
+        }
     },
     "qwen3-8b": {
         "repo": "Qwen/Qwen3-8B-GGUF",
         "file": "Qwen3-8B-Q8_0.gguf",
         "task": "chat",
-        "ram": 15.8
+        "draft": "qwen3-1.7b",
+        "params": 8.19,
+        "ram": 15.8,
+        "quant": "Q8_0",
+        "quants": {
+            "Q4_K_M": {"file": "Qwen3-8B-Q4_K_M.gguf", "ram": 12.06},
+            "Q5_K_M": {"file": "Qwen3-8B-Q5_K_M.gguf", "ram": 12.93},
+            "Q6_K": {"file": "Qwen3-8B-Q6_K.gguf", "ram": 13.81},
+            "Q8_0": {"file": "Qwen3-8B-Q8_0.gguf", "ram": 15.8}
+        }
     },
     "qwen3-14b": {
         "repo": "Qwen/Qwen3-14B-GGUF",
         "file": "Qwen3-14B-Q8_0.gguf",
         "task": "chat",
-        "ram": 19.5
+        "draft": "qwen3-1.7b",
+        "params": 14.8,
+        "ram": 19.5,
+        "quant": "Q8_0",
+        "quants": {
+            "Q4_K_M": {"file": "Qwen3-14B-Q4_K_M.gguf", "ram": 12.76},
+            "Q5_K_M": {"file": "Qwen3-14B-Q5_K_M.gguf", "ram": 14.33},
+            "Q6_K": {"file": "Qwen3-14B-Q6_K.gguf", "ram": 15.92},
+            "Q8_0": {"file": "Qwen3-14B-Q8_0.gguf", "ram": 19.5}
+        }
     }
-}
\ No newline at end of file
+}
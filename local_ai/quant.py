@@ -0,0 +1,211 @@
+import os
+import shutil
+import psutil
+import subprocess
+from pathlib import Path
+from loguru import logger
+from typing import Optional, Dict, Any
+from local_ai.config import config, DEFAULT_MODEL_DIR
+from local_ai.catalog import get_catalog
+
+# Effective bits per weight of llama.cpp quantization types, including block scales
+BITS_PER_WEIGHT = {
+    "F16": 16.0,
+    "Q8_0": 8.5,
+    "Q6_K": 6.56,
+    "Q5_K_M": 5.69,
+    "Q5_0": 5.5,
+    "Q4_K_M": 4.89,
+    "Q4_0": 4.55,
+}
+
+QUANTIZED_MODEL_DIR = DEFAULT_MODEL_DIR / "quantized"
+
+
+class QuantizationError(Exception):
+    """Exception raised when a local requantization fails."""
+    pass
+
+
+def get_quant_variants(model_name: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the quantization variants available for a model.
+
+    Variants published in the model repo carry a ``file``; when local requantization
+    is allowed, smaller types listed in REQUANTIZE_TARGETS are added with
+    ``requantize_from`` pointing at the highest-precision published variant.
+
+    Args:
+        model_name: Name of the model in the registry
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Variant name mapped to its file/ram description
+    """
+    model_info = get_catalog()[model_name]
+    variants = {
+        quant: dict(info)
+        for quant, info in model_info.get("quants", {}).items()
+    }
+    default_quant = model_info.get("quant", "Q8_0")
+    if default_quant not in variants:
+        variants[default_quant] = {"file": model_info["file"], "ram": model_info.get("ram")}
+
+    if config.model.ALLOW_REQUANTIZE:
+        source_quant = max(variants, key=lambda q: BITS_PER_WEIGHT.get(q, 0))
+        source = variants[source_quant]
+        targets = [q.strip() for q in config.model.REQUANTIZE_TARGETS.split(",") if q.strip()]
+        for quant in targets:
+            if quant in variants or quant not in BITS_PER_WEIGHT:
+                continue
+            variants[quant] = {
+                "file": _requantized_file_name(source["file"], quant),
+                "ram": _scale_ram(model_info, source_quant, source.get("ram"), quant),
+                "requantize_from": source_quant,
+            }
+    return variants
+
+
+def _requantized_file_name(source_file: str, quant: str) -> str:
+    """Name of the cached output of requantizing ``source_file`` to ``quant``."""
+    stem = Path(source_file).stem
+    for known in BITS_PER_WEIGHT:
+        if stem.endswith(f"-{known}"):
+            stem = stem[: -len(known) - 1]
+            break
+    return f"{stem}-{quant}.gguf"
+
+
+def _scale_ram(model_info: Dict[str, Any], source_quant: str, source_ram: Optional[float], quant: str) -> Optional[float]:
+    """Estimate RAM for a variant by swapping the source weight size for the target one."""
+    params = model_info.get("params")
+    if source_ram is None or not params:
+        return source_ram
+    saved = params * (BITS_PER_WEIGHT[source_quant] - BITS_PER_WEIGHT[quant]) / 8
+    return round(source_ram - saved, 2)
+
+
+def estimate_tokens_per_second(model_name: str, quant: str) -> Optional[float]:
+    """
+    Estimate CPU decode speed for a variant.
+
+    Decode is memory-bandwidth bound: every generated token streams all weights once,
+    so tokens/s is roughly bandwidth divided by weight bytes. A speed measured on this
+    host and recorded in the catalog takes precedence over the estimate.
+    """
+    variant = get_quant_variants(model_name).get(quant, {})
+    measured = get_catalog().get_facts(model_name, variant.get("file")).get("measured_tokens_per_second")
+    if measured:
+        return measured
+
+    params = get_catalog()[model_name].get("params")
+    bits = BITS_PER_WEIGHT.get(quant)
+    if not params or not bits:
+        return None
+    weight_gb = params * bits / 8
+    return config.model.MEMORY_BANDWIDTH_GBPS / weight_gb
+
+
+def select_quant(model_name: str, available_ram_gb: Optional[float] = None,
+                 target_tokens_per_second: Optional[float] = None, requested: Optional[str] = None) -> str:
+    """
+    Pick the best quantization variant for this host.
+
+    A forced variant (``requested``, else MODEL_QUANT unless "auto") is used when the
+    model offers it; otherwise a warning is logged and the automatic choice applies.
+    Variants are tried from highest to lowest precision; the first one that fits in
+    RAM and meets the tokens/s target wins. If none meets the target, the fastest
+    variant that fits is used, and if nothing fits the smallest variant is returned.
+
+    The default target (10 tok/s) is checked against the measured or bandwidth-estimated
+    decode speed, so on a low-bandwidth host a large model drops to a smaller variant
+    even when a higher-precision one fits in RAM.
+
+    Args:
+        model_name: Name of the model in the registry
+        available_ram_gb: RAM budget in GB (default: RAM_USAGE_FRACTION of total host RAM)
+        target_tokens_per_second: Decode target (default TARGET_TOKENS_PER_SECOND, 0 disables)
+        requested: Variant asked for explicitly (e.g. CLI ``--quant``)
+
+    Returns:
+        str: Selected variant name
+    """
+    variants = get_quant_variants(model_name)
+    forced = requested or (config.model.MODEL_QUANT if config.model.MODEL_QUANT != "auto" else None)
+    if forced:
+        if forced in variants:
+            return forced
+        logger.warning(f"Quantization {forced} not available for {model_name} "
+                       f"(available: {', '.join(sorted(variants))}), selecting automatically")
+
+    if available_ram_gb is None:
+        available_ram_gb = psutil.virtual_memory().total / (1024 ** 3) * config.model.RAM_USAGE_FRACTION
+    if target_tokens_per_second is None:
+        target_tokens_per_second = config.model.TARGET_TOKENS_PER_SECOND
+
+    ordered = sorted(variants, key=lambda q: BITS_PER_WEIGHT.get(q, 0), reverse=True)
+    fitting = [q for q in ordered if variants[q].get("ram") is None or variants[q]["ram"] <= available_ram_gb]
+    if not fitting:
+        selected = ordered[-1]
+        logger.warning(f"No variant of {model_name} fits in {available_ram_gb:.1f}GB, using smallest ({selected})")
+        return selected
+
+    if target_tokens_per_second:
+        for quant in fitting:
+            tps = estimate_tokens_per_second(model_name, quant)
+            if tps is None or tps >= target_tokens_per_second:
+                logger.info(f"Selected {quant} for {model_name} (~{tps or 0:.1f} tok/s, target {target_tokens_per_second})")
+                return quant
+        selected = fitting[-1]
+        logger.info(f"No variant of {model_name} meets {target_tokens_per_second} tok/s, using fastest ({selected})")
+        return selected
+
+    logger.info(f"Selected {fitting[0]} for {model_name} ({available_ram_gb:.1f}GB RAM budget)")
+    return fitting[0]
+
+
+def find_quantize_binary() -> Optional[str]:
+    """Find llama-quantize, which the llama.cpp formula installs next to llama-server."""
+    if config.file_paths.LLAMA_QUANTIZE and os.path.exists(config.file_paths.LLAMA_QUANTIZE):
+        return config.file_paths.LLAMA_QUANTIZE
+    from local_ai import search_path
+    return shutil.which("llama-quantize", path=search_path)
+
+
+def requantize(source_path: str, quant: str) -> str:
+    """
+    Requantize a GGUF file on this host, caching the result in the model store.
+
+    Args:
+        source_path: Path to the source GGUF file
+        quant: Target quantization type (e.g. Q4_K_M)
+
+    Returns:
+        str: Path to the requantized file
+
+    Raises:
+        QuantizationError: If llama-quantize is missing or fails
+    """
+    output_path = QUANTIZED_MODEL_DIR / _requantized_file_name(Path(source_path).name, quant)
+    if output_path.exists():
+        return str(output_path)
+
+    quantize_path = find_quantize_binary()
+    if not quantize_path:
+        raise QuantizationError("llama-quantize not found in LOCAL_AI_LLAMA_QUANTIZE or PATH")
+
+    QUANTIZED_MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_suffix(".tmp")
+    command = [quantize_path, "--allow-requantize", str(source_path), str(temp_path), quant]
+    logger.info(f"Requantizing {source_path} to {quant}: {' '.join(command)}")
+    try:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+        temp_path.rename(output_path)
+    except subprocess.CalledProcessError as e:
+        temp_path.unlink(missing_ok=True)
+        raise QuantizationError(f"llama-quantize failed: {e.stderr[-500:] if e.stderr else e}")
+    except OSError as e:
+        temp_path.unlink(missing_ok=True)
+        raise QuantizationError(f"Failed to requantize {source_path}: {e}")
+
+    logger.success(f"Requantized model cached at {output_path}")
+    return str(output_path)
@@ -0,0 +1,242 @@
+import json
+import time
+from typing import Optional, Dict, Any, AsyncIterator, Iterable, Tuple
+from local_ai.streams import SSEEventBuffer
+
+THINK_START = "<think>"
+THINK_END = "</think>"
+
+
+class ReasoningSplitter:
+    """
+    Incrementally split streamed model text into reasoning and content.
+
+    A two-state machine over the text: outside a ``<think>`` block text is content,
+    inside it is reasoning. Each ``feed()`` scans only the new text. When a chunk ends
+    with what could be the start of a tag (``"<th"``), only those few characters are
+    held back until the next chunk decides them, so tags split across chunks are
+    recognized without re-scanning the accumulated output.
+    """
+
+    __slots__ = ("start_tag", "end_tag", "in_reasoning", "_pending", "_after_end")
+
+    def __init__(self, start_tag: str = THINK_START, end_tag: str = THINK_END, in_reasoning: bool = False):
+        """
+        Args:
+            start_tag: Tag opening a reasoning block
+            end_tag: Tag closing a reasoning block
+            in_reasoning: Start inside a reasoning block, for chat templates that put
+                the opening tag in the prompt
+        """
+        self.start_tag = start_tag
+        self.end_tag = end_tag
+        self.in_reasoning = in_reasoning
+        self._pending = ""
+        self._after_end = False
+
+    def feed(self, text: str) -> Tuple[str, str]:
+        """
+        Consume the next piece of streamed text.
+
+        Returns:
+            tuple: (reasoning, content) completed by this piece; either may be empty
+        """
+        if self._pending:
+            text = self._pending + text
+            self._pending = ""
+        elif "<" not in text:
+            # Fast path: no tag can start in this chunk
+            if self._after_end:
+                text = self._strip_separator(text)
+            return (text, "") if self.in_reasoning else ("", text)
+
+        reasoning = content = ""
+        while text:
+            if self._after_end:
+                text = self._strip_separator(text)
+                if not text:
+                    break
+            tag = self.end_tag if self.in_reasoning else self.start_tag
+            index = text.find(tag)
+            if index >= 0:
+                if self.in_reasoning:
+                    reasoning += text[:index]
+                else:
+                    content += text[:index]
+                text = text[index + len(tag):]
+                self._after_end = self.in_reasoning
+                self.in_reasoning = not self.in_reasoning
+                continue
+
+            # Hold back a suffix that may be the beginning of the awaited tag
+            hold = 0
+            start = text.rfind("<", max(len(text) - len(tag) + 1, 0))
+            if start >= 0 and tag.startswith(text[start:]):
+                hold = len(text) - start
+            emitted = text[:len(text) - hold]
+            self._pending = text[len(text) - hold:]
+            if self.in_reasoning:
+                reasoning += emitted
+            else:
+                content += emitted
+            break
+        return reasoning, content
+
+    def _strip_separator(self, text: str) -> str:
+        # The blank lines a model writes after closing its reasoning are not content
+        stripped = text.lstrip("\r\n")
+        if stripped:
+            self._after_end = False
+        return stripped
+
+    def flush(self) -> Tuple[str, str]:
+        """Release held-back text at the end of the stream."""
+        text, self._pending = self._pending, ""
+        return (text, "") if self.in_reasoning else ("", text)
+
+
+def split_reasoning(text: str, in_reasoning: bool = False) -> Tuple[str, str]:
+    """Split a complete (non-streamed) response into (reasoning, content)."""
+    splitter = ReasoningSplitter(in_reasoning=in_reasoning)
+    reasoning, content = splitter.feed(text)
+    tail_reasoning, tail_content = splitter.flush()
+    return reasoning + tail_reasoning, content + tail_content
+
+
+def _split_choice_delta(choice: Dict[str, Any], splitter: ReasoningSplitter, drop_reasoning: bool) -> None:
+    delta = choice.get("delta")
+    if not isinstance(delta, dict):
+        return
+    text = delta.get("content")
+    reasoning, content = splitter.feed(text) if isinstance(text, str) else ("", "")
+    if choice.get("finish_reason") is not None:
+        tail_reasoning, tail_content = splitter.flush()
+        reasoning += tail_reasoning
+        content += tail_content
+    if text is None and not reasoning and not content:
+        return
+    delta["content"] = content or None
+    if reasoning and not drop_reasoning:
+        delta["reasoning_content"] = reasoning
+
+
+class SSEReasoningSplitter:
+    """
+    Rewrite an OpenAI-style chat completion SSE stream with reasoning split out.
+
+    Each choice's ``delta.content`` goes through its own ``ReasoningSplitter``;
+    reasoning text moves to ``delta.reasoning_content`` or, with ``drop_reasoning``,
+    is not sent at all. Events whose delta ends up empty are dropped, and events
+    split across network chunks are reassembled.
+    """
+
+    def __init__(self, drop_reasoning: bool = False, in_reasoning: bool = False):
+        self.drop_reasoning = drop_reasoning
+        self.in_reasoning = in_reasoning
+        self._splitters: Dict[int, ReasoningSplitter] = {}
+        self._events = SSEEventBuffer()
+
+    def _rewrite_event(self, event: bytes) -> Optional[bytes]:
+        if not event.startswith(b"data: ") or event.startswith(b"data: [DONE]"):
+            return event
+        try:
+            payload = json.loads(event[6:])
+        except ValueError:
+            return event
+        choices = payload.get("choices")
+        if not choices:
+            return event
+
+        keep = False
+        for choice in choices:
+            index = choice.get("index", 0)
+            splitter = self._splitters.get(index)
+            if splitter is None:
+                splitter = self._splitters[index] = ReasoningSplitter(in_reasoning=self.in_reasoning)
+            _split_choice_delta(choice, splitter, self.drop_reasoning)
+            delta = choice.get("delta") or {}
+            if choice.get("finish_reason") is not None or any(v is not None for v in delta.values()) or not delta:
+                keep = True
+        if not keep:
+            return None
+        return b"data: " + json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Rewrite the complete events in ``chunk``; a trailing partial event is kept for the next call."""
+        out = []
+        for event in self._events.feed(chunk):
+            rewritten = self._rewrite_event(event)
+            if rewritten is not None:
+                out.append(rewritten)
+        return b"\n\n".join(out) + b"\n\n" if out else b""
+
+    def flush(self) -> bytes:
+        """Return any incomplete trailing event unchanged."""
+        return self._events.flush()
+
+
+async def split_reasoning_stream(chunks: AsyncIterator[bytes], drop_reasoning: bool = False,
+                                 in_reasoning: bool = False) -> AsyncIterator[bytes]:
+    """
+    Wrap an upstream SSE byte stream so reasoning arrives separately from content.
+
+    Args:
+        chunks: Upstream SSE chunks (e.g. ``response.aiter_raw()``)
+        drop_reasoning: Do not forward reasoning text at all
+        in_reasoning: The prompt already opened a reasoning block
+    """
+    splitter = SSEReasoningSplitter(drop_reasoning, in_reasoning)
+    async for chunk in chunks:
+        out = splitter.feed(chunk)
+        if out:
+            yield out
+    tail = splitter.flush()
+    if tail:
+        yield tail
+
+
+def _benchmark_chunks(tokens: int) -> Iterable[str]:
+    words = ["Let", " me", " think", " about", " this", ".", " The", " answer", " is", " <", "b", ">",
+             "42", "</", "b", ">", " because", " 6", " *", " 7", "\n"]
+    yield "<th"
+    yield "ink>\n"
+    for i in range(tokens // 2):
+        yield words[i % len(words)]
+    yield "</thi"
+    yield "nk>\n\n"
+    for i in range(tokens - tokens // 2):
+        yield words[i % len(words)]
+
+
+def main() -> None:
+    """Measure per-chunk overhead of the text splitter and the SSE rewriter."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark the reasoning splitter")
+    parser.add_argument("--tokens", type=int, default=200000, help="Streamed tokens per run")
+    args = parser.parse_args()
+
+    chunks = list(_benchmark_chunks(args.tokens))
+    splitter = ReasoningSplitter()
+    started = time.perf_counter()
+    for chunk in chunks:
+        splitter.feed(chunk)
+    splitter.flush()
+    text_seconds = time.perf_counter() - started
+
+    events = [
+        b"data: " + json.dumps({"choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}).encode() + b"\n\n"
+        for chunk in chunks
+    ]
+    sse = SSEReasoningSplitter()
+    started = time.perf_counter()
+    for event in events:
+        sse.feed(event)
+    sse_seconds = time.perf_counter() - started
+
+    print(f"{len(chunks)} chunks")
+    print(f"text splitter:  {text_seconds / len(chunks) * 1e6:.2f} us/chunk")
+    print(f"SSE rewrite:    {sse_seconds / len(chunks) * 1e6:.2f} us/chunk (JSON decode + encode included)")
+
+
+if __name__ == "__main__":
+    main()
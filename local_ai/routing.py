@@ -0,0 +1,276 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from loguru import logger
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, Deque, AsyncIterator
+from local_ai.config import config
+from local_ai.catalog import get_catalog
+from local_ai.admission import AdmissionController, AdmissionError
+from local_ai.shared_state import get_shared_state, SharedStateError
+
+# Longest a queued request sleeps before the switch decision is re-evaluated; demand
+# decays continuously, so an idle server must be noticed without a new arrival
+RECHECK_INTERVAL = 1.0
+# Minimum spacing of model table reloads triggered by requests for unknown models
+MODELS_RELOAD_INTERVAL = 1.0
+
+
+class ConvoyRouter:
+    """
+    Route requests by their ``model`` field and decide when switching models pays off.
+
+    Requests for the loaded model go straight through the admission gate. Requests
+    for another registered model join that model's convoy and wait. A switch happens
+    when the loaded model goes idle, or when a convoy's oldest request has waited
+    ROUTING_MAX_WAIT plus the cost of switching back. The convoy with the best ratio
+    of queued requests and expected demand to load time goes first. Load times come
+    from the durations ``switch_model()`` records in the catalog. Same-model requests
+    are served back to back, so a stray request for an on-demand model cannot make a
+    busy server ping-pong.
+
+    Switches run in a thread through ``switch_model_blocking()``, which serializes
+    them across API workers and the daemon. Each worker follows switches made by
+    the others through the service metadata published in shared state.
+    """
+
+    def __init__(self, manager=None, admission: Optional[AdmissionController] = None):
+        if manager is None:
+            from local_ai.core import AutonomousLocalAIManager
+            manager = AutonomousLocalAIManager()
+        self.manager = manager
+        self._model_table: Dict[str, Any] = {}
+        self._models_loaded_at = 0.0
+        self._shared_metadata: Optional[Dict[str, Any]] = None
+        service_info = self._load_service_info()
+        if admission is None:
+            admission = AdmissionController(service_info.get("hash"))
+        self.admission = admission
+        self.pending: Dict[str, Deque[float]] = {}
+        self._demand: Dict[str, tuple] = {}
+        self._failed: Dict[str, float] = {}
+        self._changed = asyncio.Condition()
+        self._switch_task: Optional[asyncio.Task] = None
+
+    def _load_service_info(self) -> Dict[str, Any]:
+        try:
+            service_info = self.manager.get_service_info()
+        except Exception:
+            service_info = {}
+        self._model_table = service_info.get("models", {})
+        self._models_loaded_at = time.monotonic()
+        return service_info
+
+    def _models(self) -> Dict[str, Any]:
+        """Registered models, cached; the service metadata is only re-read on ``apply_service_info()``."""
+        return self._model_table
+
+    def _shared_update(self) -> Optional[Dict[str, Any]]:
+        """Service metadata published since the last look (e.g. another worker switched), else None."""
+        if self._switch_task is not None and not self._switch_task.done():
+            # This worker's own switch owns the admission state until it finishes
+            return None
+        shared = get_shared_state()
+        if shared is None:
+            return None
+        try:
+            metadata = shared.read_metadata()
+        except (SharedStateError, ValueError):
+            return None
+        if not metadata or metadata is self._shared_metadata:
+            return None
+        self._shared_metadata = metadata
+        return metadata
+
+    async def _apply(self, service_info: Dict[str, Any]) -> None:
+        self._model_table = service_info.get("models", {})
+        self._models_loaded_at = time.monotonic()
+        await self.admission.apply_service_info(service_info)
+
+    async def apply_service_info(self, service_info: Dict[str, Any]) -> None:
+        """Take new service metadata (the API's ``/update``) without re-reading it from disk."""
+        await self._apply(service_info)
+        async with self._changed:
+            self._changed.notify_all()
+        self._maybe_switch()
+
+    def estimate_load_seconds(self, model: str) -> float:
+        """Expected switch duration for ``model``: the recorded average, else DEFAULT_MODEL_LOAD_SECONDS."""
+        model_info = self._models().get(model, {})
+        file_name = os.path.basename(model_info.get("local_model_path") or "") or None
+        measured = get_catalog().get_facts(model, file_name).get("measured_load_seconds")
+        return measured or config.performance.DEFAULT_MODEL_LOAD_SECONDS
+
+    def _record_arrival(self, model: str) -> None:
+        now = time.monotonic()
+        rate, updated = self._demand.get(model, (0.0, now))
+        window = config.performance.ROUTING_DEMAND_WINDOW
+        self._demand[model] = (rate * math.exp(-(now - updated) / window) + 1 / window, now)
+
+    def demand(self, model: str) -> float:
+        """Recent request rate for ``model`` in requests/second."""
+        rate, updated = self._demand.get(model, (0.0, time.monotonic()))
+        return rate * math.exp(-(time.monotonic() - updated) / config.performance.ROUTING_DEMAND_WINDOW)
+
+    def _active_busy(self, candidate: str) -> bool:
+        """Whether the loaded model has work now or is expected to get some while ``candidate`` loads."""
+        active = self.admission.active_model
+        if self.admission.in_flight or self.pending.get(active):
+            return True
+        return self.demand(active) * self.estimate_load_seconds(candidate) >= 1
+
+    def _overdue_at(self, model: str) -> Optional[float]:
+        """Monotonic time at which ``model``'s convoy becomes overdue, None if it is empty."""
+        queue = self.pending.get(model)
+        if not queue:
+            return None
+        switch_back = self.estimate_load_seconds(self.admission.active_model) if self.admission.active_model else 0
+        return queue[0] + config.performance.ROUTING_MAX_WAIT + switch_back
+
+    def _overdue(self, model: str, now: float) -> bool:
+        deadline = self._overdue_at(model)
+        return deadline is not None and now >= deadline
+
+    def _next_recheck(self, now: float) -> float:
+        """Seconds until the switch decision may change without any request arriving or finishing."""
+        deadlines = [d for d in (self._overdue_at(m) for m in self.pending) if d is not None and d > now]
+        return min([RECHECK_INTERVAL] + [max(d - now, 0.05) for d in deadlines])
+
+    def choose_switch(self) -> Optional[str]:
+        """
+        Pick the model to switch to next, or None to keep serving the loaded one.
+
+        Returns:
+            Optional[str]: Target model
+        """
+        active = self.admission.active_model
+        now = time.monotonic()
+        candidates = [m for m, queue in self.pending.items() if queue and m != active]
+        if not candidates:
+            return None
+
+        def score(model: str) -> tuple:
+            load = self.estimate_load_seconds(model)
+            expected = len(self.pending[model]) + self.demand(model) * load
+            return (self._overdue(model, now), expected / (load + 1), now - self.pending[model][0])
+
+        best = max(candidates, key=score)
+        if active is None or not self._active_busy(best) or self._overdue(best, now):
+            return best
+        return None
+
+    def _maybe_switch(self) -> None:
+        if self._switch_task is not None and not self._switch_task.done():
+            return
+        target = self.choose_switch()
+        if target is not None:
+            self._switch_task = asyncio.get_running_loop().create_task(self._switch(target))
+
+    async def _switch(self, target: str) -> None:
+        queued = len(self.pending.get(target, ()))
+        logger.info(f"Switching to {target} for {queued} queued requests "
+                    f"(~{self.estimate_load_seconds(target):.0f}s load)")
+        try:
+            switched = await self.admission.switch(
+                target, lambda: asyncio.to_thread(self.manager.switch_model_blocking, target)
+            )
+        except Exception as e:
+            logger.error(f"Switch to {target} failed: {str(e)}")
+            switched = False
+        if not switched:
+            self._failed[target] = time.monotonic()
+        async with self._changed:
+            self._changed.notify_all()
+        self._maybe_switch()
+
+    @asynccontextmanager
+    async def route(self, model: Optional[str] = None, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Hold the model ``model`` for one upstream request or stream.
+
+        Args:
+            model: Requested model (default: whatever is loaded)
+            timeout: Maximum seconds to wait in the convoy on top of the model's
+                estimated load time (default QUEUE_BACKPRESSURE_TIMEOUT)
+
+        Yields:
+            str: The model serving the request
+
+        Raises:
+            AdmissionError: If the model is unknown, its switch failed or the wait timed out
+        """
+        metadata = self._shared_update()
+        if metadata is not None:
+            await self.apply_service_info(metadata)
+        model = model or self.admission.active_model
+        if model not in self._models() and time.monotonic() - self._models_loaded_at >= MODELS_RELOAD_INTERVAL:
+            # Possibly registered since the table was cached
+            self._load_service_info()
+        if model not in self._models():
+            raise AdmissionError(f"Model {model} is not registered with the running service")
+        self._record_arrival(model)
+
+        now = time.monotonic()
+        fast_path = (
+            model == self.admission.active_model
+            and not self.admission.switching
+            and not any(self._overdue(m, now) for m in self.pending if m != model)
+        )
+        if fast_path:
+            try:
+                async with self.admission.admit(model):
+                    yield model
+            finally:
+                self._maybe_switch()
+            return
+
+        timeout = (timeout or config.performance.QUEUE_BACKPRESSURE_TIMEOUT) + self.estimate_load_seconds(model)
+        queue = self.pending.setdefault(model, deque())
+        arrival = time.monotonic()
+        deadline = arrival + timeout
+        queue.append(arrival)
+        self._maybe_switch()
+        try:
+            async with self._changed:
+                def ready() -> bool:
+                    if self._failed.get(model, 0) > arrival:
+                        raise AdmissionError(f"Switch to model {model} failed")
+                    return self.admission.active_model == model and not self.admission.switching
+                while not ready():
+                    now = time.monotonic()
+                    if now >= deadline:
+                        raise AdmissionError(f"Model {model} was not loaded within {timeout:.0f}s")
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), timeout=min(deadline - now, self._next_recheck(now)))
+                    except asyncio.TimeoutError:
+                        # Another worker may have switched, or a deferred switch become due
+                        metadata = self._shared_update()
+                        if metadata is not None:
+                            await self._apply(metadata)
+                        self._maybe_switch()
+            async with self.admission.admit(model):
+                queue.remove(arrival)
+                yield model
+        finally:
+            if arrival in queue:
+                queue.remove(arrival)
+            self._maybe_switch()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Convoy state for status reporting."""
+        now = time.monotonic()
+        return {
+            **self.admission.snapshot(),
+            "switch_in_progress": self._switch_task is not None and not self._switch_task.done(),
+            "convoys": {
+                model: {
+                    "queued": len(queue),
+                    "oldest_wait": round(now - queue[0], 1) if queue else 0,
+                    "demand_per_minute": round(self.demand(model) * 60, 2),
+                    "estimated_load_seconds": round(self.estimate_load_seconds(model), 1),
+                }
+                for model, queue in self.pending.items()
+            },
+        }
@@ -0,0 +1,120 @@
+import time
+import signal
+import socket
+import argparse
+import multiprocessing
+import uvicorn
+from loguru import logger
+from local_ai.config import config
+
+
+def bind_reuseport_socket(host: str, port: int) -> socket.socket:
+    """
+    Bind a listening socket with SO_REUSEPORT so another API process can bind the same port.
+
+    Args:
+        host: Host address to bind
+        port: Port number to bind
+
+    Returns:
+        socket.socket: Bound socket, ready to be handed to uvicorn
+    """
+    family, sock_type, proto, _, address = socket.getaddrinfo(
+        host, port, type=socket.SOCK_STREAM, flags=socket.AI_PASSIVE
+    )[0]
+    sock = socket.socket(family, sock_type, proto)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, "SO_REUSEPORT"):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    else:
+        logger.warning("SO_REUSEPORT not supported on this platform, graceful API reload will not overlap")
+    sock.bind(address)
+    sock.set_inheritable(True)
+    return sock
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the AutonomousLocalAI API on a SO_REUSEPORT socket")
+    parser.add_argument("--app", default="local_ai.apis:app", help="ASGI application import string")
+    parser.add_argument("--host", default=config.network.DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=config.network.DEFAULT_PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.network.API_WORKERS,
+        help="Worker processes, each with its own SO_REUSEPORT socket (default API_WORKERS)"
+    )
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=int(config.performance.STREAM_TIMEOUT),
+        help="Seconds to let open streams drain after SIGTERM (default STREAM_TIMEOUT)"
+    )
+    return parser.parse_args()
+
+
+def run_worker(app: str, host: str, port: int, log_level: str, graceful_timeout: int) -> None:
+    """Serve ``app`` from a single process on its own SO_REUSEPORT socket."""
+    sock = bind_reuseport_socket(host, port)
+    server = uvicorn.Server(uvicorn.Config(
+        app,
+        log_level=log_level,
+        timeout_graceful_shutdown=graceful_timeout,
+    ))
+    # On SIGTERM uvicorn closes the listener first, so a replacement process bound to the
+    # same port takes all new connections while this one drains its open streams
+    server.run(sockets=[sock])
+
+
+def run_workers(args) -> None:
+    """
+    Run ``args.workers`` API processes on the same port.
+
+    Each worker binds its own SO_REUSEPORT socket, so the kernel balances new
+    connections across workers without a shared accept queue. Workers that exit
+    unexpectedly are replaced; SIGTERM/SIGINT are forwarded so every worker drains
+    its open streams before the pool exits.
+    """
+    context = multiprocessing.get_context("spawn")
+    worker_args = (args.app, args.host, args.port, args.log_level, args.graceful_timeout)
+    stopping = False
+
+    def spawn():
+        process = context.Process(target=run_worker, args=worker_args, daemon=False)
+        process.start()
+        return process
+
+    def handle_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+
+    workers = [spawn() for _ in range(args.workers)]
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    logger.info(f"Started {args.workers} API workers on port {args.port}")
+
+    while not stopping:
+        for i, process in enumerate(workers):
+            if not process.is_alive() and not stopping:
+                logger.warning(f"API worker (PID: {process.pid}) exited with code {process.exitcode}, restarting")
+                workers[i] = spawn()
+        time.sleep(config.performance.PROCESS_CHECK_INTERVAL * 10)
+
+    for process in workers:
+        process.join()
+
+
+def main():
+    args = parse_args()
+    if args.workers > 1:
+        run_workers(args)
+    else:
+        run_worker(args.app, args.host, args.port, args.log_level, args.graceful_timeout)
+
+
+if __name__ == "__main__":
+    main()
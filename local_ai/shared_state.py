@@ -0,0 +1,262 @@
+import os
+import mmap
+import time
+import fcntl
+import struct
+import msgpack
+from pathlib import Path
+from loguru import logger
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterator
+from local_ai.config import config
+
+MAGIC = b"LAIS"
+LAYOUT_VERSION = 1
+
+# Header: magic, layout version
+HEADER_FORMAT = "<4sI"
+# Versioned blob header: version counter, payload length
+BLOB_HEADER_FORMAT = "<QI"
+BLOB_HEADER_SIZE = struct.calcsize(BLOB_HEADER_FORMAT)
+
+COUNTER_SLOTS = 64
+COUNTER_NAME_SIZE = 24
+COUNTER_FORMAT = f"<{COUNTER_NAME_SIZE}sq"
+COUNTER_SIZE = struct.calcsize(COUNTER_FORMAT)
+
+METADATA_OFFSET = 64
+METADATA_SIZE = 1024 * 1024
+COUNTERS_OFFSET = METADATA_OFFSET + METADATA_SIZE
+CACHE_OFFSET = COUNTERS_OFFSET + COUNTER_SLOTS * COUNTER_SIZE
+
+
+class SharedStateError(Exception):
+    """Exception raised when the shared state region is unusable or full."""
+    pass
+
+
+class SharedState:
+    """
+    Service state shared between API worker processes through a memory-mapped file.
+
+    The region holds three parts:
+
+    - the service metadata as a versioned msgpack blob, which workers re-decode
+      only when the version counter changes instead of re-reading the msgpack file;
+    - named int64 counters (queue depth, rate-limit windows, ...) updated atomically;
+    - a small versioned key/value cache with per-entry expiry.
+
+    Writers serialize with ``flock`` on the backing file; readers of the metadata
+    compare the version counter first, so the common path is one 8-byte read.
+    """
+
+    def __init__(self, path: Optional[str] = None, size: Optional[int] = None, create: bool = False):
+        """
+        Open (or create) the shared state region.
+
+        Args:
+            path: Backing file path (default SHARED_STATE_FILE)
+            size: Total region size in bytes when creating (default SHARED_STATE_SIZE)
+            create: Create and initialize the file if missing or invalid
+        """
+        self.path = Path(path or config.file_paths.SHARED_STATE_FILE)
+        size = size or config.performance.SHARED_STATE_SIZE
+        if size <= CACHE_OFFSET + BLOB_HEADER_SIZE:
+            raise SharedStateError(f"Shared state size must exceed {CACHE_OFFSET + BLOB_HEADER_SIZE} bytes")
+
+        if not create and not self.path.exists():
+            raise SharedStateError(f"Shared state file not found: {self.path}")
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if create:
+            with self._locked():
+                if os.fstat(self._fd).st_size != size or os.pread(self._fd, 4, 0) != MAGIC:
+                    os.ftruncate(self._fd, size)
+                    os.pwrite(self._fd, b"\0" * CACHE_OFFSET, 0)
+                    os.pwrite(self._fd, struct.pack(HEADER_FORMAT, MAGIC, LAYOUT_VERSION), 0)
+        self.size = os.fstat(self._fd).st_size
+        self._mmap = mmap.mmap(self._fd, self.size)
+
+        magic, layout_version = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+        if magic != MAGIC or layout_version != LAYOUT_VERSION:
+            self.close()
+            raise SharedStateError(f"Invalid shared state file: {self.path}")
+
+        self._metadata_cache: Optional[Dict[str, Any]] = None
+        self._metadata_version = 0
+        self._cache_cache: Dict[str, Any] = {}
+        self._cache_version = 0
+
+    @contextmanager
+    def _locked(self, shared: bool = False) -> Iterator[None]:
+        fcntl.flock(self._fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        if getattr(self, "_fd", None) is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    # Versioned blobs
+
+    def _write_blob(self, offset: int, capacity: int, value: Any) -> int:
+        payload = msgpack.packb(value, use_bin_type=True)
+        if len(payload) > capacity - BLOB_HEADER_SIZE:
+            raise SharedStateError(f"Shared state blob too large ({len(payload)} bytes)")
+        version, _ = struct.unpack_from(BLOB_HEADER_FORMAT, self._mmap, offset)
+        start = offset + BLOB_HEADER_SIZE
+        self._mmap[start:start + len(payload)] = payload
+        struct.pack_into(BLOB_HEADER_FORMAT, self._mmap, offset, version + 1, len(payload))
+        return version + 1
+
+    def _read_blob(self, offset: int) -> tuple:
+        version, length = struct.unpack_from(BLOB_HEADER_FORMAT, self._mmap, offset)
+        if not length:
+            return version, None
+        start = offset + BLOB_HEADER_SIZE
+        return version, msgpack.unpackb(self._mmap[start:start + length], raw=False)
+
+    def _blob_version(self, offset: int) -> int:
+        return struct.unpack_from("<Q", self._mmap, offset)[0]
+
+    # Service metadata
+
+    def publish_metadata(self, metadata: Dict[str, Any]) -> None:
+        """Publish new service metadata to all workers."""
+        with self._locked():
+            self._metadata_version = self._write_blob(METADATA_OFFSET, METADATA_SIZE, metadata)
+        self._metadata_cache = metadata
+
+    def read_metadata(self) -> Optional[Dict[str, Any]]:
+        """Get the current service metadata, decoding only when it changed."""
+        if self._metadata_cache is not None and self._blob_version(METADATA_OFFSET) == self._metadata_version:
+            return self._metadata_cache
+        with self._locked(shared=True):
+            self._metadata_version, self._metadata_cache = self._read_blob(METADATA_OFFSET)
+        return self._metadata_cache
+
+    # Counters
+
+    def _counter_offset(self, name: str, create: bool) -> Optional[int]:
+        key = name.encode()[:COUNTER_NAME_SIZE]
+        for slot in range(COUNTER_SLOTS):
+            offset = COUNTERS_OFFSET + slot * COUNTER_SIZE
+            slot_name = self._mmap[offset:offset + COUNTER_NAME_SIZE].rstrip(b"\0")
+            if slot_name == key:
+                return offset
+            if not slot_name:
+                if not create:
+                    return None
+                struct.pack_into(COUNTER_FORMAT, self._mmap, offset, key, 0)
+                return offset
+        if create:
+            raise SharedStateError(f"No free counter slot for {name}")
+        return None
+
+    def incr(self, name: str, delta: int = 1) -> int:
+        """Atomically add ``delta`` to a named counter and return the new value."""
+        with self._locked():
+            offset = self._counter_offset(name, create=True)
+            value = struct.unpack_from("<q", self._mmap, offset + COUNTER_NAME_SIZE)[0] + delta
+            struct.pack_into("<q", self._mmap, offset + COUNTER_NAME_SIZE, value)
+        return value
+
+    def set_counter(self, name: str, value: int) -> None:
+        with self._locked():
+            offset = self._counter_offset(name, create=True)
+            struct.pack_into("<q", self._mmap, offset + COUNTER_NAME_SIZE, value)
+
+    def get_counter(self, name: str) -> int:
+        offset = self._counter_offset(name, create=False)
+        if offset is None:
+            return 0
+        return struct.unpack_from("<q", self._mmap, offset + COUNTER_NAME_SIZE)[0]
+
+    def counters(self) -> Dict[str, int]:
+        result = {}
+        for slot in range(COUNTER_SLOTS):
+            name, value = struct.unpack_from(COUNTER_FORMAT, self._mmap, COUNTERS_OFFSET + slot * COUNTER_SIZE)
+            name = name.rstrip(b"\0")
+            if name:
+                result[name.decode()] = value
+        return result
+
+    # Key/value cache
+
+    def _load_cache(self) -> Dict[str, Any]:
+        # Callers hold the lock, so a writer cannot change the blob mid-read
+        if self._blob_version(CACHE_OFFSET) != self._cache_version:
+            self._cache_version, cache = self._read_blob(CACHE_OFFSET)
+            self._cache_cache = cache or {}
+        return self._cache_cache
+
+    def cache_get(self, key: str) -> Any:
+        """Get a cached value shared across workers, or None if missing/expired."""
+        cache = self._cache_cache
+        if self._blob_version(CACHE_OFFSET) != self._cache_version:
+            with self._locked(shared=True):
+                cache = self._load_cache()
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at and expires_at < time.time():
+            return None
+        return value
+
+    def cache_set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a msgpack-serializable value for all workers.
+
+        Expired entries are dropped on write; when the region is full the oldest
+        entries are evicted until the cache fits.
+        """
+        now = time.time()
+        with self._locked():
+            cache = dict(self._load_cache())
+            cache = {k: v for k, v in cache.items() if not v[1] or v[1] >= now}
+            # Re-insert so the entry being written is the newest and never evicted
+            cache.pop(key, None)
+            cache[key] = [value, now + ttl if ttl else 0]
+            while True:
+                try:
+                    self._cache_version = self._write_blob(CACHE_OFFSET, self.size - CACHE_OFFSET, cache)
+                    break
+                except SharedStateError:
+                    if len(cache) <= 1:
+                        logger.warning(f"Value for {key} does not fit in the shared cache")
+                        return
+                    del cache[next(iter(cache))]
+            self._cache_cache = cache
+
+    def cache_delete(self, key: str) -> None:
+        with self._locked():
+            cache = dict(self._load_cache())
+            if cache.pop(key, None) is not None:
+                self._cache_version = self._write_blob(CACHE_OFFSET, self.size - CACHE_OFFSET, cache)
+                self._cache_cache = cache
+
+
+_shared_state: Optional[SharedState] = None
+
+
+def get_shared_state() -> Optional[SharedState]:
+    """
+    Get this process's handle on the shared state published by the manager.
+
+    Returns:
+        Optional[SharedState]: Open handle, or None if no service has published state yet
+    """
+    global _shared_state
+    if _shared_state is None:
+        try:
+            _shared_state = SharedState()
+        except SharedStateError:
+            return None
+    return _shared_state
@@ -0,0 +1,214 @@
+import json
+import asyncio
+import hashlib
+from loguru import logger
+from typing import Optional, Dict, Any, List, Callable, Awaitable, AsyncIterator
+from local_ai.config import config
+
+# Fields that do not change what the model generates
+IGNORED_FIELDS = ("user", "metadata", "stream_options")
+
+
+def is_deterministic(body: Dict[str, Any]) -> bool:
+    """
+    Whether a request always produces the same output for the same prompt.
+
+    Greedy sampling (``temperature`` 0 or ``top_k`` 1) is deterministic; so is a
+    fixed ``seed``, since llama-server seeds each request's sampler with it.
+    Requests for several choices (``n`` > 1) are not shared.
+    """
+    if body.get("n", 1) != 1:
+        return False
+    if body.get("temperature") == 0 or body.get("top_k") == 1:
+        return True
+    seed = body.get("seed")
+    return isinstance(seed, int) and not isinstance(seed, bool) and seed >= 0
+
+
+def request_key(model_hash: str, url: str, body: Dict[str, Any]) -> Optional[str]:
+    """
+    Key identifying requests that may share one upstream generation.
+
+    Returns:
+        Optional[str]: Hash of model, endpoint and canonical body, or None when the
+            request is not deterministic and must run on its own
+    """
+    if not is_deterministic(body):
+        return None
+    canonical = {key: value for key, value in body.items() if key not in IGNORED_FIELDS}
+    payload = json.dumps([model_hash, url, canonical], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class Flight:
+    """One upstream generation and everything it has produced so far."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.joinable = True
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Condition()
+
+    async def append(self, chunk: bytes) -> None:
+        async with self.changed:
+            self.chunks.append(chunk)
+            self.size += len(chunk)
+            if self.size > config.performance.SINGLEFLIGHT_MAX_REPLAY_BYTES:
+                # Late joiners would replay too much; they start their own generation
+                self.joinable = False
+            self.changed.notify_all()
+
+    async def finish(self, error: Optional[BaseException] = None) -> None:
+        async with self.changed:
+            self.done = True
+            self.error = error
+            self.changed.notify_all()
+
+
+class SingleFlight:
+    """
+    Run concurrent identical requests as one upstream generation.
+
+    The first request for a key (the leader) starts the upstream stream in its own
+    task; every chunk is kept and broadcast. Identical requests arriving while it
+    runs join the flight: they first get the prefix already produced, then follow
+    live, so each sees exactly the byte stream it would have received alone. The
+    flight ends with the stream; a request arriving afterwards starts a new one,
+    this is deduplication and not a response cache. If every subscriber goes away
+    the upstream task is cancelled, freeing the slot.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        # Non-streaming flights: key -> [upstream task, waiting callers]
+        self._calls: Dict[str, list] = {}
+        self.leaders = 0
+        self.joined = 0
+
+    async def _drive(self, flight: Flight, producer: Callable[[], AsyncIterator[bytes]]) -> None:
+        try:
+            async for chunk in producer():
+                await flight.append(chunk)
+        except asyncio.CancelledError:
+            await flight.finish(asyncio.CancelledError())
+            raise
+        except Exception as e:
+            await flight.finish(e)
+        else:
+            await flight.finish()
+        finally:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+    async def _subscribe(self, flight: Flight) -> AsyncIterator[bytes]:
+        flight.subscribers += 1
+        position = 0
+        try:
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: len(flight.chunks) > position or flight.done)
+                    pending = flight.chunks[position:]
+                    finished = flight.done and len(flight.chunks) == position + len(pending)
+                position += len(pending)
+                for chunk in pending:
+                    yield chunk
+                if finished:
+                    break
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done and flight.task is not None:
+                logger.debug(f"All subscribers of flight {flight.key[:12]} left, cancelling upstream")
+                flight.task.cancel()
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+
+    async def stream(self, key: Optional[str], producer: Callable[[], AsyncIterator[bytes]]) -> AsyncIterator[bytes]:
+        """
+        Stream a response, sharing the upstream generation with identical in-flight requests.
+
+        Args:
+            key: From ``request_key()``; None streams from ``producer`` directly
+            producer: Starts the upstream request and yields its chunks
+
+        Raises:
+            Exception: Whatever the upstream producer raised, for every subscriber
+        """
+        if key is None or not config.performance.SINGLEFLIGHT_ENABLED:
+            async for chunk in producer():
+                yield chunk
+            return
+
+        flight = self._flights.get(key)
+        if flight is not None and flight.joinable and not flight.done:
+            self.joined += 1
+            logger.debug(f"Joining flight {key[:12]} at {len(flight.chunks)} chunks "
+                         f"({flight.subscribers} other subscribers)")
+        else:
+            flight = self._flights[key] = Flight(key)
+            flight.task = asyncio.create_task(self._drive(flight, producer))
+            self.leaders += 1
+        async for chunk in self._subscribe(flight):
+            yield chunk
+
+    async def call(self, key: Optional[str], producer: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Non-streaming counterpart of ``stream()``: all identical in-flight callers get one result.
+
+        Every caller receives the same result object, not a copy; callers must treat
+        it as read-only (copy before mutating, e.g. to rewrite the response ``id``).
+        If every caller goes away the upstream task is cancelled.
+
+        Raises:
+            Exception: Whatever the upstream producer raised, for every caller
+        """
+        if key is None or not config.performance.SINGLEFLIGHT_ENABLED:
+            return await producer()
+
+        entry = self._calls.get(key)
+        if entry is None:
+            entry = self._calls[key] = [asyncio.ensure_future(producer()), 0]
+
+            def forget(_: asyncio.Future) -> None:
+                if self._calls.get(key) is entry:
+                    del self._calls[key]
+
+            entry[0].add_done_callback(forget)
+            self.leaders += 1
+        else:
+            self.joined += 1
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                logger.debug(f"All callers of flight {key[:12]} left, cancelling upstream")
+                task.cancel()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._flights) + len(self._calls),
+            "subscribers": (sum(flight.subscribers for flight in self._flights.values())
+                            + sum(entry[1] for entry in self._calls.values())),
+            "leaders": self.leaders,
+            "joined": self.joined,
+        }
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    """Get the process-wide single-flight group."""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
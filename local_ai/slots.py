@@ -0,0 +1,177 @@
+import asyncio
+import time
+import httpx
+from loguru import logger
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, Set, AsyncIterator
+from local_ai.config import config
+from local_ai.http_client import get_async_http_client, upstream_base_url, CircuitOpenError
+
+
+class SlotUnavailableError(Exception):
+    """Exception raised when no llama-server slot frees up within the backpressure timeout."""
+    pass
+
+
+class SlotScheduler:
+    """
+    Route gateway requests to free llama-server decode slots.
+
+    The gateway owns a local view of which slots it has handed out and reconciles it
+    with llama-server's ``/slots`` endpoint, so requests are pinned to an idle slot via
+    ``id_slot`` instead of queueing behind a busy one. The ``/slots`` view is refreshed
+    on first use and whenever it is older than SLOT_REFRESH_INTERVAL, which covers
+    slots taken by other API workers or direct clients.
+    """
+
+    def __init__(self, base_url: str, num_slots: int, client: Optional[httpx.AsyncClient] = None,
+                 uds: Optional[str] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            base_url: Base URL of the llama-server instance (e.g. http://localhost:1234)
+            num_slots: Number of parallel slots llama-server was launched with
+            client: Optional shared async HTTP client used for ``/slots`` polling
+            uds: Unix domain socket llama-server listens on, if any
+        """
+        self.base_url = base_url.rstrip("/")
+        self.uds = uds
+        self.num_slots = max(1, num_slots)
+        self._client = client
+        self._owned: Set[int] = set()
+        self._upstream_busy: Set[int] = set()
+        self._condition = asyncio.Condition()
+        self._waiting = 0
+        self._last_refresh = 0.0
+        self._refresh_attempted_at: Optional[float] = None
+
+    @classmethod
+    def from_service_info(cls, service_info: Dict[str, Any], client: Optional[httpx.AsyncClient] = None) -> "SlotScheduler":
+        """Build a scheduler from the running service metadata."""
+        return cls(
+            upstream_base_url(service_info),
+            service_info.get("parallel_slots", 1),
+            client,
+            service_info.get("upstream_socket")
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests currently waiting for a slot."""
+        return self._waiting
+
+    def _free_slots(self) -> list:
+        busy = self._owned | self._upstream_busy
+        return [slot_id for slot_id in range(self.num_slots) if slot_id not in busy]
+
+    async def refresh(self) -> None:
+        """
+        Reconcile slot state with llama-server's ``/slots`` endpoint.
+
+        Slots processing requests the gateway did not hand out (e.g. direct clients)
+        are marked busy; slots the gateway owns are never released by a refresh.
+        """
+        self._refresh_attempted_at = time.monotonic()
+        try:
+            if self._client is not None:
+                response = await self._client.get(f"{self.base_url}/slots", timeout=config.core.REQUEST_TIMEOUT)
+            else:
+                response = await get_async_http_client(self.uds).get(
+                    f"{self.base_url}/slots", retries=1, timeout=config.core.REQUEST_TIMEOUT
+                )
+            response.raise_for_status()
+            slots = response.json()
+        except (httpx.HTTPError, CircuitOpenError, ValueError) as e:
+            logger.debug(f"Failed to refresh slot state: {e}")
+            return
+
+        upstream_busy = {
+            slot["id"] for slot in slots
+            if slot.get("is_processing") and slot.get("id") is not None
+        }
+        async with self._condition:
+            self._upstream_busy = upstream_busy - self._owned
+            self._last_refresh = time.time()
+            if self._free_slots():
+                self._condition.notify_all()
+
+    async def acquire(self, timeout: Optional[float] = None) -> int:
+        """
+        Wait for a free slot and reserve it.
+
+        Args:
+            timeout: Maximum seconds to wait (default QUEUE_BACKPRESSURE_TIMEOUT)
+
+        Returns:
+            int: Reserved slot ID to send upstream as ``id_slot``
+
+        Raises:
+            SlotUnavailableError: If the queue is full or no slot frees up in time
+        """
+        timeout = timeout or config.performance.QUEUE_BACKPRESSURE_TIMEOUT
+        if self._waiting >= config.performance.MAX_QUEUE_SIZE:
+            raise SlotUnavailableError(f"Slot queue is full ({self._waiting} waiting)")
+
+        deadline = time.monotonic() + timeout
+        self._waiting += 1
+        try:
+            while True:
+                if self._refresh_due():
+                    await self.refresh()
+                async with self._condition:
+                    free = self._free_slots()
+                    if free:
+                        slot_id = free[0]
+                        self._owned.add(slot_id)
+                        return slot_id
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise SlotUnavailableError(f"No free slot within {timeout}s")
+
+                    # Upstream-busy slots only free up through a refresh, so poll while waiting
+                    try:
+                        await asyncio.wait_for(self._condition.wait(),
+                                               timeout=min(remaining, config.performance.SLOT_REFRESH_INTERVAL))
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._waiting -= 1
+
+    def _refresh_due(self) -> bool:
+        """Whether the ``/slots`` view is missing or older than SLOT_REFRESH_INTERVAL."""
+        return (self._refresh_attempted_at is None
+                or time.monotonic() - self._refresh_attempted_at >= config.performance.SLOT_REFRESH_INTERVAL)
+
+    async def release(self, slot_id: int) -> None:
+        """Return a slot to the free pool and wake one waiter."""
+        async with self._condition:
+            self._owned.discard(slot_id)
+            self._condition.notify()
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None) -> AsyncIterator[int]:
+        """Context manager that reserves a slot for the duration of an upstream request."""
+        slot_id = await self.acquire(timeout)
+        try:
+            yield slot_id
+        finally:
+            await self.release(slot_id)
+
+    @staticmethod
+    def apply(body: Dict[str, Any], slot_id: int) -> Dict[str, Any]:
+        """Pin an upstream request body to the reserved slot."""
+        body["id_slot"] = slot_id
+        return body
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current slot occupancy for status reporting."""
+        return {
+            "num_slots": self.num_slots,
+            "owned": sorted(self._owned),
+            "upstream_busy": sorted(self._upstream_busy),
+            "free": self._free_slots(),
+            "waiting": self._waiting,
+            "last_refresh": self._last_refresh,
+        }
@@ -0,0 +1,195 @@
+import asyncio
+import time
+import itertools
+from loguru import logger
+from typing import Optional, Dict, Any, List, AsyncIterator, Callable
+from local_ai.config import config
+
+
+def count_sse_events(chunk: bytes) -> int:
+    """Count generated tokens in an SSE chunk; llama-server emits one ``data:`` event per token."""
+    return max(chunk.count(b"data: ") - chunk.count(b"data: [DONE]"), 0)
+
+
+class SSEEventBuffer:
+    """Reassemble SSE events that arrive split across network chunks."""
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """Return the events completed by ``chunk``, without their trailing blank line."""
+        data = self._buffer + chunk if self._buffer else chunk
+        end = data.rfind(b"\n\n")
+        if end < 0:
+            self._buffer = data
+            return []
+        self._buffer = data[end + 2:]
+        return [event.strip(b"\r\n") for event in data[:end].split(b"\n\n")]
+
+    def flush(self) -> bytes:
+        """Return any incomplete trailing event."""
+        data, self._buffer = self._buffer, b""
+        return data
+
+
+class StreamRecord:
+    """Accounting for one open SSE stream."""
+
+    def __init__(self, stream_id: int, client: Optional[str], model: Optional[str],
+                 task: Optional[asyncio.Task] = None):
+        self.stream_id = stream_id
+        self.client = client
+        self.model = model
+        self.task = task
+        self.started_at = time.time()
+        self.last_write = self.started_at
+        self.bytes_sent = 0
+        self.tokens = 0
+        self.terminated: Optional[str] = None
+
+    def record_write(self, nbytes: int, tokens: int = 0) -> None:
+        self.bytes_sent += nbytes
+        self.tokens += tokens
+        self.last_write = time.time()
+
+    def to_dict(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = now or time.time()
+        elapsed = max(now - self.started_at, 1e-6)
+        return {
+            "id": self.stream_id,
+            "client": self.client,
+            "model": self.model,
+            "age": round(now - self.started_at, 1),
+            "idle": round(now - self.last_write, 1),
+            "bytes": self.bytes_sent,
+            "tokens": self.tokens,
+            "bytes_per_second": round(self.bytes_sent / elapsed, 1),
+            "tokens_per_second": round(self.tokens / elapsed, 2),
+            "terminated": self.terminated,
+        }
+
+
+class StreamRegistry:
+    """
+    Track open SSE streams in the gateway and reap the ones that overstay.
+
+    Every stream proxied through ``wrap()`` is recorded with its client, model, bytes
+    and tokens written and the time of the last write. A background reaper runs every
+    STREAM_CLEANUP_INTERVAL and cancels streams older than STREAM_TIMEOUT or without a
+    write for STREAM_STALE_TIMEOUT. A write only completes once the client has read
+    enough of the previous ones, so a slow-reading client goes stale the same way a
+    stalled upstream does.
+    """
+
+    def __init__(self, stream_timeout: Optional[float] = None, stale_timeout: Optional[float] = None,
+                 cleanup_interval: Optional[float] = None):
+        self.stream_timeout = stream_timeout or config.performance.STREAM_TIMEOUT
+        self.stale_timeout = stale_timeout or config.performance.STREAM_STALE_TIMEOUT
+        self.cleanup_interval = cleanup_interval or config.performance.STREAM_CLEANUP_INTERVAL
+        self.streams: Dict[int, StreamRecord] = {}
+        self.reaped_total = 0
+        self._ids = itertools.count(1)
+        self._reaper: Optional[asyncio.Task] = None
+
+    def open(self, client: Optional[str] = None, model: Optional[str] = None) -> StreamRecord:
+        """Register a stream served by the current task."""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        record = StreamRecord(next(self._ids), client, model, task)
+        self.streams[record.stream_id] = record
+        return record
+
+    def close(self, stream_id: int) -> Optional[StreamRecord]:
+        return self.streams.pop(stream_id, None)
+
+    async def wrap(self, chunks: AsyncIterator[bytes], client: Optional[str] = None, model: Optional[str] = None,
+                   count_tokens: Callable[[bytes], int] = count_sse_events) -> AsyncIterator[bytes]:
+        """
+        Proxy an upstream stream while accounting for it.
+
+        Args:
+            chunks: Upstream byte chunks
+            client: Client address for the ops table
+            model: Model serving the stream
+            count_tokens: Counts tokens in a chunk (default: SSE events)
+
+        Yields:
+            bytes: The upstream chunks, unchanged
+        """
+        record = self.open(client, model)
+        try:
+            async for chunk in chunks:
+                yield chunk
+                record.record_write(len(chunk), count_tokens(chunk))
+        except asyncio.CancelledError:
+            if record.terminated:
+                logger.warning(f"Stream {record.stream_id} ({record.client}, {record.model}) terminated: {record.terminated}")
+            raise
+        finally:
+            self.close(record.stream_id)
+
+    def _expiry_reason(self, record: StreamRecord, now: float) -> Optional[str]:
+        if now - record.started_at > self.stream_timeout:
+            return f"exceeded stream timeout ({self.stream_timeout:.0f}s)"
+        if now - record.last_write > self.stale_timeout:
+            return f"no data written for {now - record.last_write:.0f}s"
+        return None
+
+    def reap(self) -> List[int]:
+        """Cancel every expired stream and return their IDs."""
+        now = time.time()
+        reaped = []
+        for record in list(self.streams.values()):
+            reason = self._expiry_reason(record, now)
+            if reason is None or record.terminated:
+                continue
+            record.terminated = reason
+            if record.task is not None and not record.task.done():
+                record.task.cancel()
+            else:
+                self.close(record.stream_id)
+            reaped.append(record.stream_id)
+        self.reaped_total += len(reaped)
+        return reaped
+
+    async def _run_reaper(self) -> None:
+        while True:
+            try:
+                await asyncio.sleep(self.cleanup_interval)
+                reaped = self.reap()
+                if reaped:
+                    logger.info(f"Reaped {len(reaped)} streams, {len(self.streams)} still open")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Stream reaper error: {str(e)}")
+                await asyncio.sleep(config.performance.STREAM_CLEANUP_ERROR_SLEEP)
+
+    def start(self) -> None:
+        """Start the background reaper on the running event loop."""
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.get_running_loop().create_task(self._run_reaper())
+
+    async def stop(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Live stream table with per-stream throughput for status reporting."""
+        now = time.time()
+        streams = [record.to_dict(now) for record in sorted(self.streams.values(), key=lambda r: r.started_at)]
+        return {
+            "open": len(streams),
+            "bytes": sum(s["bytes"] for s in streams),
+            "tokens": sum(s["tokens"] for s in streams),
+            "reaped_total": self.reaped_total,
+            "streams": streams,
+        }
@@ -0,0 +1,227 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import shutil
+import httpx
+import psutil
+from collections import deque
+from loguru import logger
+from typing import Optional, Dict, Any, AsyncIterator
+from local_ai.config import config
+from local_ai.http_client import AsyncHTTPClient, get_async_http_client
+
+# Upstream failures that mean the request never reached a live llama-server
+REPLAYABLE_ERRORS = (httpx.ConnectError, httpx.RemoteProtocolError, httpx.ReadError)
+
+
+class AIServerSupervisor:
+    """
+    Watch the llama-server process and restart it when it exits unexpectedly.
+
+    The supervisor runs as its own detached process (``python -m local_ai.supervisor``)
+    so it outlives the CLI invocation that called ``start()``. Exits requested by the
+    manager (stop, switch, reload) are recognized through ``ai_state == "stopping"``
+    or a changed PID in the service metadata; anything else is treated as a crash and
+    restarted with the stored ``running_ai_command``, backing off exponentially and
+    giving up after CRASH_LOOP_MAX_RESTARTS crashes within CRASH_LOOP_WINDOW. A failed
+    restart (``ai_state == "crashed"`` with no PID) counts as another crash.
+    """
+
+    def __init__(self, manager=None):
+        if manager is None:
+            from local_ai.core import AutonomousLocalAIManager
+            manager = AutonomousLocalAIManager()
+        self.manager = manager
+        self.crash_times: deque = deque()
+        self._running = True
+
+    def stop(self, *_) -> None:
+        self._running = False
+
+    def _load_service_info(self) -> Optional[Dict[str, Any]]:
+        """Current service metadata, or None once the file is removed (or on stop); unreadable reads are retried."""
+        while self._running:
+            if not os.path.exists(self.manager.msgpack_file):
+                return None
+            try:
+                return self.manager.get_service_info()
+            except Exception as e:
+                if not os.path.exists(self.manager.msgpack_file):
+                    return None
+                logger.warning(f"Service metadata unreadable, retrying: {str(e)}")
+                time.sleep(config.core.SUPERVISOR_CHECK_INTERVAL)
+        return None
+
+    def _wait_for_exit(self, pid: int) -> bool:
+        """Wait up to one check interval for ``pid`` to exit. Returns True if it exited."""
+        try:
+            process = psutil.Process(pid)
+            process.wait(timeout=config.core.SUPERVISOR_CHECK_INTERVAL)
+            return True
+        except psutil.TimeoutExpired:
+            try:
+                return process.status() in (psutil.STATUS_ZOMBIE, psutil.STATUS_DEAD)
+            except psutil.NoSuchProcess:
+                return True
+        except psutil.NoSuchProcess:
+            return True
+
+    def _restart_delay(self) -> Optional[float]:
+        """Record a crash and return the backoff before restarting, or None to give up."""
+        now = time.time()
+        self.crash_times.append(now)
+        while self.crash_times and now - self.crash_times[0] > config.core.CRASH_LOOP_WINDOW:
+            self.crash_times.popleft()
+
+        crashes = len(self.crash_times)
+        if crashes > config.core.CRASH_LOOP_MAX_RESTARTS:
+            return None
+        return min(2 ** (crashes - 1), config.core.RESTART_BACKOFF_MAX)
+
+    def _preserve_crash_log(self) -> None:
+        """Keep the crashed server's log, since a restart truncates ai.log."""
+        ai_log = self.manager.logs_dir / "ai.log"
+        if ai_log.exists():
+            try:
+                shutil.copyfile(ai_log, self.manager.logs_dir / "ai.crash.log")
+            except OSError as e:
+                logger.warning(f"Failed to preserve crash log: {e}")
+
+    def run(self) -> None:
+        """Supervise until the service metadata disappears or a stop signal arrives."""
+        logger.info(f"Supervisor started (PID: {os.getpid()})")
+        watched_pid = None
+
+        while self._running:
+            service_info = self._load_service_info()
+            if service_info is None:
+                logger.info("Service metadata removed, supervisor exiting")
+                return
+
+            pid = service_info.get("pid")
+            if not pid and service_info.get("ai_state") == "crashed":
+                # The last restart failed and its server was terminated; try again
+                logger.error("AI server restart failed")
+            elif not pid or service_info.get("ai_state") == "stopping":
+                # Manager is switching or reloading the server, wait for the new PID
+                time.sleep(config.core.SUPERVISOR_CHECK_INTERVAL)
+                continue
+            else:
+                if pid != watched_pid:
+                    logger.info(f"Supervising AI server (PID: {pid})")
+                    watched_pid = pid
+
+                if not self._wait_for_exit(pid):
+                    continue
+
+                # Re-read metadata to tell an intentional stop from a crash
+                service_info = self._load_service_info()
+                if service_info is None:
+                    return
+                if service_info.get("pid") != pid or service_info.get("ai_state") == "stopping":
+                    continue
+
+                logger.error(f"AI server (PID: {pid}) exited unexpectedly")
+                self._preserve_crash_log()
+            delay = self._restart_delay()
+            if delay is None:
+                logger.error(
+                    f"AI server crashed {len(self.crash_times)} times within "
+                    f"{config.core.CRASH_LOOP_WINDOW}s, giving up"
+                )
+                self.manager.update_service_info({"ai_state": "failed", "pid": None})
+                return
+
+            self.manager.update_service_info({"ai_state": "restarting"})
+            logger.info(f"Restarting AI server in {delay:.0f}s")
+            time.sleep(delay)
+            if not self._running:
+                return
+
+            restarted = asyncio.run(self.manager.reload_ai_server(config.core.HEALTH_CHECK_TIMEOUT))
+            service_info = self._load_service_info() or {}
+            self.manager.update_service_info({
+                "ai_state": "running" if restarted else "crashed",
+                "restart_count": service_info.get("restart_count", 0) + 1,
+                "last_crash": time.time(),
+            })
+
+
+async def _wait_for_upstream(client: AsyncHTTPClient, health_url: str, timeout: float) -> bool:
+    """Poll the upstream health endpoint until it reports ok or ``timeout`` elapses."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.client.get(health_url, timeout=3)
+            if response.status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(config.core.SUPERVISOR_CHECK_INTERVAL)
+    return False
+
+
+async def replay_request(method: str, url: str, health_url: str, client: Optional[AsyncHTTPClient] = None,
+                         **kwargs: Any) -> httpx.Response:
+    """
+    Send a non-streamed upstream request, replaying it if the server died underneath it.
+
+    On a connection-level failure the request waits for the supervisor to bring the
+    server back (up to REPLAY_WAIT_TIMEOUT) and is sent again, at most MAX_RETRIES times.
+
+    Args:
+        method: HTTP method
+        url: Upstream URL
+        health_url: Upstream health URL polled while waiting for a restart
+        client: Async client (default: the shared one)
+        **kwargs: Passed through to ``httpx.AsyncClient.request``
+    """
+    client = client or get_async_http_client()
+    for attempt in range(config.performance.MAX_RETRIES):
+        try:
+            return await client.client.request(method, url, **kwargs)
+        except REPLAYABLE_ERRORS as e:
+            if attempt == config.performance.MAX_RETRIES - 1:
+                raise
+            logger.warning(f"Upstream failed ({type(e).__name__}), waiting for restart to replay request")
+            if not await _wait_for_upstream(client, health_url, config.core.REPLAY_WAIT_TIMEOUT):
+                raise
+
+
+async def replay_stream(method: str, url: str, health_url: str, client: Optional[AsyncHTTPClient] = None,
+                        **kwargs: Any) -> AsyncIterator[bytes]:
+    """
+    Stream an upstream response, replaying the request if the server dies before the first chunk.
+
+    Once any bytes have been forwarded the stream cannot be replayed transparently,
+    so later failures propagate to the caller.
+    """
+    client = client or get_async_http_client()
+    for attempt in range(config.performance.MAX_RETRIES):
+        emitted = False
+        try:
+            async with client.client.stream(method, url, **kwargs) as response:
+                async for chunk in response.aiter_raw():
+                    emitted = True
+                    yield chunk
+            return
+        except REPLAYABLE_ERRORS as e:
+            if emitted or attempt == config.performance.MAX_RETRIES - 1:
+                raise
+            logger.warning(f"Upstream failed before first chunk ({type(e).__name__}), waiting for restart to replay")
+            if not await _wait_for_upstream(client, health_url, config.core.REPLAY_WAIT_TIMEOUT):
+                raise
+
+
+def main() -> None:
+    supervisor = AIServerSupervisor()
+    signal.signal(signal.SIGTERM, supervisor.stop)
+    signal.signal(signal.SIGINT, supervisor.stop)
+    supervisor.run()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
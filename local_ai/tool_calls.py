@@ -0,0 +1,442 @@
+import json
+import uuid
+from loguru import logger
+from typing import Optional, Dict, Any, List, AsyncIterator
+from local_ai.catalog import infer_family
+from local_ai.streams import SSEEventBuffer
+
+# How each model family marks tool calls in generated text. ``call_depth`` is the JSON
+# nesting level of the call objects: 0 for one object per tag, 1 for a list of calls.
+TOOL_CALL_FORMATS = {
+    "qwen3": {"start": "<tool_call>", "end": "</tool_call>", "call_depth": 0},
+    "qwen25": {"start": "<tool_call>", "end": "</tool_call>", "call_depth": 0},
+    "devstral-small": {"start": "[TOOL_CALLS]", "end": None, "call_depth": 1},
+    "llama": {"start": "<|python_tag|>", "end": None, "call_depth": 0},
+}
+
+ARGUMENT_KEYS = ("arguments", "parameters")
+
+
+def get_tool_call_format(model_name: str) -> Optional[Dict[str, Any]]:
+    """Tool call markup for a model, by the family ``_build_model_command()`` launches it as."""
+    family = infer_family(model_name or "")
+    return TOOL_CALL_FORMATS.get(family) if family else None
+
+
+class _Call:
+    """State of the tool call currently being parsed."""
+
+    __slots__ = ("index", "id", "name", "pending_arguments", "arguments_sent", "arguments_start", "arguments_emitted")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.id = f"call_{uuid.uuid4().hex[:24]}"
+        self.name: Optional[str] = None
+        self.pending_arguments: List[str] = []
+        self.arguments_sent = False
+        self.arguments_start: Optional[int] = None
+        self.arguments_emitted = 0
+
+
+class ToolCallParser:
+    """
+    Incrementally extract tool calls from streamed model text.
+
+    Text outside the family's tool call markup passes through as content. Inside it,
+    a JSON scanner sees each new character once and tracks nesting, strings and the
+    keys of the call object. As soon as ``name`` is complete an OpenAI-style header
+    delta (id, type, name) is emitted; the ``arguments`` object follows in fragments,
+    each ending at a completed top-level argument, so clients can act on arguments
+    before the call finishes. After ``max_calls`` complete calls ``done`` is set so
+    the caller can stop generation instead of decoding tokens nobody will read.
+    """
+
+    def __init__(self, call_format: Dict[str, Any], max_calls: Optional[int] = None):
+        self.start_tag: str = call_format["start"]
+        self.end_tag: Optional[str] = call_format.get("end")
+        self.call_depth: int = call_format.get("call_depth", 0)
+        self.max_calls = max_calls
+        self.calls_completed = 0
+        self.done = False
+        self._state = "content"
+        self._pending = ""
+        self._after_call = False
+        self._reset_region()
+
+    def _reset_region(self) -> None:
+        self._region = ""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expecting_key = False
+        self._awaiting_value = False
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._call: Optional[_Call] = None
+        self._region_emitted = False
+        self._events: List[Dict[str, Any]] = []
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Consume the next piece of streamed text.
+
+        Returns:
+            List[Dict[str, Any]]: ``{"content": str}`` and ``{"tool_call": delta}`` events in order
+        """
+        events: List[Dict[str, Any]] = []
+        text = self._pending + text
+        self._pending = ""
+        while text and not self.done:
+            if self._state == "content":
+                text = self._feed_content(text, events)
+            elif self._state == "call":
+                text = self._feed_call(text, events)
+            else:
+                text = self._feed_after_call(text, events)
+        return events
+
+    def _hold_tag_prefix(self, text: str, tag: str) -> int:
+        """Length of the longest suffix of ``text`` that starts ``tag``."""
+        for size in range(min(len(tag) - 1, len(text)), 0, -1):
+            if tag.startswith(text[-size:]):
+                return size
+        return 0
+
+    def _feed_content(self, text: str, events: List[Dict[str, Any]]) -> str:
+        if self._after_call:
+            # Newlines between consecutive calls are not content
+            text = text.lstrip("\n")
+            if not text:
+                return ""
+            self._after_call = False
+        index = text.find(self.start_tag)
+        if index < 0:
+            hold = self._hold_tag_prefix(text, self.start_tag)
+            if len(text) > hold:
+                events.append({"content": text[:len(text) - hold]})
+            self._pending = text[len(text) - hold:]
+            return ""
+        if index:
+            events.append({"content": text[:index]})
+        self._state = "call"
+        self._reset_region()
+        return text[index + len(self.start_tag):]
+
+    def _feed_after_call(self, text: str, events: List[Dict[str, Any]]) -> str:
+        stripped = text.lstrip()
+        if not stripped:
+            return ""
+        if self.end_tag and stripped.startswith(self.end_tag):
+            self._state = "content"
+            self._after_call = True
+            return stripped[len(self.end_tag):]
+        if self.end_tag and self.end_tag.startswith(stripped):
+            self._pending = stripped
+            return ""
+        self._state = "content"
+        return stripped
+
+    def _feed_call(self, text: str, events: List[Dict[str, Any]]) -> str:
+        offset = len(self._region)
+        self._region += text
+        self._events = events
+        call_depth = self.call_depth
+        key_depth = call_depth + 1
+        for i in range(offset, len(self._region)):
+            c = self._region[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == key_depth:
+                        raw = self._region[self._string_start:i + 1]
+                        if self._expecting_key:
+                            self._key = json.loads(raw)
+                            self._expecting_key = False
+                        elif self._value_start == self._string_start:
+                            self._complete_value(i + 1)
+                continue
+
+            if self._awaiting_value and self._depth == key_depth and not c.isspace():
+                self._awaiting_value = False
+                self._value_start = i
+                if self._key in ARGUMENT_KEYS and c == "{" and self._call is not None:
+                    self._call.arguments_start = i
+                    self._call.arguments_emitted = i
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                if self._depth == call_depth and c == "{":
+                    self._call = _Call(self.calls_completed)
+                    self._expecting_key = True
+                elif self._depth < call_depth and c != "[":
+                    return self._abandon_region(i, events)
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == key_depth and self._value_start is not None:
+                    # A number, boolean or null value ends at the closing brace
+                    self._complete_value(i)
+                self._depth -= 1
+                if self._depth == key_depth and self._value_start is not None:
+                    self._complete_value(i + 1)
+                elif self._depth == call_depth and c == "}":
+                    self._finish_call(events)
+                    if self.done:
+                        self._state = "content"
+                        self._reset_region()
+                        return ""
+                if self._depth == 0:
+                    rest = self._region[i + 1:]
+                    self._state = "after_call" if self.end_tag else "content"
+                    self._reset_region()
+                    return rest
+            elif c == ",":
+                if self._depth == key_depth:
+                    if self._value_start is not None:
+                        self._complete_value(i)
+                    self._expecting_key = True
+                elif self._depth == key_depth + 1 and self._key in ARGUMENT_KEYS:
+                    self._emit_arguments(i + 1)
+            elif c == ":":
+                if self._depth == key_depth:
+                    self._awaiting_value = True
+            elif self._depth == 0 and not c.isspace():
+                return self._abandon_region(i, events)
+        return ""
+
+    def _abandon_region(self, index: int, events: List[Dict[str, Any]]) -> str:
+        """The markup was not followed by JSON: hand the text back as content."""
+        rest = self._region[index:]
+        events.append({"content": self.start_tag + self._region[:index]})
+        self._state = "content"
+        self._reset_region()
+        return rest
+
+    def _complete_value(self, end: int) -> None:
+        raw = self._region[self._value_start:end].strip()
+        key, call = self._key, self._call
+        self._value_start = None
+        if call is None:
+            return
+        if key == "name":
+            try:
+                call.name = json.loads(raw)
+            except ValueError:
+                return
+            self._region_emitted = True
+            self._events.append({"tool_call": {
+                "index": call.index, "id": call.id, "type": "function",
+                "function": {"name": call.name, "arguments": ""},
+            }})
+            for fragment in call.pending_arguments:
+                self._send_arguments(fragment)
+            call.pending_arguments = []
+        elif key in ARGUMENT_KEYS:
+            if raw.startswith('"'):
+                # Arguments given as a JSON-encoded string
+                try:
+                    self._queue_arguments(json.loads(raw))
+                except ValueError:
+                    self._queue_arguments(raw)
+            elif call.arguments_start is not None:
+                self._emit_arguments(end)
+            else:
+                self._queue_arguments(raw)
+
+    def _emit_arguments(self, end: int) -> None:
+        call = self._call
+        if call is None or call.arguments_start is None or end <= call.arguments_emitted:
+            return
+        fragment = self._region[call.arguments_emitted:end]
+        call.arguments_emitted = end
+        self._queue_arguments(fragment)
+
+    def _queue_arguments(self, fragment: str) -> None:
+        call = self._call
+        if call.name is None:
+            call.pending_arguments.append(fragment)
+        else:
+            self._send_arguments(fragment)
+
+    def _send_arguments(self, fragment: str) -> None:
+        self._call.arguments_sent = True
+        self._events.append({"tool_call": {"index": self._call.index, "function": {"arguments": fragment}}})
+
+    def _finish_call(self, events: List[Dict[str, Any]]) -> None:
+        call = self._call
+        self._call = None
+        if call is None or call.name is None:
+            logger.warning("Tool call without a name, ignoring it")
+            return
+        if not call.arguments_sent:
+            events.append({"tool_call": {"index": call.index, "function": {"arguments": "{}"}}})
+        self.calls_completed += 1
+        if self.max_calls is not None and self.calls_completed >= self.max_calls:
+            self.done = True
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """
+        Finish the stream.
+
+        A call cut off mid-arguments (by ``max_tokens``) gets the rest of its raw
+        arguments text, as OpenAI does for truncated calls; markup that never got as
+        far as a call name is returned as content.
+        """
+        events: List[Dict[str, Any]] = []
+        if self._state == "content" and self._pending:
+            events.append({"content": self._pending})
+        elif self._state == "call" and self._region.strip():
+            call = self._call
+            if call is not None and call.name is not None:
+                self._events = events
+                if call.arguments_start is not None:
+                    self._emit_arguments(len(self._region))
+                logger.warning(f"Tool call {call.name} was cut off before its arguments were complete")
+            elif not self._region_emitted:
+                events.append({"content": self.start_tag + self._region})
+        self._pending = ""
+        self._state = "content"
+        self._after_call = False
+        self._reset_region()
+        return events
+
+
+def parse_tool_calls(text: str, call_format: Dict[str, Any]) -> tuple:
+    """
+    Parse a complete (non-streamed) response.
+
+    Returns:
+        tuple: (content, tool_calls) with tool_calls in the OpenAI message format
+    """
+    parser = ToolCallParser(call_format)
+    content = ""
+    calls: Dict[int, Dict[str, Any]] = {}
+    for event in parser.feed(text) + parser.flush():
+        if "content" in event:
+            content += event["content"]
+            continue
+        delta = event["tool_call"]
+        call = calls.setdefault(delta["index"], {"id": None, "type": "function",
+                                                 "function": {"name": None, "arguments": ""}})
+        call["id"] = delta.get("id", call["id"])
+        call["function"]["name"] = delta["function"].get("name", call["function"]["name"])
+        call["function"]["arguments"] += delta["function"].get("arguments", "")
+    return content, [calls[i] for i in sorted(calls)]
+
+
+class SSEToolCallRewriter:
+    """
+    Rewrite an OpenAI-style chat completion SSE stream with tool calls parsed out.
+
+    Tool call markup in ``delta.content`` becomes ``delta.tool_calls`` deltas, and
+    the stream finishes with ``finish_reason`` "tool_calls" when any call was made.
+    Once the parser is ``done`` the rewriter emits the final events itself and sets
+    ``done``, and the caller stops reading (and so stops generating) upstream.
+    """
+
+    def __init__(self, call_format: Dict[str, Any], max_calls: Optional[int] = None):
+        self.parser = ToolCallParser(call_format, max_calls)
+        self.done = False
+        self._events = SSEEventBuffer()
+        self._template: Optional[Dict[str, Any]] = None
+
+    def _apply(self, payload: Dict[str, Any], choice: Dict[str, Any], events: List[Dict[str, Any]]) -> None:
+        delta = choice.setdefault("delta", {})
+        content = "".join(e["content"] for e in events if "content" in e)
+        tool_calls = [e["tool_call"] for e in events if "tool_call" in e]
+        delta["content"] = content or None
+        if tool_calls:
+            delta["tool_calls"] = tool_calls
+
+    def _rewrite_event(self, event: bytes) -> List[bytes]:
+        if not event.startswith(b"data: ") or event.startswith(b"data: [DONE]"):
+            return [event]
+        try:
+            payload = json.loads(event[6:])
+        except ValueError:
+            return [event]
+        choices = payload.get("choices")
+        if not choices:
+            return [event]
+        # Only the first choice is parsed; n > 1 is not used with tools
+        choice = choices[0]
+        self._template = {k: v for k, v in payload.items() if k != "choices"}
+        delta = choice.get("delta") or {}
+        text = delta.get("content")
+        events = self.parser.feed(text) if isinstance(text, str) else []
+        finishing = choice.get("finish_reason") is not None
+        if finishing:
+            events += self.parser.flush()
+        if self.parser.done:
+            finishing = True
+            self.done = True
+        if text is None and not events and not finishing:
+            return [event]
+        self._apply(payload, choice, events)
+        if finishing and self.parser.calls_completed:
+            choice["finish_reason"] = "tool_calls"
+        if not finishing and choice["delta"].get("content") is None and "tool_calls" not in choice["delta"] \
+                and len(choice["delta"]) == 1:
+            return []
+        out = [b"data: " + json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()]
+        if self.done:
+            out.append(b"data: [DONE]")
+        return out
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Rewrite the complete events in ``chunk``; nothing is emitted once ``done``."""
+        out: List[bytes] = []
+        for event in self._events.feed(chunk):
+            if self.done:
+                break
+            out.extend(self._rewrite_event(event))
+        return b"\n\n".join(out) + b"\n\n" if out else b""
+
+    def flush(self) -> bytes:
+        return b"" if self.done else self._events.flush()
+
+
+async def parse_tool_call_stream(chunks: AsyncIterator[bytes], model_name: str,
+                                 max_calls: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Wrap an upstream chat completion SSE stream so tool calls arrive as ``tool_calls`` deltas.
+
+    Streams for families without a known tool call format pass through unchanged.
+    When ``max_calls`` calls are complete the upstream iterator is closed, which
+    closes the connection and makes llama-server stop decoding.
+
+    Args:
+        chunks: Upstream SSE chunks (e.g. ``response.aiter_raw()``)
+        model_name: Model the request runs on
+        max_calls: Stop after this many calls (1 when the request sets
+            ``parallel_tool_calls: false``; None to read to the end)
+    """
+    call_format = get_tool_call_format(model_name)
+    if call_format is None:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    rewriter = SSEToolCallRewriter(call_format, max_calls)
+    try:
+        async for chunk in chunks:
+            out = rewriter.feed(chunk)
+            if out:
+                yield out
+            if rewriter.done:
+                logger.debug(f"Stopping generation after {rewriter.parser.calls_completed} complete tool call(s)")
+                break
+        else:
+            tail = rewriter.flush()
+            if tail:
+                yield tail
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
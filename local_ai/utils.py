@@ -1,22 +1,45 @@
 import time
+import httpx
 import requests
+import subprocess
+from typing import Optional
 from loguru import logger
+from local_ai.http_client import get_http_client, get_unix_http_client
 
-def wait_for_health(port: int, timeout: int = 300) -> bool:
+def wait_for_health(port: int, timeout: int = 300, socket_path: Optional[str] = None,
+                    process: Optional[subprocess.Popen] = None) -> bool:
     """
     Wait for the service to become healthy with optimized retry logic.
+    
+    When ``socket_path`` is given the health endpoint is polled over that Unix
+    domain socket and ``port`` is ignored. When ``process`` is given the wait ends
+    as soon as that process exits.
     """
-    health_check_url = f"http://localhost:{port}/health"
+    if socket_path:
+        health_check_url = "http://localhost/health"
+    else:
+        health_check_url = f"http://localhost:{port}/health"
     start_time = time.time()
     wait_time = 0.5  # Start with shorter wait time for faster startup detection
     last_error = None
     
     logger.info(f"Waiting for service health at {health_check_url} (timeout: {timeout}s)")
     
+    # Reuse one keep-alive connection across polls; failures are expected while loading,
+    # so the circuit breaker and per-call retries are bypassed
+    client = get_http_client()
+    unix_client = get_unix_http_client(socket_path) if socket_path else None
+    
     while time.time() - start_time < timeout:
+        if process is not None and process.poll() is not None:
+            logger.error(f"Service process exited with code {process.returncode} before becoming healthy")
+            return False
         try:
             # Use shorter timeout for faster failure detection
-            response = requests.get(health_check_url, timeout=3)
+            if unix_client:
+                response = unix_client.get(health_check_url, timeout=3)
+            else:
+                response = client.get(health_check_url, timeout=3, retries=1, use_breaker=False)
             if response.status_code == 200:
                 try:
                     response_data = response.json()
@@ -28,11 +51,11 @@ def wait_for_health(port: int, timeout: int = 300) -> bool:
                     # If JSON parsing fails, just check status code
                     pass
                     
-        except requests.exceptions.ConnectionError:
+        except (requests.exceptions.ConnectionError, httpx.ConnectError):
             last_error = "Connection refused"
-        except requests.exceptions.Timeout:
+        except (requests.exceptions.Timeout, httpx.TimeoutException):
             last_error = "Request timeout"
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, httpx.HTTPError) as e:
             last_error = str(e)[:100]
         
         # Log progress every 30 seconds to avoid spam
@@ -0,0 +1,553 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import asyncio
+import threading
+import httpx
+from pathlib import Path
+from loguru import logger
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List, Sequence, Union, Iterator
+from local_ai.config import config
+from local_ai.http_client import AsyncHTTPClient, get_async_http_client, upstream_base_url, CircuitOpenError
+from local_ai.embeddings import decode_embedding_matrix, EmbeddingFormatError
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency: pip install AutonomousLocalAI[vectors]
+    np = None
+
+VECTOR_DTYPES = ("float32", "float16")
+# Rows scored per matrix product during brute-force search, bounds the float32 copy of float16 data
+SEARCH_BLOCK_ROWS = 65536
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 256
+# Rebuild the IVF index once this fraction of rows has been added since the last build
+REINDEX_TAIL_FRACTION = 0.25
+
+
+class VectorStoreError(Exception):
+    """Exception raised for unknown collections, dimension mismatches or a missing numpy."""
+    pass
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise VectorStoreError("The vector store needs numpy: pip install 'AutonomousLocalAI[vectors]'")
+
+
+def _normalize(vectors: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class Collection:
+    """
+    One vector collection on disk, searched by cosine similarity.
+
+    Layout under ``VECTOR_DIR/<name>``::
+
+        meta.json       dimension, storage dtype, embedding model
+        vectors.npy     (capacity, dim) float32/float16 array, memory-mapped
+        rows.jsonl      append-only log: {"row", "id", "metadata"} or {"deleted": row}
+        ivf.npz         optional IVF index: centroids and the row assignments
+
+    Vectors are normalized on insert, so a search is one matrix product. Rows are
+    never rewritten in place: an upsert of an existing id tombstones its old row
+    and appends a new one, and ``compact()`` drops tombstones. Small collections
+    are searched exhaustively in blocks; from VECTOR_IVF_THRESHOLD rows an IVF
+    index (spherical k-means over ~4·sqrt(n) lists) narrows each query to the
+    VECTOR_IVF_NPROBE nearest lists plus the rows added since the index was built.
+
+    Several API workers may open the same collection: writes hold an exclusive
+    ``flock`` on the collection's ``lock`` file and searches a shared one, and each
+    process picks up rows appended by the others (or a compaction, or a new index)
+    when it next takes the lock.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path / "meta.json") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+        self.name: str = self.meta["name"]
+        self.dim: int = self.meta["dim"]
+        self.dtype: str = self.meta["dtype"]
+        self._lock = threading.RLock()
+        self._lock_fd: Optional[int] = os.open(path / "lock", os.O_RDWR | os.O_CREAT, 0o600)
+        self._lock_depth = 0
+        self._open_vectors()
+        self._load_rows()
+        self._load_index()
+
+    @classmethod
+    def create(cls, path: Path, name: str, dim: int, dtype: str = "float32",
+               model: Optional[str] = None, capacity: int = 1024) -> "Collection":
+        if dtype not in VECTOR_DTYPES:
+            raise VectorStoreError(f"Unsupported dtype {dtype}, expected one of {', '.join(VECTOR_DTYPES)}")
+        path.mkdir(parents=True)
+        np.lib.format.open_memmap(path / "vectors.npy", mode="w+", dtype=dtype, shape=(capacity, dim)).flush()
+        (path / "rows.jsonl").touch()
+        meta = {"name": name, "dim": dim, "dtype": dtype, "model": model, "created_at": time.time()}
+        with open(path / "meta.json", "w") as f:
+            json.dump(meta, f, indent=2)
+        return cls(path)
+
+    @contextmanager
+    def _locked(self, shared: bool = False) -> Iterator[None]:
+        """Hold the collection across threads and processes, catching up with other writers first."""
+        with self._lock:
+            if self._lock_depth == 0:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                if self._lock_depth == 1:
+                    self._refresh()
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        with self._lock:
+            self._vectors = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+    def _open_vectors(self) -> None:
+        self._vectors = np.load(self.path / "vectors.npy", mmap_mode="r+")
+        self._vectors_inode = os.stat(self.path / "vectors.npy").st_ino
+        deleted = getattr(self, "_deleted", None)
+        if deleted is not None and len(deleted) < len(self._vectors):
+            self._deleted = np.concatenate([deleted, np.zeros(len(self._vectors) - len(deleted), dtype=bool)])
+
+    def _refresh(self) -> None:
+        """Apply what other processes wrote since this one last looked."""
+        if os.stat(self.path / "rows.jsonl").st_ino != self._log_inode:
+            # Compacted by another process
+            self._open_vectors()
+            self._load_rows()
+            self._load_index()
+            return
+        if os.stat(self.path / "vectors.npy").st_ino != self._vectors_inode:
+            # Grown by another process
+            self._open_vectors()
+        if os.stat(self.path / "rows.jsonl").st_size > self._log_offset:
+            self._read_log()
+        if self._index_stamp() != self._indexed_stamp:
+            self._load_index()
+
+    def _load_rows(self) -> None:
+        self.count = 0
+        self._row_ids: List[Optional[str]] = []
+        self._metadata: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._deleted = np.zeros(len(self._vectors), dtype=bool)
+        self._log_inode = os.stat(self.path / "rows.jsonl").st_ino
+        self._log_offset = 0
+        self._read_log()
+
+    def _read_log(self) -> None:
+        """Apply the row log from where the last read stopped."""
+        with open(self.path / "rows.jsonl", "rb") as f:
+            f.seek(self._log_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A write cut off by a crash; the rows after it were never acknowledged
+                    logger.warning(f"Collection {self.name}: ignoring truncated row log entry")
+                    break
+                self._log_offset += len(line)
+                if "deleted" in record:
+                    self._deleted[record["deleted"]] = True
+                    self._rows.pop(self._row_ids[record["deleted"]], None)
+                    continue
+                row = record["row"]
+                self._row_ids.append(record["id"])
+                self._metadata.append(record.get("metadata"))
+                self._rows[record["id"]] = row
+                self.count = row + 1
+
+    def _append_log(self, records: List[Dict[str, Any]]) -> None:
+        with open(self.path / "rows.jsonl", "ab") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records).encode())
+            self._log_offset = f.tell()
+
+    def _index_stamp(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.path / "ivf.npz")
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _load_index(self) -> None:
+        self._centroids = None
+        self._indexed_count = 0
+        self._indexed_stamp = self._index_stamp()
+        index_path = self.path / "ivf.npz"
+        if self._indexed_stamp is None:
+            return
+        with np.load(index_path) as index:
+            self._centroids = index["centroids"]
+            assignments = index["assignments"]
+        self._indexed_count = len(assignments)
+        self._set_lists(assignments)
+
+    def _set_lists(self, assignments: "np.ndarray") -> None:
+        self._list_order = np.argsort(assignments, kind="stable").astype(np.int64)
+        self._list_offsets = np.searchsorted(assignments[self._list_order], np.arange(len(self._centroids) + 1))
+
+    def __len__(self) -> int:
+        with self._locked(shared=True):
+            return len(self._rows)
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        tmp_path = self.path / "vectors.tmp.npy"
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.dtype, shape=(new_capacity, self.dim))
+        grown[:self.count] = self._vectors[:self.count]
+        grown.flush()
+        del grown
+        self._vectors = None
+        os.replace(tmp_path, self.path / "vectors.npy")
+        self._open_vectors()
+
+    def upsert(self, ids: Sequence[str], vectors: Union["np.ndarray", List[List[float]]],
+               metadata: Optional[Sequence[Optional[Dict[str, Any]]]] = None) -> int:
+        """
+        Insert vectors, replacing any existing rows with the same ids.
+
+        Returns:
+            int: Number of rows written
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise VectorStoreError(f"Collection {self.name} stores {self.dim}-dimensional vectors, got shape {vectors.shape}")
+        if len(ids) != len(vectors):
+            raise VectorStoreError(f"Got {len(ids)} ids for {len(vectors)} vectors")
+        metadata = metadata or [None] * len(ids)
+
+        with self._locked():
+            start = self.count
+            self._grow(start + len(ids))
+            self._vectors[start:start + len(ids)] = _normalize(vectors)
+            # Vectors reach the file before the log that makes them visible
+            self._vectors.flush()
+            records = []
+            for offset, (vector_id, meta) in enumerate(zip(ids, metadata)):
+                vector_id = str(vector_id)
+                previous = self._rows.get(vector_id)
+                if previous is not None:
+                    records.append({"deleted": previous})
+                    self._deleted[previous] = True
+                row = start + offset
+                records.append({"row": row, "id": vector_id, "metadata": meta})
+                self._row_ids.append(vector_id)
+                self._metadata.append(meta)
+                self._rows[vector_id] = row
+            self.count = start + len(ids)
+            self._append_log(records)
+            self._maybe_reindex()
+        return len(ids)
+
+    def delete(self, ids: Sequence[str]) -> int:
+        """Delete rows by id; returns how many existed."""
+        with self._locked():
+            records = []
+            for vector_id in ids:
+                row = self._rows.pop(str(vector_id), None)
+                if row is not None:
+                    self._deleted[row] = True
+                    records.append({"deleted": row})
+            if records:
+                self._append_log(records)
+        return len(records)
+
+    def _maybe_reindex(self) -> None:
+        live = len(self._rows)
+        if live < config.performance.VECTOR_IVF_THRESHOLD:
+            return
+        tail = self.count - self._indexed_count
+        if self._centroids is None or tail > self._indexed_count * REINDEX_TAIL_FRACTION:
+            self.build_index()
+
+    def compact(self) -> None:
+        """Rewrite the collection without deleted rows."""
+        with self._locked():
+            live = np.flatnonzero(~self._deleted[:self.count])
+            if len(live) == self.count:
+                return
+            tmp_path = self.path / "vectors.tmp.npy"
+            compacted = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.dtype,
+                                                  shape=(max(len(live), 1024), self.dim))
+            for start in range(0, len(live), SEARCH_BLOCK_ROWS):
+                rows = live[start:start + SEARCH_BLOCK_ROWS]
+                compacted[start:start + len(rows)] = self._vectors[rows]
+            compacted.flush()
+            del compacted
+            with open(self.path / "rows.tmp.jsonl", "w") as f:
+                for new_row, row in enumerate(live):
+                    f.write(json.dumps({"row": new_row, "id": self._row_ids[row], "metadata": self._metadata[row]}) + "\n")
+            self._vectors = None
+            os.replace(tmp_path, self.path / "vectors.npy")
+            os.replace(self.path / "rows.tmp.jsonl", self.path / "rows.jsonl")
+            (self.path / "ivf.npz").unlink(missing_ok=True)
+            self._open_vectors()
+            self._load_rows()
+            self._load_index()
+            logger.info(f"Collection {self.name} compacted to {self.count} rows")
+
+    def build_index(self, n_lists: Optional[int] = None) -> None:
+        """Compact the collection and (re)build its IVF index with spherical k-means."""
+        with self._locked():
+            self.compact()
+            count = self.count
+            if count == 0:
+                return
+            started = time.time()
+            n_lists = n_lists or max(1, min(int(4 * count ** 0.5), count // 32 or 1))
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(rng.choice(count, size=min(count, n_lists * KMEANS_SAMPLE_PER_LIST), replace=False))
+            sample = np.asarray(self._vectors[sample_rows], dtype=np.float32)
+            centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+            for _ in range(KMEANS_ITERATIONS):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                sizes = np.bincount(labels, minlength=n_lists)
+                empty = sizes == 0
+                # Re-seed empty lists with random sample points
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+                centroids = _normalize(sums)
+
+            assignments = np.empty(count, dtype=np.int32)
+            for start in range(0, count, SEARCH_BLOCK_ROWS):
+                block = np.asarray(self._vectors[start:min(start + SEARCH_BLOCK_ROWS, count)], dtype=np.float32)
+                assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+            tmp_path = self.path / "ivf.tmp.npz"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, centroids=centroids.astype(np.float32), assignments=assignments)
+            os.replace(tmp_path, self.path / "ivf.npz")
+            self._indexed_stamp = self._index_stamp()
+            self._centroids = centroids.astype(np.float32)
+            self._indexed_count = count
+            self._set_lists(assignments)
+            logger.info(f"Collection {self.name}: IVF index with {n_lists} lists over {count} rows "
+                        f"built in {time.time() - started:.1f}s")
+
+    def _score_rows(self, queries: "np.ndarray", rows: Optional["np.ndarray"]) -> tuple:
+        """Scores of ``queries`` against ``rows`` (all rows when None), deleted rows at -inf."""
+        if rows is None:
+            rows = np.arange(self.count)
+            scores = np.empty((len(queries), self.count), dtype=np.float32)
+            for start in range(0, self.count, SEARCH_BLOCK_ROWS):
+                block = np.asarray(self._vectors[start:min(start + SEARCH_BLOCK_ROWS, self.count)], dtype=np.float32)
+                scores[:, start:start + len(block)] = queries @ block.T
+        else:
+            scores = queries @ np.asarray(self._vectors[rows], dtype=np.float32).T
+        scores[:, self._deleted[rows]] = -np.inf
+        return rows, scores
+
+    def _candidate_rows(self, query: "np.ndarray", n_probe: int) -> "np.ndarray":
+        lists = np.argsort(-(self._centroids @ query))[:n_probe]
+        parts = [self._list_order[self._list_offsets[i]:self._list_offsets[i + 1]] for i in lists]
+        parts.append(np.arange(self._indexed_count, self.count))
+        return np.concatenate(parts)
+
+    def search(self, query: Union["np.ndarray", List[float], List[List[float]]], k: int = 10,
+               n_probe: Optional[int] = None) -> Union[List[Dict[str, Any]], List[List[Dict[str, Any]]]]:
+        """
+        Nearest rows by cosine similarity.
+
+        Args:
+            query: One vector, or a (m, dim) batch of vectors scored in one pass
+            k: Results per query
+            n_probe: IVF lists to scan per query (default VECTOR_IVF_NPROBE)
+
+        Returns:
+            ``[{"id", "score", "metadata"}]`` best first, or one such list per query for a batch
+        """
+        queries = np.asarray(query, dtype=np.float32)
+        single = queries.ndim == 1
+        queries = _normalize(np.atleast_2d(queries))
+        if queries.shape[1] != self.dim:
+            raise VectorStoreError(f"Collection {self.name} stores {self.dim}-dimensional vectors, "
+                                   f"got {queries.shape[1]}")
+        n_probe = n_probe or config.performance.VECTOR_IVF_NPROBE
+
+        with self._locked(shared=True):
+            if self.count == 0:
+                results = [[] for _ in queries]
+            elif self._centroids is None:
+                rows, scores = self._score_rows(queries, None)
+                results = [self._top_k(rows, row_scores, k) for row_scores in scores]
+            else:
+                results = []
+                for q in queries:
+                    rows, scores = self._score_rows(q[None, :], self._candidate_rows(q, n_probe))
+                    results.append(self._top_k(rows, scores[0], k))
+        return results[0] if single else results
+
+    def _top_k(self, rows: "np.ndarray", scores: "np.ndarray", k: int) -> List[Dict[str, Any]]:
+        if len(scores) > k:
+            best = np.argpartition(-scores, k)[:k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best])]
+        return [
+            {"id": self._row_ids[rows[i]], "score": float(scores[i]), "metadata": self._metadata[rows[i]]}
+            for i in best if scores[i] != -np.inf
+        ]
+
+    def info(self) -> Dict[str, Any]:
+        with self._locked(shared=True):
+            return {
+                "name": self.name, "dim": self.dim, "dtype": self.dtype, "model": self.meta.get("model"),
+                "count": len(self._rows), "rows": self.count, "capacity": len(self._vectors),
+                "index": {"type": "ivf", "lists": len(self._centroids), "indexed": self._indexed_count}
+                if self._centroids is not None else {"type": "flat"},
+            }
+
+
+class VectorStore:
+    """Named collections under VECTOR_DIR, opened on first use."""
+
+    def __init__(self, root: Optional[str] = None):
+        _require_numpy()
+        self.root = Path(root or config.file_paths.VECTOR_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._collections: Dict[str, Collection] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> Path:
+        if not name or "/" in name or name.startswith("."):
+            raise VectorStoreError(f"Invalid collection name: {name!r}")
+        return self.root / name
+
+    def create_collection(self, name: str, dim: int, dtype: Optional[str] = None,
+                          model: Optional[str] = None) -> Collection:
+        with self._lock:
+            path = self._path(name)
+            if path.exists():
+                raise VectorStoreError(f"Collection {name} already exists")
+            collection = Collection.create(path, name, dim, dtype or config.performance.VECTOR_DTYPE, model)
+            self._collections[name] = collection
+            return collection
+
+    def get_collection(self, name: str) -> Collection:
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                path = self._path(name)
+                if not (path / "meta.json").exists():
+                    raise VectorStoreError(f"Collection {name} not found")
+                collection = self._collections[name] = Collection(path)
+            return collection
+
+    def delete_collection(self, name: str) -> bool:
+        with self._lock:
+            path = self._path(name)
+            collection = self._collections.pop(name, None)
+            if collection is not None:
+                collection.close()
+            if not path.exists():
+                return False
+            shutil.rmtree(path)
+            return True
+
+    def list_collections(self) -> List[Dict[str, Any]]:
+        return [self.get_collection(path.name).info()
+                for path in sorted(self.root.iterdir()) if (path / "meta.json").exists()]
+
+
+async def embed_texts(texts: List[str], service_info: Dict[str, Any],
+                      client: Optional[AsyncHTTPClient] = None) -> "np.ndarray":
+    """
+    Embed texts with the running embedding model, VECTOR_INGEST_BATCH texts per request.
+
+    Raises:
+        VectorStoreError: If the model server fails or returns a malformed response
+    """
+    _require_numpy()
+    client = client or get_async_http_client(service_info.get("upstream_socket"))
+    url = f"{upstream_base_url(service_info)}/v1/embeddings"
+    batch_size = config.performance.VECTOR_INGEST_BATCH
+    embeddings = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        try:
+            response = await client.post(url, json={"input": batch, "model": service_info.get("family", "embed"),
+                                                    "encoding_format": "base64"})
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            raise VectorStoreError(f"Embedding request failed: {str(e)}")
+        if response.status_code != 200:
+            raise VectorStoreError(f"Embedding request failed with status {response.status_code}: {response.text[:200]}")
+        data = sorted(response.json().get("data", []), key=lambda item: item.get("index", 0))
+        if len(data) != len(batch):
+            raise VectorStoreError(f"Embedding server returned {len(data)} vectors for {len(batch)} inputs")
+        try:
+            embeddings.append(decode_embedding_matrix(data))
+        except (EmbeddingFormatError, ValueError) as e:
+            raise VectorStoreError(f"Malformed embedding response: {str(e)}")
+    return np.concatenate(embeddings) if embeddings else np.zeros((0, 0), dtype=np.float32)
+
+
+async def ingest(store: VectorStore, name: str, items: List[Dict[str, Any]],
+                 service_info: Dict[str, Any], client: Optional[AsyncHTTPClient] = None) -> Dict[str, Any]:
+    """
+    Embed ``[{"id", "text", "metadata"?}]`` items and upsert them into a collection.
+
+    The collection is created with the model's dimension if it does not exist yet.
+    Each embedding batch is written as soon as it returns, so a failure part-way
+    keeps the rows ingested so far.
+    """
+    if service_info.get("task") != "embed":
+        raise VectorStoreError("The running model is not an embedding model")
+    batch_size = config.performance.VECTOR_INGEST_BATCH
+    started = time.time()
+    written = 0
+    collection = None
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        vectors = await embed_texts([item["text"] for item in batch], service_info, client)
+        if collection is None:
+            try:
+                collection = await asyncio.to_thread(store.get_collection, name)
+            except VectorStoreError:
+                collection = await asyncio.to_thread(store.create_collection, name, vectors.shape[1],
+                                                     model=service_info.get("family"))
+        # Writes may grow the file or rebuild the index, keep them off the event loop
+        written += await asyncio.to_thread(collection.upsert, [item["id"] for item in batch], vectors,
+                                           [item.get("metadata") for item in batch])
+    elapsed = time.time() - started
+    logger.info(f"Ingested {written} items into {name} in {elapsed:.1f}s")
+    return {"collection": name, "ingested": written, "seconds": round(elapsed, 2)}
+
+
+async def search(store: VectorStore, name: str, query: Union["np.ndarray", List[float], List[List[float]]],
+                 k: int = 10, n_probe: Optional[int] = None) -> Union[List[Dict[str, Any]], List[List[Dict[str, Any]]]]:
+    """``Collection.search()`` in a worker thread, so an exhaustive scan does not block the event loop."""
+    collection = await asyncio.to_thread(store.get_collection, name)
+    return await asyncio.to_thread(collection.search, query, k, n_probe)
+
+
+_vector_store: Optional[VectorStore] = None
+
+
+def get_vector_store() -> VectorStore:
+    """Get the process-wide vector store."""
+    global _vector_store
+    if _vector_store is None:
+        _vector_store = VectorStore()
+    return _vector_store
@@ -37,6 +37,9 @@ setup(
         "json_repair==0.47.6",
         "msgpack==1.1.1"
     ],
+    extras_require={
+        "vectors": ["numpy>=1.26"],
+    },
     entry_points={
         "console_scripts": [
             "autonomous = local_ai.cli:main",